@@ -1,11 +1,20 @@
 from django.utils.html import format_html
 from django.contrib import admin
-from .models import RoomType, Room, Price, Discount, Booking
+from .models import (
+    Hotel, RoomType, Room, Price, SeasonalPrice, Discount, PricingRule,
+    Booking, ArchivedBooking, WaitlistEntry, GuestProfile,
+)
 
 
+@admin.register(Hotel)
+class HotelAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'is_active')
+    search_fields = ('name', 'code')
+    list_editable = ('is_active',)
+
 @admin.register(RoomType)
 class RoomTypeAdmin(admin.ModelAdmin):
-    list_display = ('category', 'capacity')
+    list_display = ('category', 'capacity', 'hotel')
     list_filter = ('category', 'capacity')
     search_fields = ('category', 'description')
 
@@ -25,14 +34,34 @@ class PriceAdmin(admin.ModelAdmin):
     search_fields = ('room_type__category',)
 
 
+@admin.register(SeasonalPrice)
+class SeasonalPriceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'room_type', 'start_date', 'end_date',
+                    'price', 'priority', 'is_active')
+    list_filter = ('room_type', 'is_active')
+    search_fields = ('name',)
+    list_editable = ('is_active',)
+    date_hierarchy = 'start_date'
+
+
 @admin.register(Discount)
 class DiscountAdmin(admin.ModelAdmin):
-    list_display = ('name', 'min_nights', 'discount_percent', 'is_active')
+    list_display = ('name', 'min_nights', 'discount_percent', 'hotel',
+                    'is_active')
     list_filter = ('is_active',)
     search_fields = ('name',)
     list_editable = ('is_active',)
 
 
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'kind', 'category', 'percent', 'amount',
+                    'stackable', 'is_active')
+    list_filter = ('kind', 'category', 'stackable', 'is_active')
+    search_fields = ('name',)
+    list_editable = ('is_active',)
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = (
@@ -85,3 +114,47 @@ class BookingAdmin(admin.ModelAdmin):
     def total_price_display(self, obj):
         return f"{obj.total_price}₽"
     total_price_display.short_description = 'Стоимость'
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ('id', 'client', 'room', 'check_in_date',
+                    'check_out_date', 'status', 'total_price', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('client__first_name',
+                     'client__last_name', 'room__number', 'id')
+    date_hierarchy = 'check_out_date'
+    list_select_related = ('client', 'room')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'client', 'room_type', 'check_in_date',
+                    'check_out_date', 'status', 'offer', 'created_at')
+    list_filter = ('status', 'room_type')
+    search_fields = ('client__first_name', 'client__last_name',
+                     'client__phone')
+    date_hierarchy = 'check_in_date'
+    list_select_related = ('client', 'room_type', 'offer')
+    raw_id_fields = ('client', 'offer')
+
+
+@admin.register(GuestProfile)
+class GuestProfileAdmin(admin.ModelAdmin):
+    """Профили сдвигаются сигналами броней, правка вручную не нужна"""
+    list_display = ('client', 'stays', 'nights', 'lifetime_value',
+                    'last_stay')
+    search_fields = ('client__first_name', 'client__last_name',
+                     'client__phone')
+    list_select_related = ('client',)
+    readonly_fields = ('client', 'stays', 'nights', 'lifetime_value',
+                       'last_stay', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,226 @@
+"""
+Автоматический подбор номера.
+
+Номер выбирается среди номеров нужного типа по принципу best fit:
+бронь ставится туда, где она плотнее всего примыкает к соседним
+броням и не оставляет коротких непродаваемых окон. Та же оценка
+используется при пакетной перестановке будущих неподтвержденных броней.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_on_commit
+from .hotels import hotel_database
+from .models import Booking, Room
+from .versions import BOOKINGS, bump_version
+
+# Ожидающие брони не блокируют ручной выбор номера (кроме предложений
+# из листа ожидания), но при автоматическом подборе на них тоже не ставим
+OCCUPYING_STATUSES = ['pending', 'confirmed', 'checked_in']
+
+# Переставлять можно только неподтвержденные брони
+MOVABLE_STATUSES = ['pending']
+
+# Насколько далеко от периода брони учитываются соседние брони
+WINDOW_DAYS = 60
+
+
+class AllocationConflict(Exception):
+    """Брони изменились между расчетом и применением перестановки"""
+
+
+class Occupancy:
+    """Занятость номеров одного типа: интервалы броней по номерам"""
+
+    def __init__(self, room_ids, intervals):
+        # Порядок номеров задает выбор при равной оценке
+        self.room_ids = room_ids
+        self.intervals = intervals
+
+    @classmethod
+    def load(cls, room_type, start_date, end_date, exclude=()):
+        """
+        Два запроса: доступные номера типа и брони этих номеров,
+        пересекающие период с запасом WINDOW_DAYS в обе стороны
+        """
+        room_ids = list(
+            Room.objects.filter(
+                room_type=room_type, is_available=True,
+            ).order_by('floor', 'number').values_list('id', flat=True)
+        )
+        window = timedelta(days=WINDOW_DAYS)
+        bookings = Booking.objects.filter(
+            room_id__in=room_ids,
+            status__in=OCCUPYING_STATUSES,
+            check_in_date__lt=end_date + window,
+            check_out_date__gt=start_date - window,
+        ).exclude(pk__in=exclude).values_list(
+            'room_id', 'check_in_date', 'check_out_date')
+
+        intervals = {room_id: [] for room_id in room_ids}
+        for room_id, check_in_date, check_out_date in bookings:
+            intervals[room_id].append((check_in_date, check_out_date))
+        return cls(room_ids, intervals)
+
+    def copy(self):
+        return Occupancy(
+            self.room_ids,
+            {room_id: list(items) for room_id, items
+             in self.intervals.items()})
+
+    def add(self, room_id, check_in_date, check_out_date):
+        self.intervals.setdefault(room_id, []).append(
+            (check_in_date, check_out_date))
+
+    def fit_cost(self, room_id, check_in_date, check_out_date):
+        """
+        Оценка размещения в номере или None, если номер занят.
+        Меньше — лучше: (короткие окна, ночей простоя вокруг брони)
+        """
+        previous_end = None
+        next_start = None
+        for start, end in self.intervals.get(room_id, ()):
+            if start < check_out_date and end > check_in_date:
+                return None
+            if end <= check_in_date:
+                if previous_end is None or end > previous_end:
+                    previous_end = end
+            elif next_start is None or start < next_start:
+                next_start = start
+
+        orphans = 0
+        idle = 0
+        for gap in (
+            (check_in_date - previous_end).days
+            if previous_end is not None else None,
+            (next_start - check_out_date).days
+            if next_start is not None else None,
+        ):
+            if gap is None:
+                # Соседей нет: номер свободен на все окно
+                idle += WINDOW_DAYS
+                continue
+            if 0 < gap < settings.ALLOCATION_MIN_GAP_NIGHTS:
+                orphans += 1
+            idle += gap
+        return orphans, idle
+
+    def best_room(self, check_in_date, check_out_date):
+        """Номер с наименьшей оценкой или None, если свободных нет"""
+        best = None
+        best_cost = None
+        for room_id in self.room_ids:
+            cost = self.fit_cost(room_id, check_in_date, check_out_date)
+            if cost is not None and (best_cost is None or cost < best_cost):
+                best, best_cost = room_id, cost
+        return best
+
+    def fragmentation(self, start_date, end_date):
+        """
+        Оценка раздробленности периода, меньше — лучше:
+        (число коротких окон между бронями, -самое длинное свободное окно)
+        """
+        orphans = 0
+        longest = 0
+        for room_id in self.room_ids:
+            cursor = start_date
+            bounded = False
+            for start, end in sorted(self.intervals.get(room_id, ())):
+                if end <= start_date:
+                    bounded = True
+                    continue
+                if start >= end_date:
+                    break
+                gap = (start - cursor).days
+                if gap > 0:
+                    longest = max(longest, gap)
+                    if bounded and gap < settings.ALLOCATION_MIN_GAP_NIGHTS:
+                        orphans += 1
+                cursor = max(cursor, end)
+                bounded = True
+            longest = max(longest, (end_date - cursor).days)
+        return orphans, -longest
+
+
+def allocate_room(room_type, check_in_date, check_out_date):
+    """Подобрать номер типа на период или вернуть None"""
+    occupancy = Occupancy.load(room_type, check_in_date, check_out_date)
+    room_id = occupancy.best_room(check_in_date, check_out_date)
+    if room_id is None:
+        return None
+    return Room.objects.select_related('room_type').get(pk=room_id)
+
+
+def plan_reassignment(room_type, start_date):
+    """
+    Перестановка будущих неподтвержденных броней типа.
+
+    Брони расставляются заново жадно по дате заезда (длинные раньше),
+    каждая — в номер с лучшей оценкой. Возвращает список
+    (id брони, старый номер, новый номер) только если новая
+    расстановка менее раздроблена, чем текущая; иначе пустой список.
+    Вызывать внутри транзакции: переставляемые брони блокируются
+    """
+    movable = list(
+        Booking.objects.select_for_update(of=('self',)).filter(
+            room__room_type=room_type,
+            status__in=MOVABLE_STATUSES,
+            check_in_date__gte=start_date,
+        ).order_by('check_in_date', '-check_out_date', 'pk').values_list(
+            'id', 'room_id', 'check_in_date', 'check_out_date')
+    )
+    if not movable:
+        return []
+
+    end_date = max(check_out_date for *_, check_out_date in movable)
+    fixed = Occupancy.load(
+        room_type, start_date, end_date,
+        exclude=[booking_id for booking_id, *_ in movable])
+
+    current = fixed.copy()
+    for booking_id, room_id, check_in_date, check_out_date in movable:
+        current.add(room_id, check_in_date, check_out_date)
+
+    planned = fixed.copy()
+    changes = []
+    for booking_id, room_id, check_in_date, check_out_date in movable:
+        new_room_id = planned.best_room(check_in_date, check_out_date)
+        if new_room_id is None:
+            # Расстановка хуже текущей: кто-то остался без номера
+            return []
+        planned.add(new_room_id, check_in_date, check_out_date)
+        if new_room_id != room_id:
+            changes.append((booking_id, room_id, new_room_id))
+
+    if planned.fragmentation(start_date, end_date) \
+            >= current.fragmentation(start_date, end_date):
+        return []
+    return changes
+
+
+def apply_reassignment(changes):
+    """Применить перестановку одним bulk_update"""
+    if not changes:
+        return 0
+    now = timezone.now()
+    with transaction.atomic(using=hotel_database()):
+        bookings = Booking.objects.select_for_update().in_bulk(
+            [booking_id for booking_id, *_ in changes])
+        for booking_id, room_id, new_room_id in changes:
+            booking = bookings.get(booking_id)
+            if booking is None or booking.room_id != room_id \
+                    or booking.status not in MOVABLE_STATUSES:
+                raise AllocationConflict(
+                    f'Бронирование #{booking_id} изменилось')
+            booking.room_id = new_room_id
+            # bulk_update не заполняет auto_now
+            booking.updated_at = now
+        Booking.objects.bulk_update(
+            list(bookings.values()), ['room', 'updated_at'])
+    # bulk_update не отправляет post_save
+    bump_version(BOOKINGS)
+    publish_on_commit(saved=[booking_id for booking_id, *_ in changes])
+    return len(changes)
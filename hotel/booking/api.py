@@ -0,0 +1,349 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .archive import get_booking_or_archived
+from .availability import ACTIVE_STATUSES, build_price_calendar
+from .feed import InvalidWatermark, StaleWatermark, read_changes
+from .hotels import hotel_database
+from .idempotency import (
+    DuplicateSubmission, claim_submission, record_submission,
+    replayed_booking, submission_key,
+)
+from .models import ArchivedBooking, Booking, Room, RoomType
+from .quotes import cached_price_preview, issue_quote_token, quote_memo
+from .utils import price_stays
+from .serializers import (
+    AvailabilityRequestSerializer, BookingBulkSerializer,
+    BookingFilterSerializer, BookingListSerializer, BookingSerializer,
+    BookingUpdateSerializer, CalendarRequestSerializer,
+    GroupBookingSerializer, QuoteBatchSerializer, QuoteRequestSerializer,
+    RoomFilterSerializer, RoomSerializer, RoomTypeSerializer,
+    requested_fields,
+)
+
+
+class IdCursorPagination(CursorPagination):
+    """Курсор по первичному ключу: стабилен при вставках и индексирован"""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class BookingCursorPagination(IdCursorPagination):
+    ordering = '-id'
+
+
+class RoomTypeViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = RoomType.objects.all()
+    serializer_class = RoomTypeSerializer
+    pagination_class = IdCursorPagination
+
+
+class RoomViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = RoomSerializer
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        queryset = Room.objects.select_related('room_type')
+        params = self.request.query_params
+        filters = RoomFilterSerializer(data=params)
+        filters.is_valid(raise_exception=True)
+        if 'room_type' in filters.validated_data:
+            queryset = queryset.filter(
+                room_type_id=filters.validated_data['room_type'])
+        if params.get('is_available') in ('true', 'false'):
+            queryset = queryset.filter(
+                is_available=params['is_available'] == 'true')
+        return queryset
+
+
+class BookingViewSet(mixins.CreateModelMixin,
+                     mixins.UpdateModelMixin,
+                     viewsets.ReadOnlyModelViewSet):
+    """
+    Брони для интеграций: список отдается облегченным сериализатором,
+    связи подтягиваются только для запрошенных полей
+    """
+    pagination_class = BookingCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return BookingListSerializer
+        if self.action == 'bulk':
+            return BookingBulkSerializer
+        if self.action == 'group':
+            return GroupBookingSerializer
+        if self.action in ('update', 'partial_update'):
+            return BookingUpdateSerializer
+        return BookingSerializer
+
+    def get_queryset(self):
+        queryset = Booking.objects.all()
+        if self.action == 'list':
+            fields = requested_fields(self.request)
+            related = [
+                path for name, path in
+                BookingListSerializer.related_fields.items()
+                if fields is None or name in fields
+            ]
+            if related:
+                queryset = queryset.select_related(*related)
+        else:
+            queryset = queryset.select_related('client', 'room')
+
+        params = self.request.query_params
+        if params.get('status'):
+            queryset = queryset.filter(status__in=params['status'].split(','))
+        filters = BookingFilterSerializer(data=params)
+        filters.is_valid(raise_exception=True)
+        data = filters.validated_data
+        if 'room' in data:
+            queryset = queryset.filter(room_id=data['room'])
+        if 'check_in_from' in data:
+            queryset = queryset.filter(
+                check_in_date__gte=data['check_in_from'])
+        if 'check_in_to' in data:
+            queryset = queryset.filter(check_in_date__lte=data['check_in_to'])
+        return queryset
+
+    def get_object(self):
+        if self.action != 'retrieve':
+            return super().get_object()
+        # Чтение по id находит и перенесенные в архив брони
+        booking = get_booking_or_archived(
+            self.kwargs['pk'], self.get_queryset(),
+            ArchivedBooking.objects.select_related('client', 'room'))
+        self.check_object_permissions(self.request, booking)
+        return booking
+
+    def create(self, request, *args, **kwargs):
+        """
+        С заголовком Idempotency-Key повтор запроса получает бронь
+        первого, помеченную заголовком ответа Idempotent-Replayed
+        """
+        key = submission_key(request)
+        booking = replayed_booking(request.user, key) if key else None
+        replayed = booking is not None
+        if not replayed:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                with transaction.atomic(using=hotel_database()):
+                    submission = claim_submission(request.user, key)
+                    self.perform_create(serializer)
+                    booking = serializer.instance
+                    record_submission(submission, booking)
+            except DuplicateSubmission as duplicate:
+                if duplicate.booking is None:
+                    return Response(
+                        {'detail': str(duplicate)},
+                        status=status.HTTP_409_CONFLICT)
+                booking, replayed = duplicate.booking, True
+
+        data = self.get_serializer(booking).data
+        response = Response(
+            data, status=status.HTTP_201_CREATED,
+            headers=self.get_success_headers(data))
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Создать пакет броней одной транзакцией"""
+        serializer = self.get_serializer(
+            data=request.data, many=True,
+            max_length=settings.QUOTE_BATCH_MAX_SIZE)
+        serializer.is_valid(raise_exception=True)
+        bookings = serializer.save(created_by=request.user)
+        return Response(
+            BookingListSerializer(
+                bookings, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def group(self, request):
+        """Несколько номеров на общие даты: все брони или ни одной"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bookings = serializer.save(created_by=request.user)
+        return Response(
+            BookingListSerializer(
+                bookings, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED)
+
+
+class AvailabilityView(APIView):
+    """Свободные номера на период: один запрос с NOT EXISTS"""
+
+    def get(self, request):
+        params = AvailabilityRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        overlapping = Booking.objects.filter(
+            room=OuterRef('pk'),
+            status__in=ACTIVE_STATUSES,
+            check_in_date__lt=data['check_out'],
+            check_out_date__gt=data['check_in'],
+        )
+        rooms = Room.objects.filter(is_available=True).exclude(
+            Exists(overlapping)).select_related('room_type').order_by('number')
+        if 'room_type' in data:
+            rooms = rooms.filter(room_type_id=data['room_type'])
+        if 'category' in data:
+            rooms = rooms.filter(room_type__category=data['category'])
+        if 'capacity' in data:
+            rooms = rooms.filter(room_type__capacity=data['capacity'])
+
+        return Response({
+            'check_in': data['check_in'],
+            'check_out': data['check_out'],
+            'rooms': RoomSerializer(
+                rooms, many=True, context={'request': request}).data,
+        })
+
+
+class QuoteView(APIView):
+    """Расчет стоимости по номеру или типу номера"""
+
+    def get(self, request):
+        params = QuoteRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        price_data = cached_price_preview(
+            data['room_type'],
+            data['check_in'],
+            data['check_out'],
+            data['needs_child_bed'],
+        )
+        return Response({
+            'room_type': data['room_type'].pk,
+            'check_in': data['check_in'],
+            'check_out': data['check_out'],
+            'needs_child_bed': data['needs_child_bed'],
+            'total_price': str(price_data['total_price']),
+            'base_price': str(price_data['base_price']),
+            'surcharge': str(price_data['surcharge']),
+            'child_bed_price': str(price_data['child_bed_price']),
+            'nights': price_data['nights'],
+            'discount_percent': str(price_data['discount_percent']),
+            'discount_amount': str(price_data['discount_amount']),
+            'discount_name': price_data['discount_name'],
+            'quote_token': issue_quote_token(
+                data['room_type'].pk, data['check_in'], data['check_out'],
+                data['needs_child_bed'], price_data),
+        })
+
+
+class QuoteBatchView(APIView):
+    """
+    Расчет многих проживаний одним запросом: один снимок цен,
+    одно чтение загрузки, без токенов расчета
+    """
+
+    def post(self, request):
+        params = QuoteBatchSerializer(
+            data=request.data, many=True,
+            max_length=settings.QUOTE_BATCH_MAX_SIZE)
+        params.is_valid(raise_exception=True)
+        stays = params.validated_data
+
+        quotes = price_stays(
+            (item['room_type'], item['check_in'], item['check_out'],
+             item['needs_child_bed'])
+            for item in stays)
+        return Response([
+            {
+                'room_type': item['room_type'].pk,
+                'check_in': item['check_in'],
+                'check_out': item['check_out'],
+                'needs_child_bed': item['needs_child_bed'],
+                'total_price': str(price_data['total_price']),
+                'base_price': str(price_data['base_price']),
+                'surcharge': str(price_data['surcharge']),
+                'child_bed_price': str(price_data['child_bed_price']),
+                'nights': price_data['nights'],
+                'discount_percent': str(price_data['discount_percent']),
+                'discount_amount': str(price_data['discount_amount']),
+                'discount_name': price_data['discount_name'],
+                'adjustments': [
+                    dict(adjustment, amount=str(adjustment['amount']))
+                    for adjustment in price_data['adjustments']
+                ],
+            }
+            for item, price_data in zip(stays, quotes)
+        ])
+
+
+class QuoteStatsView(APIView):
+    """Счетчики кэша расчетов текущего процесса"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(quote_memo.stats())
+
+
+class CalendarView(APIView):
+    """
+    Календарь цен для выбора дат: цена и число свободных номеров
+    каждого типа на каждую ночь горизонта
+    """
+
+    def get(self, request):
+        params = CalendarRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        start_date = data.get('start') or timezone.now().date()
+        days = data.get('days') or settings.PRICE_HORIZON_DAYS
+
+        calendar = build_price_calendar(start_date, days)
+        if 'room_type' in data:
+            calendar = [
+                row for row in calendar
+                if row['room_type'] == data['room_type']
+            ]
+        return Response({
+            'start': start_date,
+            'days': days,
+            'room_types': calendar,
+        })
+
+
+class ChangeFeedView(APIView):
+    """
+    Изменения броней после отметки ?watermark= пачками до ?limit=.
+    Без отметки — выгрузка с начала; пока has_more, запрашивать
+    следующую пачку с новой отметкой
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit') or 0)
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число'})
+        try:
+            return Response(read_changes(
+                request.query_params.get('watermark'), max(limit, 0)))
+        except StaleWatermark as e:
+            # Удаления за этот период уже не хранятся: клиенту нужна
+            # полная выгрузка с пустой отметкой
+            return Response(
+                {'detail': str(e)}, status=status.HTTP_410_GONE)
+        except InvalidWatermark as e:
+            raise ValidationError({'watermark': str(e)})
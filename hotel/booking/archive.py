@@ -0,0 +1,84 @@
+"""
+Архив закрытых броней.
+
+Выехавшие и отмененные брони старше BOOKING_ARCHIVE_AFTER_DAYS
+переносятся пачками в ArchivedBooking с тем же первичным ключом.
+Рабочая таблица Booking остается небольшой, а страницы и отчеты
+находят архивную бронь по тому же id.
+"""
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .hotels import hotel_database
+from .models import ArchivedBooking, Booking
+
+CLOSED_STATUSES = ['checked_out', 'cancelled']
+
+# Удаления внутри archive_batch — перенос, а не удаление брони
+_archiving = ContextVar('archiving', default=False)
+
+# Поля, которые переносятся как есть
+ARCHIVED_FIELDS = [
+    field.attname for field in ArchivedBooking._meta.concrete_fields
+    if field.name != 'archived_at'
+]
+
+
+def archive_cutoff(days=None):
+    """Брони с выездом раньше этой даты можно архивировать"""
+    if days is None:
+        days = settings.BOOKING_ARCHIVE_AFTER_DAYS
+    return timezone.now().date() - timedelta(days=days)
+
+
+def archivable_bookings(cutoff):
+    return Booking.objects.filter(
+        status__in=CLOSED_STATUSES, check_out_date__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=1000):
+    """
+    Перенести одну пачку: вставка в архив и удаление из рабочей
+    таблицы в одной транзакции. Возвращает число перенесенных броней
+    """
+    with transaction.atomic(using=hotel_database()):
+        rows = list(
+            archivable_bookings(cutoff).select_for_update()
+            .order_by('pk').values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedBooking.objects.bulk_create(
+            [ArchivedBooking(**row) for row in rows])
+        token = _archiving.set(True)
+        try:
+            Booking.objects.filter(
+                pk__in=[row['id'] for row in rows]).delete()
+        finally:
+            _archiving.reset(token)
+    return len(rows)
+
+
+def is_archiving():
+    """Идет ли сейчас перенос броней в архив"""
+    return _archiving.get()
+
+
+def get_booking_or_archived(pk, queryset=None, archived_queryset=None):
+    """Бронь из рабочей таблицы, иначе из архива, иначе 404"""
+    if queryset is None:
+        queryset = Booking.objects.all()
+    booking = queryset.filter(pk=pk).first()
+    if booking is not None:
+        return booking
+    if archived_queryset is None:
+        archived_queryset = ArchivedBooking.objects.all()
+    booking = archived_queryset.filter(pk=pk).first()
+    if booking is None:
+        raise Http404('Бронирование не найдено')
+    return booking
@@ -0,0 +1,133 @@
+"""
+Проверка целостности броней.
+
+Брони читаются потоком, без загрузки таблицы в память:
+
+- пересечения — активные брони по порядку (номер, заезд) и заметающая
+  прямая: в куче лежат выезды броней текущего номера, которые еще
+  не закончились к заезду очередной брони. Время O(n log n), память —
+  по числу одновременно пересекающихся броней одного номера;
+- состояния — статус против фактических отметок заезда и выезда;
+- стоимость — total_price против пересчета по текущему снимку цен
+  со сроком до заезда от даты создания брони. История цен не хранится:
+  брони, созданные до изменения цен, разойдутся с пересчетом, поэтому
+  since ограничивает сверку бронями, созданными не раньше этой даты
+  (например, дня последнего изменения цен). Наценку за загрузку
+  задним числом не восстановить, поэтому типы с такими правилами
+  не сверяются.
+
+Каждая функция выдает находки по одной: (вид, id брони, номер, описание).
+"""
+import heapq
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone
+
+from .availability import ACTIVE_STATUSES
+from .models import Booking
+from .pricing import get_resolver
+
+# Какие фактические отметки обязательны и какие запрещены при статусе
+REQUIRED_MARKS = {
+    'checked_in': ['actual_check_in'],
+    'checked_out': ['actual_check_in', 'actual_check_out'],
+}
+FORBIDDEN_MARKS = {
+    'pending': ['actual_check_in', 'actual_check_out'],
+    'confirmed': ['actual_check_in', 'actual_check_out'],
+    'checked_in': ['actual_check_out'],
+}
+
+MARK_LABELS = {
+    'actual_check_in': 'фактического заезда',
+    'actual_check_out': 'фактического выезда',
+}
+
+CHUNK_SIZE = 2000
+
+
+def find_overlaps(chunk_size=CHUNK_SIZE):
+    """Пересечения активных броней одного номера"""
+    bookings = Booking.objects.filter(
+        status__in=ACTIVE_STATUSES,
+    ).order_by('room_id', 'check_in_date', 'id').values_list(
+        'id', 'room_id', 'room__number', 'check_in_date', 'check_out_date')
+
+    current_room = None
+    active = []
+    for booking_id, room_id, number, check_in_date, check_out_date in \
+            bookings.iterator(chunk_size=chunk_size):
+        if room_id != current_room:
+            current_room = room_id
+            active = []
+        # Брони, выехавшие к этому заезду, больше ни с кем не пересекутся
+        while active and active[0][0] <= check_in_date:
+            heapq.heappop(active)
+        for end, other_id in sorted(active):
+            yield (
+                'overlap', booking_id, number,
+                f'пересекается с бронью №{other_id} '
+                f'до {end:%d.%m.%Y}')
+        heapq.heappush(active, (check_out_date, booking_id))
+
+
+def find_state_errors(chunk_size=CHUNK_SIZE):
+    """Статусы, не согласованные с датами и фактическими отметками"""
+    bookings = Booking.objects.order_by('id').values_list(
+        'id', 'room__number', 'status', 'check_in_date', 'check_out_date',
+        'actual_check_in', 'actual_check_out')
+
+    for (booking_id, number, status, check_in_date, check_out_date,
+         actual_check_in, actual_check_out) in \
+            bookings.iterator(chunk_size=chunk_size):
+        marks = {
+            'actual_check_in': actual_check_in,
+            'actual_check_out': actual_check_out,
+        }
+        if check_out_date <= check_in_date:
+            yield ('dates', booking_id, number,
+                   'дата выезда не позже даты заезда')
+        for mark in REQUIRED_MARKS.get(status, []):
+            if marks[mark] is None:
+                yield ('state', booking_id, number,
+                       f'статус {status} без {MARK_LABELS[mark]}')
+        for mark in FORBIDDEN_MARKS.get(status, []):
+            if marks[mark] is not None:
+                yield ('state', booking_id, number,
+                       f'статус {status} с отметкой {MARK_LABELS[mark]}')
+        if actual_check_in and actual_check_out \
+                and actual_check_out < actual_check_in:
+            yield ('state', booking_id, number,
+                   'фактический выезд раньше фактического заезда')
+
+
+def find_price_mismatches(tolerance=Decimal('0.01'), chunk_size=CHUNK_SIZE,
+                          since=None):
+    """
+    Стоимость, расходящаяся с пересчетом больше чем на tolerance;
+    since — дата, с которой созданные брони рассчитаны по текущим ценам
+    """
+    resolver = get_resolver()
+    bookings = Booking.objects.exclude(status='cancelled').filter(
+        check_out_date__gt=F('check_in_date'),
+    )
+    if since is not None:
+        bookings = bookings.filter(created_at__gte=timezone.make_aware(
+            datetime.combine(since, time.min)))
+    bookings = bookings.order_by('id').values_list(
+        'id', 'room__number', 'room__room_type_id', 'check_in_date',
+        'check_out_date', 'needs_child_bed', 'total_price', 'created_at')
+
+    for (booking_id, number, room_type_id, check_in_date, check_out_date,
+         needs_child_bed, total_price, created_at) in \
+            bookings.iterator(chunk_size=chunk_size):
+        if resolver.uses_occupancy(room_type_id):
+            continue
+        expected = resolver.quote(
+            room_type_id, check_in_date, check_out_date, needs_child_bed,
+            today=timezone.localdate(created_at))['total_price']
+        if abs(expected - total_price) > tolerance:
+            yield ('price', booking_id, number,
+                   f'стоимость {total_price}, по текущим ценам {expected}')
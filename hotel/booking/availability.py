@@ -0,0 +1,247 @@
+"""
+Наличие номеров по типам и ночам.
+
+Занятость хранится в счетчиках RoomTypeAvailability: тип номера и ночь ->
+сколько номеров занято активными бронями. Счетчики сдвигаются при каждом
+изменении брони, поэтому проверка типа на весь период — одно чтение
+по индексу. Исходный расчет (разностный массив по броням окна)
+используется для пересборки и сверки счетчиков.
+
+Счетчики ведутся по типам номеров, а типы принадлежат гостиницам,
+поэтому расчеты здесь читают брони и номера всех гостиниц базы
+(менеджер all_hotels); отбор по гостинице — по ее типам номеров.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Min, Max
+
+from .hotels import get_current_hotel, hotel_database, hotel_key
+from .models import Booking, Room, RoomTypeAvailability
+from .pricing import get_resolver
+from .versions import BOOKINGS, CATALOG, PRICING, get_version, get_versions
+
+ACTIVE_STATUSES = ['confirmed', 'checked_in']
+
+
+def rooms_per_type():
+    """Количество продаваемых номеров каждого типа"""
+    key = 'booking:rooms_per_type:%s:%s' % (
+        hotel_database(), get_version(CATALOG))
+    totals = cache.get(key)
+    if totals is None:
+        totals = dict(
+            Room.all_hotels.filter(is_available=True)
+            .values('room_type_id').annotate(total=Count('id'))
+            .values_list('room_type_id', 'total')
+        )
+        cache.set(key, totals, settings.FRAGMENT_CACHE_TIMEOUT)
+    return totals
+
+
+def nightly_occupancy(start_date, days, room_type_ids=None):
+    """{тип номера: [занято номеров на каждую ночь окна]}"""
+    end_date = start_date + timedelta(days=days)
+    bookings = Booking.all_hotels.filter(
+        status__in=ACTIVE_STATUSES,
+        room__is_available=True,
+        check_in_date__lt=end_date,
+        check_out_date__gt=start_date,
+    )
+    if room_type_ids is not None:
+        bookings = bookings.filter(room__room_type_id__in=room_type_ids)
+    bookings = bookings.values_list(
+        'room__room_type_id', 'check_in_date', 'check_out_date')
+
+    deltas = {}
+    for room_type_id, check_in_date, check_out_date in bookings.iterator():
+        delta = deltas.setdefault(room_type_id, [0] * (days + 1))
+        delta[max((check_in_date - start_date).days, 0)] += 1
+        delta[min((check_out_date - start_date).days, days)] -= 1
+
+    occupancy = {}
+    for room_type_id, delta in deltas.items():
+        running = 0
+        nights = []
+        for value in delta[:days]:
+            running += value
+            nights.append(running)
+        occupancy[room_type_id] = nights
+    return occupancy
+
+
+def counted_stay(booking_id):
+    """
+    (тип номера, заезд, выезд) брони, если она учтена в счетчиках:
+    активный статус и продаваемый номер. Иначе None
+    """
+    return Booking.all_hotels.filter(
+        pk=booking_id,
+        status__in=ACTIVE_STATUSES,
+        room__is_available=True,
+    ).values_list(
+        'room__room_type_id', 'check_in_date', 'check_out_date').first()
+
+
+def shift_counters(stays, delta):
+    """
+    Сдвинуть счетчики на delta для каждой ночи каждого проживания.
+    stays: (тип номера, заезд, выезд). Обновление через F(),
+    поэтому параллельные изменения не теряются
+    """
+    with transaction.atomic(using=hotel_database()):
+        for room_type_id, check_in_date, check_out_date in stays:
+            if delta > 0:
+                RoomTypeAvailability.objects.bulk_create([
+                    RoomTypeAvailability(
+                        room_type_id=room_type_id,
+                        date=check_in_date + timedelta(days=night))
+                    for night in range(
+                        (check_out_date - check_in_date).days)
+                ], ignore_conflicts=True)
+            RoomTypeAvailability.objects.filter(
+                room_type_id=room_type_id,
+                date__gte=check_in_date,
+                date__lt=check_out_date,
+            ).update(booked=F('booked') + delta)
+
+
+def expected_counters(room_type_ids=None):
+    """{(тип номера, ночь): занято} по самим броням"""
+    bookings = Booking.all_hotels.filter(
+        status__in=ACTIVE_STATUSES, room__is_available=True)
+    if room_type_ids is not None:
+        bookings = bookings.filter(room__room_type_id__in=room_type_ids)
+    bounds = bookings.aggregate(
+        start=Min('check_in_date'), end=Max('check_out_date'))
+    if bounds['start'] is None:
+        return {}
+
+    days = (bounds['end'] - bounds['start']).days
+    counters = {}
+    for room_type_id, nights in nightly_occupancy(
+            bounds['start'], days, room_type_ids).items():
+        for day, booked in enumerate(nights):
+            if booked:
+                date = bounds['start'] + timedelta(days=day)
+                counters[room_type_id, date] = booked
+    return counters
+
+
+def rebuild_counters(room_type_ids=None):
+    """Пересобрать счетчики типов (по умолчанию всех) с нуля"""
+    counters = expected_counters(room_type_ids)
+    with transaction.atomic(using=hotel_database()):
+        stale = RoomTypeAvailability.objects.all()
+        if room_type_ids is not None:
+            stale = stale.filter(room_type_id__in=room_type_ids)
+        stale.delete()
+        RoomTypeAvailability.objects.bulk_create([
+            RoomTypeAvailability(
+                room_type_id=room_type_id, date=date, booked=booked)
+            for (room_type_id, date), booked in counters.items()
+        ], batch_size=1000)
+    return len(counters)
+
+
+def verify_counters(room_type_ids=None):
+    """Расхождения счетчиков: [(тип номера, ночь, ожидается, записано)]"""
+    expected = expected_counters(room_type_ids)
+    stored = RoomTypeAvailability.objects.exclude(booked=0)
+    if room_type_ids is not None:
+        stored = stored.filter(room_type_id__in=room_type_ids)
+    actual = {
+        (room_type_id, date): booked for room_type_id, date, booked
+        in stored.values_list('room_type_id', 'date', 'booked').iterator()
+    }
+    return sorted(
+        (room_type_id, date, expected.get((room_type_id, date), 0),
+         actual.get((room_type_id, date), 0))
+        for room_type_id, date in expected.keys() | actual.keys()
+        if expected.get((room_type_id, date)) !=
+        actual.get((room_type_id, date))
+    )
+
+
+def is_type_available(room_type, check_in_date, check_out_date, rooms=1):
+    """
+    Есть ли rooms свободных номеров типа на каждую ночь периода.
+    Одно чтение по индексу (тип номера, ночь)
+    """
+    room_type_id = getattr(room_type, 'pk', room_type)
+    total = rooms_per_type().get(room_type_id, 0)
+    if total < rooms:
+        return False
+    return not RoomTypeAvailability.objects.filter(
+        room_type_id=room_type_id,
+        date__gte=check_in_date,
+        date__lt=check_out_date,
+        booked__gt=total - rooms,
+    ).exists()
+
+
+def counted_occupancy(start_date, days, room_type_ids=None):
+    """{тип номера: [занято номеров на каждую ночь окна]} из счетчиков"""
+    counters = RoomTypeAvailability.objects.filter(
+        date__gte=start_date,
+        date__lt=start_date + timedelta(days=days),
+    ).exclude(booked=0)
+    if room_type_ids is not None:
+        counters = counters.filter(room_type_id__in=room_type_ids)
+    occupancy = {}
+    for room_type_id, date, booked in counters.values_list(
+            'room_type_id', 'date', 'booked'):
+        nights = occupancy.setdefault(room_type_id, [0] * days)
+        nights[(date - start_date).days] = booked
+    return occupancy
+
+
+def occupancy_ratios(occupied, total, offset, nights):
+    """Доли занятых номеров типа на ночи [offset, offset + nights)"""
+    if occupied is None or not total:
+        return [Decimal(0)] * nights
+    return [
+        Decimal(taken) / total for taken in occupied[offset:offset + nights]
+    ]
+
+
+def build_price_calendar(start_date, days):
+    """
+    Цены и количество свободных номеров по ночам для типов текущей
+    гостиницы. Результат кэшируется до смены версии цен или броней
+    """
+    key = 'booking:calendar:%s:%s:%s:%s:%d' % (
+        hotel_key(), *get_versions(PRICING, BOOKINGS),
+        start_date.isoformat(), days)
+    calendar = cache.get(key)
+    if calendar is not None:
+        return calendar
+
+    resolver = get_resolver()
+    totals = rooms_per_type()
+    occupancy = counted_occupancy(start_date, days)
+    end_date = start_date + timedelta(days=days)
+    hotel = get_current_hotel()
+
+    calendar = []
+    for room_type_id in sorted(resolver.room_types):
+        if hotel is not None and resolver.hotels[room_type_id] != hotel.pk:
+            continue
+        total = totals.get(room_type_id, 0)
+        occupied = occupancy.get(room_type_id, [0] * days)
+        calendar.append({
+            'room_type': room_type_id,
+            'rooms': total,
+            'prices': [
+                float(price) for price in resolver.surcharged_prices(
+                    room_type_id, start_date, end_date,
+                    occupancy_ratios(occupied, total, 0, days))
+            ],
+            'available': [max(total - taken, 0) for taken in occupied],
+        })
+
+    cache.set(key, calendar, settings.FRAGMENT_CACHE_TIMEOUT)
+    return calendar
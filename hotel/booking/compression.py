@@ -0,0 +1,155 @@
+"""
+Сжатие статики и ответов.
+
+collectstatic складывает файлы с хешем содержимого в имени и рядом —
+заранее сжатые копии .gz (и .br, если установлен пакет brotli).
+serve_static отдает готовую сжатую копию по Accept-Encoding, а файлы
+с хешем — с кэшированием на год: при изменении меняется имя.
+HTML и JSON страниц сжимает ResponseCompressionMiddleware.
+"""
+import gzip
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Уже сжатые форматы (картинки, шрифты woff2) повторно не сжимаются
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt',
+    '.xml', '.ico', '.ttf', '.eot', '.otf',
+}
+
+# Сжимать файлы меньше этого размера нет смысла
+MIN_COMPRESS_SIZE = 256
+
+# Кэш для файлов с хешем в имени
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Предпочтение: сначала brotli, затем gzip
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Имя с хешем, который ManifestStaticFilesStorage вставляет перед
+# расширением: app.3f2a9c1b7d4e.css
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Ответы, которые стоит сжимать на лету; картинки и архивы уже сжаты
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+
+def _accepts(request, encoding):
+    accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return re.search(rf'\b{encoding}\b', accept) is not None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хешами плюс сжатые копии сжимаемых файлов"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Сжатые копии — побочный результат: в счетчик collectstatic
+        # они не попадают
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            self.compress(name)
+
+    def compress(self, name):
+        """Записать .gz и .br рядом с файлом, если они меньше оригинала"""
+        if Path(name).suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+            return []
+        path = Path(self.path(name))
+        if not path.is_file():
+            return []
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+
+        written = []
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                path.with_name(path.name + suffix).write_bytes(compressed)
+                written.append(name + suffix)
+        return written
+
+
+def serve_static(request, path):
+    """
+    Статика из STATIC_ROOT со сжатой копией и кэшированием.
+    Для установок без отдельного веб-сервера перед приложением
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not fullpath.is_file():
+        raise Http404('Файл не найден')
+
+    stat = fullpath.stat()
+    if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    content_type, _ = mimetypes.guess_type(str(fullpath))
+    served, encoding = fullpath, None
+    for name, suffix in ENCODINGS:
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if _accepts(request, name) and variant.is_file():
+            served, encoding = variant, name
+            break
+
+    response = FileResponse(
+        served.open('rb'), filename=fullpath.name,
+        content_type=content_type or 'application/octet-stream')
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if Path(fullpath.name).suffix in COMPRESSIBLE_EXTENSIONS:
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+    if HASHED_NAME_RE.search(path):
+        response.headers['Cache-Control'] = \
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        # Имя без хеша может указывать на новое содержимое
+        response.headers['Cache-Control'] = \
+            f'public, max-age={settings.STATIC_MAX_AGE}'
+    return response
+
+
+class ResponseCompressionMiddleware(GZipMiddleware):
+    """
+    GZip для текстовых ответов, включая потоковые. Поток событий
+    панели не сжимается: gzip копит данные в буфере и задерживал бы
+    события, а асинхронный поток сжимается кусками несовместимо
+    с EventSource
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith('text/event-stream') or \
+                not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,163 @@
+"""
+Журнал изменений броней для живой панели управления.
+
+Каждое зафиксированное изменение получает порядковый номер
+(cache.incr) и кладется в кэш вместе с готовыми строками броней,
+поэтому строки читаются из базы один раз — при записи, а не
+на каждое открытое соединение. Соединения ждут изменений через
+общий для процесса наблюдатель: он читает номер последнего события
+раз в EVENTS_POLL_INTERVAL секунд и будит всех ожидающих.
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .hotels import hotel_database
+from .models import Booking
+
+SEQ_KEY = 'booking:events:seq'
+EVENT_KEY = 'booking:events:%d'
+
+# Сколько событий отдается за раз; отставшему клиенту — reset
+MAX_BATCH = 200
+
+
+def event_rows(booking_ids):
+    """
+    Строки броней в виде для панели управления. Событие общее
+    для всех гостиниц, соединение отбирает строки своей по hotel
+    """
+    bookings = Booking.all_hotels.filter(pk__in=booking_ids).select_related(
+        'client', 'room')
+    return [
+        {
+            'id': booking.pk,
+            'hotel': booking.hotel_id,
+            'status': booking.status,
+            'status_display': booking.get_status_display(),
+            'client': f'{booking.client.first_name} '
+                      f'{booking.client.last_name}',
+            'room': booking.room.number,
+            'check_in_date': booking.check_in_date.isoformat(),
+            'check_out_date': booking.check_out_date.isoformat(),
+            'nights': booking.nights,
+        }
+        for booking in bookings
+    ]
+
+
+def current_seq():
+    return cache.get(SEQ_KEY) or 0
+
+
+def _next_seq():
+    # add не перезапишет счетчик, если другой процесс уже создал его
+    cache.add(SEQ_KEY, 0, None)
+    try:
+        return cache.incr(SEQ_KEY)
+    except ValueError:
+        # Ключ вытеснен между add и incr
+        cache.add(SEQ_KEY, 0, None)
+        return cache.incr(SEQ_KEY)
+
+
+def publish(saved=(), created=(), deleted=()):
+    """
+    Записать событие: измененные, созданные и удаленные брони.
+    Удаленные — пары (гостиница, id): в разных базах гостиниц
+    id броней повторяются
+    """
+    created = set(created)
+    saved = set(saved) | created
+    rows = event_rows(saved) if saved else []
+    for row in rows:
+        row['created'] = row['id'] in created
+    seq = _next_seq()
+    cache.set(EVENT_KEY % seq, {
+        'seq': seq,
+        'bookings': rows,
+        'deleted': sorted(tuple(pair) for pair in deleted),
+    }, settings.EVENTS_TTL)
+    return seq
+
+
+def publish_on_commit(saved=(), created=(), deleted=()):
+    """Событие уходит только после фиксации транзакции"""
+    saved, created, deleted = list(saved), list(created), list(deleted)
+    transaction.on_commit(
+        lambda: publish(saved, created, deleted), using=hotel_database())
+
+
+async def aevents_since(cursor):
+    """
+    События после cursor: (события, последний номер, полный ли ответ).
+    Неполный ответ — часть событий вытеснена или их слишком много,
+    клиенту нужно перечитать страницу целиком
+    """
+    seq = await cache.aget(SEQ_KEY) or 0
+    if seq <= cursor:
+        return [], seq, True
+    if seq - cursor > MAX_BATCH or cursor < 0:
+        return [], seq, False
+    keys = [EVENT_KEY % number for number in range(cursor + 1, seq + 1)]
+    found = await cache.aget_many(keys)
+    events = [found[key] for key in keys if key in found]
+    return events, seq, len(events) == len(keys)
+
+
+class EventWatcher:
+    """
+    Один опрос кэша на процесс, сколько бы соединений ни ждали.
+    Привязан к текущему циклу событий и пересоздается при его смене
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.seq = None
+        self.changed = None
+        self.listeners = 0
+        self.task = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.seq = None
+            self.changed = asyncio.Event()
+            self.task = None
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self._poll())
+
+    async def _poll(self):
+        while self.listeners:
+            seq = await cache.aget(SEQ_KEY) or 0
+            if seq != self.seq:
+                self.seq = seq
+                changed, self.changed = self.changed, asyncio.Event()
+                changed.set()
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+
+    async def wait(self, cursor, timeout):
+        """Дождаться события новее cursor или таймаута"""
+        self._bind()
+        deadline = self.loop.time() + timeout
+        # Первое чтение номера тоже будит ожидающих — ждем дальше,
+        # пока номер не обгонит cursor
+        while self.seq is None or self.seq <= cursor:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return
+            changed = self.changed
+            self.listeners += 1
+            try:
+                self._bind()
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+            finally:
+                self.listeners -= 1
+
+
+watcher = EventWatcher()
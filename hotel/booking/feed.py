@@ -0,0 +1,152 @@
+"""
+Лента изменений броней для внешней синхронизации.
+
+Клиент хранит отметку — последнюю прочитанную пару (updated_at, id)
+для броней и (deleted_at, id) для записей об удалении — и получает
+только то, что изменилось после нее. Лента своя у каждой гостиницы:
+оба чтения идут по индексам booking_updated_idx
+и deleted_booking_feed_idx (гостиница, время, id) диапазоном,
+без полного просмотра таблиц.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Booking, DeletedBooking
+
+FEED_FIELDS = [
+    'id', 'client_id', 'room_id', 'check_in_date', 'check_out_date',
+    'actual_check_in', 'actual_check_out', 'needs_child_bed',
+    'total_price', 'discount_applied_id', 'status', 'notes',
+    'created_by_id', 'created_at', 'updated_at',
+]
+
+
+class InvalidWatermark(ValueError):
+    """Отметка повреждена или выдана не этой лентой"""
+
+
+class StaleWatermark(InvalidWatermark):
+    """
+    Отметка старше срока хранения записей об удалении:
+    часть удалений потеряна, нужна полная выгрузка
+    """
+
+
+def encode_watermark(changed, deleted):
+    """Отметка из двух пар (время, id); None — с самого начала"""
+    data = {
+        'changed': _encode_position(changed),
+        'deleted': _encode_position(deleted),
+    }
+    return base64.urlsafe_b64encode(
+        json.dumps(data, separators=(',', ':')).encode()).decode()
+
+
+def decode_watermark(value):
+    """(позиция броней, позиция удалений); пустая отметка — начало"""
+    if not value:
+        return None, None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value.encode()))
+        return (_decode_position(data['changed']),
+                _decode_position(data['deleted']))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidWatermark('Некорректная отметка ленты') from e
+
+
+def _encode_position(position):
+    if position is None:
+        return None
+    moment, pk = position
+    return [moment.isoformat(), pk]
+
+
+def _decode_position(value):
+    if value is None:
+        return None
+    moment, pk = value
+    moment = datetime.fromisoformat(moment)
+    if timezone.is_naive(moment) or not isinstance(pk, int):
+        raise ValueError(value)
+    return moment, pk
+
+
+def _after(queryset, field, position):
+    """Строки строго после позиции: диапазон по (field, id)"""
+    if position is None:
+        return queryset
+    moment, pk = position
+    # >= и исключение равных — одно сравнение по ведущему столбцу
+    # индекса, которое база читает диапазоном
+    return queryset.filter(**{f'{field}__gte': moment}).exclude(
+        Q(**{field: moment}) & Q(pk__lte=pk))
+
+
+def read_changes(watermark=None, limit=None):
+    """
+    Пачка изменений после отметки: changed, deleted, новая watermark
+    и has_more — есть ли еще изменения за горизонтом пачки.
+
+    Измененные брони отдаются целиком, удаленные — только id.
+    Удаленная бронь больше не попадает в changed, поэтому клиент
+    применяет сначала changed, потом deleted
+    """
+    limit = min(limit or settings.CHANGE_FEED_MAX_BATCH,
+                settings.CHANGE_FEED_MAX_BATCH)
+    changed_position, deleted_position = decode_watermark(watermark)
+    now = timezone.now()
+    if deleted_position is not None and deleted_position[0] < now - \
+            timedelta(days=settings.CHANGE_FEED_TOMBSTONE_DAYS):
+        raise StaleWatermark('Отметка старше срока хранения удалений')
+    # Самые свежие строки могут еще догоняться незафиксированными
+    # транзакциями с более ранним временем — их отдадим позже
+    horizon = now - timedelta(seconds=settings.CHANGE_FEED_LAG_SECONDS)
+
+    changed = list(
+        _after(Booking.objects.filter(updated_at__lt=horizon),
+               'updated_at', changed_position)
+        .order_by('updated_at', 'id').values(*FEED_FIELDS)[:limit + 1]
+    )
+    deleted = list(
+        _after(DeletedBooking.objects.filter(deleted_at__lt=horizon),
+               'deleted_at', deleted_position)
+        .order_by('deleted_at', 'id')
+        .values('id', 'booking_id', 'deleted_at')[:limit + 1]
+    )
+    changed_more, deleted_more = len(changed) > limit, len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    # Прочитанный до конца поток сдвигается к горизонту, чтобы отметка
+    # не старела, пока изменений нет
+    if changed_more:
+        changed_position = changed[-1]['updated_at'], changed[-1]['id']
+    else:
+        changed_position = horizon, 0
+    if deleted_more:
+        deleted_position = deleted[-1]['deleted_at'], deleted[-1]['id']
+    else:
+        deleted_position = horizon, 0
+    return {
+        'changed': changed,
+        'deleted': [
+            {'id': row['booking_id'], 'deleted_at': row['deleted_at']}
+            for row in deleted
+        ],
+        'watermark': encode_watermark(changed_position, deleted_position),
+        'has_more': changed_more or deleted_more,
+    }
+
+
+def purge_deleted(days=None):
+    """Удалить старые записи об удалении; возвращает их число"""
+    if days is None:
+        days = settings.CHANGE_FEED_TOMBSTONE_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = DeletedBooking.objects.filter(
+        deleted_at__lt=cutoff).delete()
+    return deleted
@@ -1,7 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from .models import Booking, Client
+from .allocation import allocate_room
+from .availability import is_type_available
+from .models import Booking, Client, Room, RoomType, WaitlistEntry
+from .utils import is_room_available
 
 
 class ClientForm(forms.ModelForm):
@@ -56,18 +59,148 @@ class BookingForm(forms.ModelForm):
 
             # Проверка доступности номера
             if room and check_in_date and check_out_date:
-                overlapping_bookings = Booking.objects.filter(
-                    room=room,
-                    status__in=['confirmed', 'checked_in'],
-                    check_in_date__lt=check_out_date,
-                    check_out_date__gt=check_in_date
-                )
-                if self.instance.pk:
-                    overlapping_bookings = overlapping_bookings.exclude(
-                        pk=self.instance.pk)
-
-                if overlapping_bookings.exists():
+                if not is_room_available(room, check_in_date,
+                                         check_out_date,
+                                         exclude=self.instance.pk):
                     raise ValidationError(
                         'Номер уже забронирован на выбранные даты')
 
         return cleaned_data
+
+
+class AutoAssignBookingForm(BookingForm):
+    """Бронирование по типу номера: номер подбирается автоматически"""
+    room_type = forms.ModelChoiceField(
+        queryset=RoomType.objects.all(),
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Тип номера'
+    )
+
+    class Meta(BookingForm.Meta):
+        fields = ['room_type', 'check_in_date',
+                  'check_out_date', 'needs_child_bed', 'notes']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        room_type = cleaned_data.get('room_type')
+        check_in_date = cleaned_data.get('check_in_date')
+        check_out_date = cleaned_data.get('check_out_date')
+
+        if room_type and check_in_date and check_out_date:
+            # Быстрый отказ по счетчикам типа, без загрузки броней
+            room = None
+            if is_type_available(room_type, check_in_date, check_out_date):
+                room = allocate_room(
+                    room_type, check_in_date, check_out_date)
+            if room is None:
+                raise ValidationError(
+                    'Нет свободных номеров этого типа на выбранные даты')
+            self.instance.room = room
+
+        return cleaned_data
+
+
+class GroupBookingForm(forms.Form):
+    """Несколько номеров на общие даты для одного клиента"""
+    rooms = forms.ModelMultipleChoiceField(
+        queryset=Room.objects.filter(is_available=True)
+        .select_related('room_type').order_by('number'),
+        widget=forms.SelectMultiple(
+            attrs={'class': 'form-select', 'size': 12}),
+        label='Номера'
+    )
+    child_bed_rooms = forms.ModelMultipleChoiceField(
+        queryset=Room.objects.filter(is_available=True).order_by('number'),
+        required=False,
+        widget=forms.SelectMultiple(
+            attrs={'class': 'form-select', 'size': 6}),
+        label='Номера с детской кроватью'
+    )
+    check_in_date = forms.DateField(
+        widget=forms.DateInput(
+            attrs={'type': 'date', 'class': 'form-control'}),
+        label='Дата заезда'
+    )
+    check_out_date = forms.DateField(
+        widget=forms.DateInput(
+            attrs={'type': 'date', 'class': 'form-control'}),
+        label='Дата выезда'
+    )
+    notes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+        label='Примечания'
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in_date = cleaned_data.get('check_in_date')
+        check_out_date = cleaned_data.get('check_out_date')
+        rooms = cleaned_data.get('rooms')
+        child_bed_rooms = cleaned_data.get('child_bed_rooms')
+
+        if check_in_date and check_out_date:
+            if check_in_date < timezone.now().date():
+                raise ValidationError('Дата заезда не может быть в прошлом')
+
+            if check_out_date <= check_in_date:
+                raise ValidationError(
+                    'Дата выезда должна быть после даты заезда')
+
+        if rooms is not None and child_bed_rooms:
+            extra = set(child_bed_rooms) - set(rooms)
+            if extra:
+                raise ValidationError(
+                    'Детская кровать указана для номеров вне группы: '
+                    + ', '.join(sorted(room.number for room in extra)))
+
+        return cleaned_data
+
+
+class WaitlistEntryForm(forms.ModelForm):
+    """Запрос в лист ожидания на тип номера и даты"""
+    check_in_date = forms.DateField(
+        widget=forms.DateInput(
+            attrs={'type': 'date', 'class': 'form-control'}),
+        label='Дата заезда'
+    )
+    check_out_date = forms.DateField(
+        widget=forms.DateInput(
+            attrs={'type': 'date', 'class': 'form-control'}),
+        label='Дата выезда'
+    )
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['room_type', 'check_in_date', 'check_out_date',
+                  'needs_child_bed', 'notes']
+        widgets = {
+            'room_type':
+                forms.Select(attrs={'class': 'form-select'}),
+            'needs_child_bed':
+                forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'notes':
+                forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in_date = cleaned_data.get('check_in_date')
+        check_out_date = cleaned_data.get('check_out_date')
+        room_type = cleaned_data.get('room_type')
+
+        if check_in_date and check_out_date:
+            if check_in_date < timezone.now().date():
+                raise ValidationError('Дата заезда не может быть в прошлом')
+
+            if check_out_date <= check_in_date:
+                raise ValidationError(
+                    'Дата выезда должна быть после даты заезда')
+
+            if room_type and is_type_available(
+                    room_type, check_in_date, check_out_date):
+                raise ValidationError(
+                    'На эти даты есть свободные номера этого типа — '
+                    'оформите бронирование')
+
+        return cleaned_data
@@ -0,0 +1,145 @@
+"""
+Шахматка номеров: номера по строкам, дни по столбцам.
+
+Все брони окна загружаются одним запросом и раскладываются
+в компактный массив дней для каждого номера.
+"""
+from datetime import timedelta
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Booking, Room
+
+GRID_DEFAULT_DAYS = 30
+GRID_MAX_DAYS = 90
+
+GRID_STATUSES = ['pending', 'confirmed', 'checked_in', 'checked_out']
+
+# Активная бронь важнее ожидающей, если они пересеклись
+STATUS_WEIGHT = {
+    'pending': 1,
+    'checked_out': 2,
+    'confirmed': 3,
+    'checked_in': 4,
+}
+
+
+def build_room_grid(start_date, days):
+    """
+    Возвращает словарь:
+    rooms — номера по порядку строк,
+    bookings — брони окна,
+    cells — для каждого номера список длины days: 0 — свободно,
+    иначе порядковый номер брони в bookings, начиная с 1
+    """
+    end_date = start_date + timedelta(days=days)
+
+    rooms = list(
+        Room.objects.order_by('floor', 'number').values_list(
+            'id', 'number', 'floor', 'is_available',
+            'room_type__category', 'room_type__capacity')
+    )
+    row_of = {room[0]: row for row, room in enumerate(rooms)}
+    cells = [[0] * days for _ in rooms]
+
+    bookings = []
+    weights = []
+    queryset = Booking.objects.filter(
+        status__in=GRID_STATUSES,
+        check_in_date__lt=end_date,
+        check_out_date__gt=start_date,
+    ).order_by('check_in_date').values_list(
+        'id', 'room_id', 'check_in_date', 'check_out_date', 'status',
+        'client__last_name')
+
+    for (booking_id, room_id, check_in_date, check_out_date, status,
+         last_name) in queryset.iterator():
+        row = cells[row_of[room_id]]
+        bookings.append({
+            'id': booking_id,
+            'status': status,
+            'guest': last_name,
+            'check_in': check_in_date,
+            'check_out': check_out_date,
+        })
+        weight = STATUS_WEIGHT[status]
+        weights.append(weight)
+        number = len(bookings)
+        first = max((check_in_date - start_date).days, 0)
+        last = min((check_out_date - start_date).days, days)
+        for day in range(first, last):
+            current = row[day]
+            if current == 0 or weights[current - 1] < weight:
+                row[day] = number
+
+    return {
+        'start': start_date,
+        'days': days,
+        'dates': [start_date + timedelta(days=day) for day in range(days)],
+        'rooms': [
+            {
+                'id': room_id,
+                'number': number,
+                'floor': floor,
+                'is_available': is_available,
+                'category': category,
+                'capacity': capacity,
+            }
+            for room_id, number, floor, is_available, category, capacity
+            in rooms
+        ],
+        'bookings': bookings,
+        'cells': cells,
+        'prev_cursor': start_date - timedelta(days=days),
+        'next_cursor': end_date,
+    }
+
+
+def render_grid_rows(grid, detail_url_prefix):
+    """
+    HTML строк шахматки. Строится без шаблонизатора: на 500 номеров
+    и 60 дней это десятки тысяч ячеек. Подряд идущие одинаковые
+    ячейки сворачиваются в одну с colspan
+    """
+    bookings = grid['bookings']
+    rendered = []
+    for booking in bookings:
+        rendered.append(
+            '<a href="%s%d/" class="booking-status status-%s" '
+            'title="№%d: %s–%s">%s</a>' % (
+                detail_url_prefix, booking['id'], booking['status'],
+                booking['id'],
+                booking['check_in'].strftime('%d.%m'),
+                booking['check_out'].strftime('%d.%m'),
+                escape(booking['guest']),
+            )
+        )
+
+    rows = []
+    for room, cells in zip(grid['rooms'], grid['cells']):
+        free_class = '' if room['is_available'] \
+            else ' class="table-secondary"'
+        parts = [
+            '<tr><th class="room-cell">%s '
+            '<small class="text-muted">эт. %d</small></th>' % (
+                escape(room['number']), room['floor'])
+        ]
+        previous = None
+        span = 0
+        for value in cells + [None]:
+            if value == previous:
+                span += 1
+                continue
+            if span:
+                if previous:
+                    parts.append('<td colspan="%d">%s</td>' % (
+                        span, rendered[previous - 1]))
+                else:
+                    parts.append('<td colspan="%d"%s></td>' % (
+                        span, free_class))
+            previous = value
+            span = 1
+        parts.append('</tr>')
+        rows.append(''.join(parts))
+    return mark_safe('\n'.join(rows))
@@ -0,0 +1,93 @@
+"""
+Групповые бронирования: один клиент, несколько номеров, общие даты.
+
+Весь пакет создается в одной транзакции: номера блокируются,
+пересечения проверяются одним запросом, стоимость считается
+по одному снимку цен, брони вставляются одним bulk_create.
+"""
+from django.db import transaction
+
+from .availability import ACTIVE_STATUSES, shift_counters
+from .events import publish_on_commit
+from .hotels import hotel_database
+from .models import Booking, Client, Room
+from .pricing import get_resolver
+from .utils import calculate_room_price_preview
+from .versions import BOOKINGS, bump_version
+
+
+class RoomsUnavailable(Exception):
+    """Часть номеров группы занята на выбранные даты"""
+
+    def __init__(self, numbers):
+        self.numbers = numbers
+        super().__init__(
+            'Номера уже забронированы на выбранные даты: '
+            + ', '.join(numbers))
+
+
+def create_group_booking(client, room_ids, check_in_date, check_out_date,
+                         created_by, status='pending', child_bed_rooms=(),
+                         notes=''):
+    """
+    Создать брони всех номеров группы или ни одной.
+    client — Client или словарь с его полями.
+    Возвращает список созданных броней
+    """
+    child_bed_rooms = set(child_bed_rooms)
+    with transaction.atomic(using=hotel_database()):
+        # Блокировка номеров: параллельная группа на те же номера ждет
+        rooms = list(
+            Room.objects.select_for_update(of=('self',))
+            .select_related('room_type')
+            .filter(pk__in=room_ids).order_by('number')
+        )
+        # Как и при одиночном создании, занятость проверяется
+        # по активным броням независимо от статуса новой брони
+        taken = sorted(set(Booking.objects.filter(
+            room__in=rooms,
+            status__in=ACTIVE_STATUSES,
+            check_in_date__lt=check_out_date,
+            check_out_date__gt=check_in_date,
+        ).values_list('room__number', flat=True)))
+        if taken:
+            raise RoomsUnavailable(taken)
+
+        if not isinstance(client, Client):
+            client = Client.objects.create(**client)
+
+        # Один снимок цен на всю группу; одинаковые номера считаются раз
+        resolver = get_resolver()
+        quotes = {}
+        bookings = []
+        for room in rooms:
+            needs_child_bed = room.pk in child_bed_rooms
+            key = (room.room_type_id, needs_child_bed)
+            if key not in quotes:
+                quotes[key] = calculate_room_price_preview(
+                    room.room_type, check_in_date, check_out_date,
+                    needs_child_bed, resolver=resolver)
+            bookings.append(Booking(
+                client=client,
+                room=room,
+                hotel_id=room.hotel_id,
+                check_in_date=check_in_date,
+                check_out_date=check_out_date,
+                needs_child_bed=needs_child_bed,
+                total_price=quotes[key]['total_price'],
+                discount_applied_id=quotes[key]['discount_id'],
+                status=status,
+                created_by=created_by,
+                notes=notes,
+            ))
+        bookings = Booking.objects.bulk_create(bookings)
+
+        # bulk_create не отправляет сигналы
+        if status in ACTIVE_STATUSES:
+            shift_counters([
+                (room.room_type_id, check_in_date, check_out_date)
+                for room in rooms if room.is_available
+            ], 1)
+    bump_version(BOOKINGS)
+    publish_on_commit(created=[booking.pk for booking in bookings])
+    return bookings
@@ -0,0 +1,176 @@
+"""
+Профили гостей.
+
+Статистика проживаний клиента — число проживаний, ночи, сумма
+и последний заезд — хранится в GuestProfile и сдвигается через F()
+сигналом сохранения брони: изменение вычитает прежний вклад брони
+и прибавляет новый. Model.save не открывает транзакцию для сигналов,
+поэтому пути, меняющие брони, сохраняют их внутри
+transaction.atomic — тогда сдвиг профиля (как и счетчиков занятости)
+фиксируется или откатывается вместе с бронью. Проживанием считается бронь,
+по которой гость заселялся; брони в архиве учитываются, а сам перенос
+в архив профиль не меняет. Клиенты общие для всех гостиниц, поэтому
+профиль считается по броням всех гостиниц. rebuild_profiles
+пересчитывает профили с нуля — для первичного заполнения и сверки.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .hotels import hotel_database
+from .models import ArchivedBooking, Booking, Client, GuestProfile
+
+STAY_STATUSES = ['checked_in', 'checked_out']
+
+PROFILE_FIELDS = ['stays', 'nights', 'lifetime_value', 'last_stay',
+                  'updated_at']
+
+
+def stay_of(client_id, status, check_in_date, check_out_date, total_price):
+    """
+    Вклад брони в профиль: (клиент, ночи, сумма, заезд)
+    или None, если гость не заселялся
+    """
+    if status not in STAY_STATUSES:
+        return None
+    return (client_id, (check_out_date - check_in_date).days,
+            Decimal(total_price), check_in_date)
+
+
+def recorded_stay(booking_id):
+    """Вклад брони в профиль по ее состоянию в базе"""
+    row = Booking.all_hotels.filter(pk=booking_id).values_list(
+        'client_id', 'status', 'check_in_date', 'check_out_date',
+        'total_price').first()
+    return stay_of(*row) if row else None
+
+
+def add_stay(stay):
+    """Добавить проживание к профилю клиента"""
+    client_id, nights, value, check_in_date = stay
+    with transaction.atomic(using=hotel_database()):
+        GuestProfile.objects.bulk_create(
+            [GuestProfile(client_id=client_id)], ignore_conflicts=True)
+        GuestProfile.objects.filter(client_id=client_id).update(
+            stays=F('stays') + 1,
+            nights=F('nights') + nights,
+            lifetime_value=F('lifetime_value') + value,
+            last_stay=Greatest(
+                Coalesce('last_stay', Value(check_in_date)),
+                Value(check_in_date)),
+            updated_at=timezone.now(),
+        )
+
+
+def remove_stay(stay):
+    """
+    Вычесть проживание из профиля. Последний заезд берется
+    из оставшихся броней клиента. Профиль не создается: при удалении
+    клиента вместе с бронями его уже может не быть
+    """
+    client_id, nights, value, _ = stay
+    latest = [
+        Subquery(
+            model.all_hotels.filter(
+                client_id=OuterRef('client_id'), status__in=STAY_STATUSES,
+            ).order_by('-check_in_date').values('check_in_date')[:1])
+        for model in (Booking, ArchivedBooking)
+    ]
+    GuestProfile.objects.filter(
+        client_id=client_id, stays__gt=0, nights__gte=nights,
+    ).update(
+        stays=F('stays') - 1,
+        nights=F('nights') - nights,
+        lifetime_value=F('lifetime_value') - value,
+        last_stay=Greatest(
+            Coalesce(latest[0], latest[1]), Coalesce(latest[1], latest[0])),
+        updated_at=timezone.now(),
+    )
+
+
+def profile_stats(client_ids):
+    """
+    {клиент: (проживаний, ночей, сумма, последний заезд)}
+    по рабочим и архивным броням
+    """
+    stats = {}
+    for model in (Booking, ArchivedBooking):
+        rows = model.all_hotels.filter(
+            client_id__in=client_ids, status__in=STAY_STATUSES,
+        ).values_list(
+            'client_id', 'check_in_date', 'check_out_date', 'total_price')
+        for client_id, check_in_date, check_out_date, total_price in rows:
+            stays, nights, value, last_stay = stats.get(
+                client_id, (0, 0, Decimal(0), check_in_date))
+            stats[client_id] = (
+                stays + 1,
+                nights + (check_out_date - check_in_date).days,
+                value + total_price,
+                max(last_stay, check_in_date),
+            )
+    return stats
+
+
+def rebuild_profiles(client_ids):
+    """
+    Пересчитать профили клиентов с нуля. Профиль создается только
+    клиенту с проживаниями; у остальных существующий обнуляется.
+    Возвращает число клиентов с проживаниями
+    """
+    client_ids = list(client_ids)
+    stats = profile_stats(client_ids)
+    now = timezone.now()
+    with transaction.atomic(using=hotel_database()):
+        GuestProfile.objects.filter(client_id__in=client_ids).exclude(
+            client_id__in=stats.keys()).update(
+                stays=0, nights=0, lifetime_value=0, last_stay=None,
+                updated_at=now)
+        GuestProfile.objects.bulk_create([
+            GuestProfile(
+                client_id=client_id, stays=stays, nights=nights,
+                lifetime_value=value, last_stay=last_stay, updated_at=now)
+            for client_id, (stays, nights, value, last_stay)
+            in stats.items()
+        ], update_conflicts=True, unique_fields=['client'],
+            update_fields=PROFILE_FIELDS)
+    return len(stats)
+
+
+def apply_stay_change(old, new):
+    """Учесть изменение брони: old и new — ее вклад до и после"""
+    if old == new:
+        return
+    with transaction.atomic(using=hotel_database()):
+        if old is not None:
+            remove_stay(old)
+        if new is not None:
+            add_stay(new)
+
+
+def client_chunks(chunk_size, start_after=0):
+    """Первичные ключи клиентов пачками по возрастанию"""
+    last_pk = start_after
+    while True:
+        chunk = list(
+            Client.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def guest_summary(phone):
+    """
+    Сводка по всем клиентам с телефоном: каждая бронь создает
+    своего клиента, поэтому постоянный гость узнается по номеру
+    """
+    return GuestProfile.objects.filter(client__phone=phone).aggregate(
+        stays=Coalesce(Sum('stays'), 0),
+        nights=Coalesce(Sum('nights'), 0),
+        lifetime_value=Coalesce(Sum('lifetime_value'), Value(Decimal(0))),
+        last_stay=Max('last_stay'),
+    )
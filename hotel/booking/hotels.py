@@ -0,0 +1,177 @@
+"""
+Несколько гостиниц в одной установке.
+
+Текущая гостиница запроса хранится в ContextVar. Менеджер objects
+у моделей с полем hotel (типы номеров, номера, цены, скидки, брони)
+отбирает только ее строки. Гостиница подставляется при построении SQL,
+поэтому querysets, заданные на уровне класса (поля форм,
+сериализаторы), отбирают строки той гостиницы, в чьем запросе
+выполняются. Вне запроса (команды, миграции) гостиница не выбрана
+и видны все строки; all_hotels — менеджер без отбора для общих снимков
+вроде цен и счетчиков занятости.
+
+Гостиницу можно вынести в отдельную базу: HOTEL_DATABASES
+сопоставляет код гостиницы псевдониму из DATABASES, а HotelRouter
+направляет туда запросы приложения booking, пока эта гостиница
+текущая.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+from .versions import CATALOG, get_version
+
+_current = ContextVar('current_hotel', default=None)
+
+SESSION_KEY = 'hotel_id'
+HEADER = 'X-Hotel'
+
+
+def get_current_hotel():
+    """Текущая гостиница или None, если она не выбрана"""
+    return _current.get()
+
+
+@contextmanager
+def use_hotel(hotel):
+    """Выполнить блок в рамках гостиницы (None — без отбора)"""
+    token = _current.set(hotel)
+    try:
+        yield hotel
+    finally:
+        _current.reset(token)
+
+
+def hotel_database(hotel=None):
+    """Псевдоним базы гостиницы (по умолчанию — текущей)"""
+    if hotel is None:
+        hotel = get_current_hotel()
+    if hotel is None:
+        return 'default'
+    return settings.HOTEL_DATABASES.get(hotel.code, 'default')
+
+
+def hotel_key():
+    """Часть ключей кэша: данные разных гостиниц не смешиваются"""
+    hotel = get_current_hotel()
+    return 'all' if hotel is None else f'h{hotel.pk}'
+
+
+def default_hotel_id():
+    """
+    Гостиница новых типов номеров и скидок: текущая, а вне запроса —
+    первая (в установке с одной гостиницей — единственная)
+    """
+    hotel = get_current_hotel()
+    if hotel is not None:
+        return hotel.pk
+    from .models import Hotel
+    return Hotel.objects.order_by('pk').values_list(
+        'pk', flat=True).first()
+
+
+class CurrentHotel(models.Expression):
+    """
+    Гостиница, текущая в момент построения SQL. Queryset может быть
+    создан при импорте модуля или в другом запросе — отбор все равно
+    относится к запросу, который его выполняет. Без гостиницы
+    сравнение превращается в hotel_id = hotel_id
+    """
+
+    def __init__(self, field='hotel_id'):
+        super().__init__(output_field=models.BigIntegerField())
+        self.column = models.F(field)
+
+    def get_source_expressions(self):
+        return [self.column]
+
+    def set_source_expressions(self, exprs):
+        self.column, = exprs
+
+    def as_sql(self, compiler, connection):
+        hotel = get_current_hotel()
+        if hotel is None:
+            return compiler.compile(self.column)
+        return '%s', [hotel.pk]
+
+
+class HotelManager(models.Manager):
+    """Менеджер с отбором строк текущей гостиницы"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hotel_id=CurrentHotel())
+
+
+def active_hotels():
+    """Действующие гостиницы; список кэшируется до смены справочников"""
+    from .models import Hotel
+    key = 'booking:hotels:%s' % get_version(CATALOG)
+    hotels = cache.get(key)
+    if hotels is None:
+        hotels = list(Hotel.objects.filter(is_active=True))
+        cache.set(key, hotels, settings.FRAGMENT_CACHE_TIMEOUT)
+    return hotels
+
+
+def resolve_hotel(request):
+    """
+    Гостиница запроса: заголовок X-Hotel с кодом (для API),
+    выбор в сессии, иначе первая действующая
+    """
+    hotels = active_hotels()
+    code = request.headers.get(HEADER)
+    if code:
+        for hotel in hotels:
+            if hotel.code == code:
+                return hotel
+    session = getattr(request, 'session', None)
+    selected = session.get(SESSION_KEY) if session is not None else None
+    for hotel in hotels:
+        if hotel.pk == selected:
+            return hotel
+    return hotels[0] if hotels else None
+
+
+class HotelMiddleware:
+    """
+    Выбирает гостиницу запроса и отбирает по ней данные.
+    Потоковый ответ читается уже после выхода из middleware, поэтому
+    поток событий панели сам выставляет гостиницу (request.hotel)
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request.hotel = resolve_hotel(request)
+        with use_hotel(request.hotel):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.hotel = await sync_to_async(resolve_hotel)(request)
+        with use_hotel(request.hotel):
+            return await self.get_response(request)
+
+
+def current_hotel(request):
+    """Контекстный процессор: текущая гостиница и список для выбора"""
+    if not getattr(request, 'user', None) or \
+            not request.user.is_authenticated:
+        return {}
+    return {
+        'current_hotel': getattr(request, 'hotel', None),
+        'hotels': active_hotels(),
+    }
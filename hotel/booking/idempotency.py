@@ -0,0 +1,98 @@
+"""
+Ключи повторной отправки при создании броней.
+
+Форма создания брони несет одноразовый ключ (скрытое поле
+submission_key), клиенты API передают заголовок Idempotency-Key.
+Ключ записывается в SubmissionKey в той же транзакции, что и бронь.
+Повтор с известным ключом сразу получает бронь первой отправки —
+без проверок, нового клиента и расчета цены. Одновременный повтор
+ждет на уникальном индексе (сотрудник, ключ), пока первая отправка
+не зафиксируется, и тоже получает ее бронь. Ключи действуют
+SUBMISSION_KEY_TTL секунд; истекшие удаляет purge_submission_keys.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .hotels import hotel_database
+from .models import SubmissionKey
+
+FORM_FIELD = 'submission_key'
+HEADER = 'Idempotency-Key'
+MAX_LENGTH = SubmissionKey._meta.get_field('key').max_length
+
+
+class DuplicateSubmission(Exception):
+    """Ключ уже использован; booking — бронь первой отправки или None"""
+
+    def __init__(self, booking):
+        self.booking = booking
+        super().__init__('Запрос с этим ключом уже выполнен')
+
+
+def new_submission_key():
+    return uuid.uuid4().hex
+
+
+def submission_key(request):
+    """Ключ из заголовка или поля формы; None, если его нет или он длинный"""
+    key = request.headers.get(HEADER) or request.POST.get(FORM_FIELD)
+    key = (key or '').strip()
+    if not key or len(key) > MAX_LENGTH:
+        return None
+    return key
+
+
+def key_cutoff():
+    """Ключи, записанные раньше, истекли"""
+    return timezone.now() - timedelta(seconds=settings.SUBMISSION_KEY_TTL)
+
+
+def replayed_booking(user, key):
+    """Бронь, уже созданная с этим ключом, или None"""
+    submission = SubmissionKey.objects.filter(
+        user=user, key=key, created_at__gte=key_cutoff(),
+        booking__isnull=False,
+    ).select_related('booking').first()
+    return submission.booking if submission is not None else None
+
+
+def claim_submission(user, key):
+    """
+    Записать ключ в текущей транзакции (None — без ключа).
+    Если ключ уже записан другой отправкой, вставка ждет ее фиксации,
+    после чего поднимается DuplicateSubmission с ее бронью
+    """
+    if key is None:
+        return None
+    SubmissionKey.objects.filter(
+        user=user, key=key, created_at__lt=key_cutoff()).delete()
+    try:
+        with transaction.atomic(using=hotel_database()):
+            return SubmissionKey.objects.create(user=user, key=key)
+    except IntegrityError:
+        raise DuplicateSubmission(replayed_booking(user, key))
+
+
+def record_submission(submission, booking):
+    """Связать записанный ключ с созданной бронью"""
+    if submission is not None:
+        submission.booking = booking
+        submission.save(update_fields=['booking'])
+
+
+def purge_submission_keys(batch_size=5000):
+    """Удалить истекшие ключи пачками; возвращает их число"""
+    cutoff = key_cutoff()
+    total = 0
+    while True:
+        ids = list(
+            SubmissionKey.objects.filter(created_at__lt=cutoff)
+            .values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        SubmissionKey.objects.filter(pk__in=ids).delete()
+        total += len(ids)
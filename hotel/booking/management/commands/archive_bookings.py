@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from booking.archive import archivable_bookings, archive_batch, archive_cutoff
+from booking.hotels import use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит выехавшие и отмененные брони старше заданного '
+        'возраста в архив пачками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int,
+            default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+            help='Дней после выезда (по умолчанию '
+                 'BOOKING_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Броней в одной транзакции')
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между пачками, секунд')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать брони для переноса')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['older_than'])
+
+        total = 0
+        for hotel in command_hotels(options['hotel']):
+            with use_hotel(hotel):
+                if options['dry_run']:
+                    count = archivable_bookings(cutoff).count()
+                    self.stdout.write(
+                        f'{hotel}: будет перенесено в архив (выезд до '
+                        f'{cutoff:%d.%m.%Y}): {count}')
+                    continue
+                total += self.archive(hotel, cutoff, options)
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Перенесено в архив: {total}'))
+
+    def archive(self, hotel, cutoff, options):
+        total = 0
+        while True:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f'  {hotel}: перенесено {total}')
+            if options['pause']:
+                time.sleep(options['pause'])
+        return total
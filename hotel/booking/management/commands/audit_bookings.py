@@ -0,0 +1,71 @@
+import json
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.audit import (
+    CHUNK_SIZE, find_overlaps, find_price_mismatches, find_state_errors
+)
+from booking.hotels import use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+
+CHECKS = {
+    'overlaps': find_overlaps,
+    'states': find_state_errors,
+    'prices': find_price_mismatches,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет брони потоком: пересечения в одном номере, статусы '
+        'без фактических отметок, расхождение стоимости с пересчетом. '
+        'Находки печатаются строками JSON, итог — в stderr'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='append', choices=sorted(CHECKS),
+            dest='checks',
+            help='Проверка (можно несколько); по умолчанию все')
+        parser.add_argument(
+            '--price-tolerance', type=Decimal, default=Decimal('0.01'),
+            help='Допустимое расхождение стоимости, руб.')
+        parser.add_argument(
+            '--since', type=date.fromisoformat, metavar='YYYY-MM-DD',
+            help='Сверять стоимость броней, созданных с этой даты. '
+                 'История цен не хранится: брони, созданные до последнего '
+                 'изменения цен, разойдутся с пересчетом')
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Строк в одном чтении из базы')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        found = Counter()
+        for hotel in command_hotels(options['hotel']):
+            with use_hotel(hotel):
+                self.audit(hotel, options, found)
+
+        if not found:
+            self.stderr.write(self.style.SUCCESS('Нарушений не найдено'))
+            return
+        summary = ', '.join(
+            f'{kind}: {count}' for kind, count in sorted(found.items()))
+        raise CommandError(f'Найдены нарушения — {summary}')
+
+    def audit(self, hotel, options, found):
+        for name in options['checks'] or CHECKS:
+            check = CHECKS[name]
+            kwargs = {'chunk_size': options['chunk_size']}
+            if name == 'prices':
+                kwargs['tolerance'] = options['price_tolerance']
+                kwargs['since'] = options['since']
+            for kind, booking_id, room, detail in check(**kwargs):
+                found[kind] += 1
+                self.stdout.write(json.dumps({
+                    'kind': kind, 'hotel': hotel.code,
+                    'booking': booking_id, 'room': room, 'detail': detail,
+                }, ensure_ascii=False))
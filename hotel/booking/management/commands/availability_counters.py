@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.availability import rebuild_counters, verify_counters
+from booking.hotels import use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+from booking.models import RoomType
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики занятости типов номеров с бронями '
+        'или пересобирает их'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересобрать счетчики вместо сверки')
+        parser.add_argument(
+            '--room-type', type=int, action='append', dest='room_types',
+            help='ID типа номера (можно несколько); по умолчанию все')
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько расхождений вывести')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for hotel in command_hotels(options['hotel']):
+            with use_hotel(hotel):
+                # Счетчики считаются по всем броням базы, поэтому
+                # гостиница ограничивает обход своими типами номеров
+                room_types = RoomType.objects.values_list('pk', flat=True)
+                if options['room_types']:
+                    room_types = room_types.filter(
+                        pk__in=options['room_types'])
+                room_types = list(room_types)
+                if options['rebuild']:
+                    count = rebuild_counters(room_types)
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{hotel}: счетчики пересобраны, '
+                        f'{count} ночей с бронями'))
+                else:
+                    mismatches += self.verify(hotel, room_types, options)
+
+        if mismatches:
+            raise CommandError(
+                f'Расхождений: {mismatches}. '
+                f'Запустите команду с --rebuild')
+
+    def verify(self, hotel, room_types, options):
+        mismatches = verify_counters(room_types)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(
+                f'{hotel}: счетчики совпадают'))
+            return 0
+
+        self.stdout.write(f'{hotel}:')
+        for room_type_id, date, expected, actual in \
+                mismatches[:options['limit']]:
+            self.stdout.write(
+                f'  тип {room_type_id}, {date:%d.%m.%Y}: '
+                f'ожидается {expected}, записано {actual}')
+        return len(mismatches)
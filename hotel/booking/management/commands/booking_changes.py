@@ -0,0 +1,74 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from booking.feed import InvalidWatermark, purge_deleted, read_changes
+from booking.hotels import use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает изменения броней после отметки строками JSON: '
+        'upsert для измененных и delete для удаленных. Новая отметка '
+        'печатается в stderr'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watermark', default='',
+            help='Отметка предыдущей выгрузки; без нее — все брони')
+        parser.add_argument(
+            '--limit', type=int, default=settings.CHANGE_FEED_MAX_BATCH,
+            help='Изменений в одной пачке')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Только одна пачка, даже если изменений больше')
+        parser.add_argument(
+            '--purge', action='store_true',
+            help='Удалить записи об удалении старше '
+                 'CHANGE_FEED_TOMBSTONE_DAYS и выйти')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        hotels = command_hotels(options['hotel'])
+        if options['purge']:
+            purged = 0
+            for hotel in hotels:
+                with use_hotel(hotel):
+                    purged += purge_deleted()
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено записей об удалении: {purged}'))
+            return
+
+        # Отметка ленты относится к одной гостинице
+        if len(hotels) != 1:
+            raise CommandError('Укажите гостиницу: --hotel CODE')
+        with use_hotel(hotels[0]):
+            self.export(options)
+
+    def export(self, options):
+        watermark = options['watermark']
+        total = 0
+        while True:
+            try:
+                batch = read_changes(watermark, options['limit'])
+            except InvalidWatermark as e:
+                raise CommandError(str(e))
+            for row in batch['changed']:
+                self._write({'op': 'upsert', **row})
+            for row in batch['deleted']:
+                self._write({'op': 'delete', **row})
+            total += len(batch['changed']) + len(batch['deleted'])
+            watermark = batch['watermark']
+            if options['once'] or not batch['has_more']:
+                break
+
+        self.stderr.write(f'Изменений: {total}')
+        self.stderr.write(f'Отметка: {watermark}')
+
+    def _write(self, data):
+        self.stdout.write(json.dumps(
+            data, cls=DjangoJSONEncoder, ensure_ascii=False))
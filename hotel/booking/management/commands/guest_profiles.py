@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.guests import client_chunks, rebuild_profiles
+from booking.hotels import hotel_database, use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает профили гостей по рабочим и архивным броням '
+        'пачками клиентов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Клиентов в одной транзакции')
+        parser.add_argument(
+            '--start-after', type=int, default=0,
+            help='Продолжить с клиента после этого id')
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между пачками, секунд')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        clients = guests = 0
+        # Клиенты и профили не делятся по гостиницам: обход по базам
+        for hotel in command_hotels(options['hotel'], per_database=True):
+            with use_hotel(hotel):
+                database = hotel_database()
+                for chunk in client_chunks(
+                        options['chunk_size'], options['start_after']):
+                    guests += rebuild_profiles(chunk)
+                    clients += len(chunk)
+                    self.stdout.write(
+                        f'  {database}: клиентов {clients}, '
+                        f'последний id {chunk[-1]}')
+                    if options['pause']:
+                        time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано клиентов: {clients}, с проживаниями: {guests}'))
@@ -0,0 +1,525 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urljoin
+from urllib.request import (
+    HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+)
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.hotels import hotel_database, use_hotel
+from booking.management.hotels import command_hotels
+from booking.models import Booking, Client as Guest, DeletedBooking
+from booking.quotes import quote_memo
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+DEFAULT_MIX = 'quote:50,book:30,stay:20'
+
+
+class NoRedirectHandler(HTTPRedirectHandler):
+    """Не следовать редиректам: сценарию важен сам код 302"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpSession:
+    """Клиент для живого сервера: cookies + CSRF через urllib"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.jar = CookieJar()
+        self.opener = build_opener(
+            HTTPCookieProcessor(self.jar), NoRedirectHandler())
+
+    def _csrf_cookie(self):
+        for cookie in self.jar:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, method, path, data=None):
+        url = urljoin(self.base_url, path)
+        body = None
+        headers = {}
+        if method == 'POST':
+            body = urlencode(data or {}).encode()
+            headers['X-CSRFToken'] = self._csrf_cookie()
+            headers['Referer'] = url
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif data:
+            url = f'{url}?{urlencode(data)}'
+        try:
+            response = self.opener.open(
+                Request(url, data=body, headers=headers, method=method))
+            return response.status, response.read().decode()
+        except HTTPError as e:
+            return e.code, e.read().decode()
+
+    def csrf_token(self, path):
+        _, content = self.request('GET', path)
+        match = CSRF_RE.search(content)
+        return match.group(1) if match else self._csrf_cookie()
+
+
+class WsgiSession:
+    """Клиент, работающий через WSGI-обработчик в текущем процессе"""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            response = self.client.post(path, data or {})
+        else:
+            response = self.client.get(path, data or {})
+        return response.status_code, self._content(response)
+
+    @staticmethod
+    def _content(response):
+        if getattr(response, 'streaming', False):
+            return ''
+        return response.content.decode()
+
+    def csrf_token(self, path):
+        # Тестовый клиент не проверяет CSRF
+        return ''
+
+
+class AsgiSession(WsgiSession):
+    """Клиент, работающий через ASGI-обработчик в текущем процессе"""
+
+    def __init__(self):
+        self.client = AsyncClient()
+
+    def request(self, method, path, data=None):
+        call = self.client.post if method == 'POST' else self.client.get
+        response = async_to_sync(call)(path, data or {})
+        return response.status_code, self._content(response)
+
+
+class Stats:
+    """Потокобезопасный сбор задержек и ошибок по шагам сценария"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.booking_notes = []
+
+    def record(self, step, elapsed, ok):
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if not ok:
+                self.errors[step] += 1
+
+    def add_booking(self, note):
+        with self.lock:
+            self.booking_notes.append(note)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition(':')
+        name = name.strip()
+        if name not in ('quote', 'book', 'stay'):
+            raise CommandError(f'Неизвестный сценарий: {name}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Неверный вес сценария: {part}')
+    if not mix or sum(mix.values()) <= 0:
+        raise CommandError('Пустой набор сценариев')
+    return mix
+
+
+def api_results(session, path, params=None):
+    """Все записи списка API: страницы курсора по ссылкам next"""
+    while path:
+        status, content = session.request('GET', path, params)
+        if status != 200:
+            raise CommandError(f'API {path} ответил кодом {status}')
+        page = json.loads(content)
+        yield from page['results']
+        path, params = page['next'], None
+
+
+def count_double_bookings(stays):
+    """
+    Количество пересекающихся активных броней одного номера;
+    stays — тройки (номер, заезд, выезд), упорядоченные по номеру
+    и дате заезда
+    """
+    overlaps = 0
+    current_room = None
+    latest_check_out = None
+    for room_id, check_in, check_out in stays:
+        if room_id != current_room:
+            current_room = room_id
+            latest_check_out = check_out
+            continue
+        if check_in < latest_check_out:
+            overlaps += 1
+        latest_check_out = max(latest_check_out, check_out)
+    return overlaps
+
+
+def remove_run_data(prefix):
+    """
+    Удаление данных прогона из базы команды: брони с примечанием,
+    начинающимся с prefix, их клиенты и записи об удалении, которые
+    удаление броней оставляет для ленты изменений.
+    Возвращает количество удаленных броней
+    """
+    removed = 0
+    for hotel in command_hotels():
+        with use_hotel(hotel), transaction.atomic(using=hotel_database()):
+            bookings = Booking.objects.filter(notes__startswith=prefix)
+            booking_ids = list(bookings.values_list('id', flat=True))
+            if not booking_ids:
+                continue
+            client_ids = set(bookings.values_list('client_id', flat=True))
+            # По одной, чтобы сигналы вернули счетчики занятости
+            for booking in bookings:
+                booking.delete()
+            Guest.objects.filter(
+                pk__in=client_ids, bookings__isnull=True,
+                archived_bookings__isnull=True, waitlist__isnull=True,
+            ).delete()
+            DeletedBooking.objects.filter(
+                booking_id__in=booking_ids).delete()
+            removed += len(booking_ids)
+    return removed
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест сценария бронирования: вход, серия расчетов '
+        'стоимости, создание брони, подтверждение, заселение и выселение'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=['wsgi', 'asgi', 'http'], default='wsgi',
+            help='wsgi/asgi — в текущем процессе, http — живой сервер')
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000/',
+            help='Адрес сервера для режима http')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=10,
+                            help='Сценариев на одного клерка')
+        parser.add_argument('--quotes', type=int, default=5,
+                            help='Расчетов стоимости в одном сценарии')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help='Веса сценариев quote/book/stay')
+        parser.add_argument('--days-ahead', type=int, default=60,
+                            help='Окно дат заезда от сегодняшнего дня')
+        parser.add_argument('--max-nights', type=int, default=7)
+        parser.add_argument('--username', default='loadtest')
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--create-user', action='store_true',
+                            help='Создать пользователя, если его нет')
+        parser.add_argument(
+            '--keep-data', action='store_true',
+            help='Не удалять созданные брони и клиентов после прогона. '
+                 'В режиме http удаление возможно, только если сервер '
+                 'работает с той же базой, что и команда')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести отчет в формате JSON')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.mix = parse_mix(options['mix'])
+        if options['create_user']:
+            self._ensure_user()
+        if options['mode'] != 'http':
+            # Тестовые клиенты ходят с Host: testserver
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+        self.stats = Stats()
+        quote_memo.clear()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.urls = {
+            'login': reverse('login'),
+            'calculate_price': reverse('calculate_price'),
+            'booking_create': reverse('booking_create'),
+            'rooms': reverse('api-room-list'),
+            'bookings': reverse('api-booking-list'),
+        }
+
+        # Номера и брони читаются через API того же сервера, который
+        # обслуживает сценарии: в режиме http у него своя база
+        session = self._session()
+        if not self._login(session):
+            raise CommandError(
+                'Не удалось войти: проверьте --username и --password')
+        self.room_ids = [
+            room['id'] for room in api_results(
+                session, self.urls['rooms'],
+                {'is_available': 'true', 'page_size': 1000})
+        ]
+        if not self.room_ids:
+            raise CommandError('Нет доступных номеров для бронирования')
+
+        workers = [
+            threading.Thread(target=self._worker, args=(index,))
+            for index in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        duration = time.perf_counter() - started
+
+        double_bookings = self._count_double_bookings(session)
+        removed = None
+        if not options['keep_data']:
+            removed = remove_run_data(self._note_prefix())
+        self._report(duration, double_bookings, removed)
+
+    def _ensure_user(self):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(
+            username=self.options['username'],
+            defaults={'is_staff': True})
+        if created:
+            user.set_password(self.options['password'])
+            user.save()
+
+    def _session(self):
+        mode = self.options['mode']
+        if mode == 'http':
+            return HttpSession(self.options['url'])
+        if mode == 'asgi':
+            return AsgiSession()
+        return WsgiSession()
+
+    def _login(self, session, record=False):
+        path = self.urls['login']
+        data = {
+            'username': self.options['username'],
+            'password': self.options['password'],
+            'csrfmiddlewaretoken': session.csrf_token(path),
+        }
+        if record:
+            status, _ = self._timed(
+                'login', session, 'POST', path, data, expected=(302,))
+        else:
+            status, _ = session.request('POST', path, data)
+        return status == 302
+
+    def _note_prefix(self):
+        return f'loadtest-{self.run_id}-'
+
+    def _timed(self, step, session, method, path, data=None,
+               expected=(200,)):
+        started = time.perf_counter()
+        try:
+            status, content = session.request(method, path, data)
+        except Exception:
+            status, content = None, ''
+        self.stats.record(
+            step, time.perf_counter() - started, status in expected)
+        return status, content
+
+    def _worker(self, index):
+        options = self.options
+        rng = random.Random(
+            None if options['seed'] is None else options['seed'] + index)
+        session = self._session()
+        if not self._login(session, record=True):
+            return
+
+        scenarios = list(self.mix)
+        weights = [self.mix[name] for name in scenarios]
+        for iteration in range(options['iterations']):
+            scenario = rng.choices(scenarios, weights)[0]
+            room_id, check_in, check_out = self._pick_stay(rng)
+            self._quote_storm(session, rng, room_id, check_in, check_out)
+            if scenario == 'quote':
+                continue
+
+            booking_id = self._create_booking(
+                session, index, iteration, room_id, check_in, check_out)
+            if booking_id is None:
+                continue
+            self._transition(session, 'confirm_booking', booking_id)
+            if scenario == 'stay':
+                self._transition(session, 'check_in_booking', booking_id)
+                self._transition(session, 'check_out_booking', booking_id)
+
+    def _pick_stay(self, rng):
+        today = timezone.now().date()
+        check_in = today + timedelta(
+            days=rng.randint(0, self.options['days_ahead']))
+        check_out = check_in + timedelta(
+            days=rng.randint(1, self.options['max_nights']))
+        return rng.choice(self.room_ids), check_in, check_out
+
+    def _quote_storm(self, session, rng, room_id, check_in, check_out):
+        # Клерк перебирает варианты: детская кровать, сдвиг выезда
+        for _ in range(self.options['quotes']):
+            nights_shift = rng.randint(0, 2)
+            self._timed('calculate_price', session, 'GET',
+                        self.urls['calculate_price'], {
+                            'room_id': room_id,
+                            'check_in': check_in.isoformat(),
+                            'check_out': (check_out + timedelta(
+                                days=nights_shift)).isoformat(),
+                            'needs_child_bed': rng.choice(
+                                ['true', 'false']),
+                        })
+
+    def _create_booking(self, session, index, iteration, room_id,
+                        check_in, check_out):
+        note = f'{self._note_prefix()}{index}-{iteration}'
+        last_name = f'Клерк{index}'
+        path = self.urls['booking_create']
+        status, _ = self._timed('booking_create', session, 'POST', path, {
+            'csrfmiddlewaretoken': session.csrf_token(path),
+            'first_name': 'Нагрузка',
+            'last_name': last_name,
+            'phone': f'+7000{index:03d}{iteration:04d}',
+            'room': room_id,
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': check_out.isoformat(),
+            'notes': note,
+        }, expected=(302,))
+        if status != 302:
+            return None
+        self.stats.add_booking(note)
+        # Представление перенаправляет на список, id ищем через API:
+        # самая новая ожидающая бронь клерка на этот номер и дату
+        status, content = session.request('GET', self.urls['bookings'], {
+            'room': room_id,
+            'check_in_from': check_in.isoformat(),
+            'check_in_to': check_in.isoformat(),
+            'status': 'pending',
+            'fields': 'id,client_name',
+        })
+        if status != 200:
+            return None
+        for booking in json.loads(content)['results']:
+            if booking['client_name'] == f'Нагрузка {last_name}':
+                return booking['id']
+        return None
+
+    def _transition(self, session, url_name, booking_id):
+        self._timed(url_name, session, 'GET',
+                    reverse(url_name, args=[booking_id]),
+                    expected=(302,))
+
+    def _count_double_bookings(self, session):
+        room_ids = set(self.room_ids)
+        stays = sorted(
+            (booking['room'], booking['check_in_date'],
+             booking['check_out_date'])
+            for booking in api_results(session, self.urls['bookings'], {
+                'status': 'confirmed,checked_in',
+                'fields': 'room,check_in_date,check_out_date',
+                'page_size': 1000,
+            })
+            if booking['room'] in room_ids
+        )
+        return count_double_bookings(stays)
+
+    def _report(self, duration, double_bookings, removed):
+        stats = self.stats
+        total_requests = sum(len(v) for v in stats.latencies.values())
+        steps = {}
+        for step, values in sorted(stats.latencies.items()):
+            steps[step] = {
+                'requests': len(values),
+                'errors': stats.errors[step],
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p90_ms': round(percentile(values, 90) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(max(values) * 1000, 2),
+            }
+
+        report = {
+            'mode': self.options['mode'],
+            'concurrency': self.options['concurrency'],
+            'duration_s': round(duration, 3),
+            'requests': total_requests,
+            'throughput_rps': round(
+                total_requests / duration, 2) if duration else 0,
+            'errors': sum(stats.errors.values()),
+            'bookings_created': len(stats.booking_notes),
+            'double_bookings': double_bookings,
+            'bookings_removed': removed,
+            'steps': steps,
+        }
+        if self.options['mode'] != 'http':
+            # Кэш расчетов живет в этом же процессе
+            report['quote_memo'] = quote_memo.stats()
+
+        if removed is not None and removed < len(stats.booking_notes):
+            self.stderr.write(
+                f'Удалено броней: {removed} из '
+                f'{len(stats.booking_notes)}. Сервер работает с другой '
+                f'базой: удалите на нем брони с примечанием '
+                f'{self._note_prefix()}*')
+
+        if self.options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False,
+                                         indent=2))
+            return
+
+        self.stdout.write(
+            f"Режим: {report['mode']}, клерков: {report['concurrency']}, "
+            f"длительность: {report['duration_s']} с")
+        self.stdout.write(
+            f"Запросов: {report['requests']}, "
+            f"пропускная способность: {report['throughput_rps']} req/s, "
+            f"ошибок: {report['errors']}")
+        self.stdout.write(
+            f"Создано броней: {report['bookings_created']}, "
+            f"двойных бронирований: {report['double_bookings']}")
+        if removed is None:
+            self.stdout.write(
+                f'Данные прогона сохранены: примечания броней '
+                f'начинаются с {self._note_prefix()}')
+        else:
+            self.stdout.write(f'Удалено броней прогона: {removed}')
+        if 'quote_memo' in report:
+            memo = report['quote_memo']
+            self.stdout.write(
+                f"Кэш расчетов: попаданий {memo['hits']}, "
+                f"промахов {memo['misses']}, "
+                f"объединено {memo['coalesced']}")
+        self.stdout.write(
+            f"{'Шаг':<20}{'N':>7}{'ошибки':>8}"
+            f"{'p50 мс':>10}{'p90 мс':>10}{'p99 мс':>10}{'max мс':>10}")
+        for step, row in steps.items():
+            self.stdout.write(
+                f"{step:<20}{row['requests']:>7}{row['errors']:>8}"
+                f"{row['p50_ms']:>10}{row['p90_ms']:>10}"
+                f"{row['p99_ms']:>10}{row['max_ms']:>10}")
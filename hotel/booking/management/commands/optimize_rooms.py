@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from booking.allocation import (
+    AllocationConflict, apply_reassignment, plan_reassignment
+)
+from booking.hotels import hotel_database, use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+from booking.models import Room, RoomType
+
+
+class Command(BaseCommand):
+    help = (
+        'Переставляет будущие неподтвержденные брони внутри типа номера, '
+        'чтобы убрать короткие непродаваемые окна и освободить номера '
+        'под длинные проживания'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--room-type', type=int, action='append', dest='room_types',
+            help='ID типа номера (можно несколько); по умолчанию все')
+        parser.add_argument(
+            '--from', dest='start', type=date.fromisoformat,
+            help='Переставлять брони с заездом с этой даты '
+                 '(ГГГГ-ММ-ДД, по умолчанию завтра)')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать перестановки')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        start_date = options['start'] or today + timedelta(days=1)
+        if start_date <= today:
+            # Сегодняшние заезды уже могут получать ключи
+            raise CommandError('Дата начала должна быть позже сегодняшней')
+
+        total = 0
+        for hotel in command_hotels(options['hotel']):
+            with use_hotel(hotel):
+                total += self.optimize(hotel, start_date, options)
+
+        verb = 'Будет переставлено' if options['dry_run'] \
+            else 'Переставлено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} броней: {total}'))
+
+    def optimize(self, hotel, start_date, options):
+        room_types = RoomType.objects.order_by('pk')
+        if options['room_types']:
+            room_types = room_types.filter(pk__in=options['room_types'])
+
+        total = 0
+        for room_type in room_types:
+            with transaction.atomic(using=hotel_database()):
+                changes = plan_reassignment(room_type, start_date)
+                if changes and not options['dry_run']:
+                    try:
+                        apply_reassignment(changes)
+                    except AllocationConflict as e:
+                        raise CommandError(str(e))
+            if not changes:
+                continue
+
+            total += len(changes)
+            numbers = Room.objects.in_bulk(
+                {room_id for _, old, new in changes
+                 for room_id in (old, new)})
+            self.stdout.write(f'{hotel}, {room_type}: {len(changes)}')
+            for booking_id, old, new in changes:
+                self.stdout.write(
+                    f'  #{booking_id}: {numbers[old].number} '
+                    f'-> {numbers[new].number}')
+        return total
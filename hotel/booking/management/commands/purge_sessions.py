@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истекшие сессии из базы пачками, не блокируя '
+        'таблицу сессий одним большим DELETE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сессий в одном DELETE')
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между пачками, секунд')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_PROFILE == 'signed_cookies':
+            self.stdout.write(
+                'Сессии хранятся в cookie: в базе удалять нечего')
+            return
+
+        now = timezone.now()
+        total = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)
+                [:options['batch_size']]
+            )
+            if not keys:
+                break
+            Session.objects.filter(session_key__in=keys).delete()
+            total += len(keys)
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        # Записи cached_db в кэше истекают сами
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено истекших сессий: {total}'))
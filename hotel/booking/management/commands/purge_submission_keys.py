@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from booking.hotels import use_hotel
+from booking.idempotency import purge_submission_keys
+from booking.management.hotels import add_hotel_argument, command_hotels
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истекшие ключи повторной отправки броней'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Ключей в одном DELETE')
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        total = 0
+        # Ключи не делятся по гостиницам: обход по базам
+        for hotel in command_hotels(options['hotel'], per_database=True):
+            with use_hotel(hotel):
+                total += purge_submission_keys(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено истекших ключей: {total}'))
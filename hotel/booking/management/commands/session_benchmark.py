@@ -0,0 +1,176 @@
+import random
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.models import Booking, Room
+
+MESSAGE_STORAGES = {
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+}
+
+# Версии данных и события живой панели пишутся в кэш сразу, мимо
+# транзакции: сценарий работает с отдельным кэшем в памяти процесса
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'session-benchmark',
+    },
+}
+
+
+@contextmanager
+def rolled_back():
+    """
+    Сценарий во внешней транзакции всех баз, которая откатывается:
+    бронь, клиент, сессии и сдвиги счетчиков не остаются в базе.
+    Транзакции представлений становятся точками сохранения: SAVEPOINT
+    и RELEASE вместо BEGIN и COMMIT, число запросов шага то же
+    """
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+        for alias in connections:
+            transaction.set_rollback(True, using=alias)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число запросов к базе на типичный сценарий ресепшена '
+        'для разных хранилищ сессий и сообщений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='db+session,db,cached_db,signed_cookies',
+            help='Профили через запятую: <сессии>[+<сообщения>], '
+                 'сессии — ключ SESSION_PROFILES, сообщения — '
+                 + '/'.join(MESSAGE_STORAGES)
+                 + ' (по умолчанию cookie)')
+        parser.add_argument(
+            '--rounds', type=int, default=3,
+            help='Повторов сценария на профиль (первый — прогрев)')
+        parser.add_argument(
+            '--username', default='loadtest',
+            help='Пользователь, от имени которого идут запросы')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            self.user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                'Пользователь не найден; создайте его через '
+                'manage.py loadtest --create-user')
+        self.rooms = list(
+            Room.objects.filter(is_available=True).values_list(
+                'id', flat=True))
+        if not self.rooms:
+            raise CommandError('Нет доступных номеров')
+        self.rng = random.Random(0)
+
+        if 'testserver' not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS.append('testserver')
+
+        results = {}
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            for profile in options['profiles'].split(','):
+                results[profile] = self._profile(profile, options['rounds'])
+
+        self._report(results)
+
+    def _profile(self, profile, rounds):
+        session_profile, _, storage = profile.partition('+')
+        storage = storage or 'cookie'
+        if session_profile not in settings.SESSION_PROFILES \
+                or storage not in MESSAGE_STORAGES:
+            raise CommandError(f'Неизвестный профиль: {profile}')
+        with override_settings(
+                SESSION_ENGINE=settings.SESSION_PROFILES[session_profile],
+                MESSAGE_STORAGE=MESSAGE_STORAGES[storage]):
+            steps = None
+            for _ in range(rounds):
+                # Первые раунды прогревают кэши, в отчет идет последний
+                with rolled_back():
+                    steps = self._scenario()
+        return steps
+
+    def _scenario(self):
+        """Шаги ресепшена: (шаг, всего запросов, запросов к сессиям)"""
+        client = Client()
+        client.force_login(self.user)
+        steps = []
+
+        def request(step, method, path, data=None):
+            # Транзакция откатывается, поэтому колбэки on_commit
+            # (события панели, подбор листа ожидания) выполняются
+            # вручную: их запросы входят в стоимость шага
+            with CaptureQueriesContext(connection) as queries, \
+                    TestCase.captureOnCommitCallbacks(
+                        using=connection.alias, execute=True):
+                call = client.post if method == 'POST' else client.get
+                response = call(path, data or {})
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{step}: HTTP {response.status_code}')
+            steps.append((step, len(queries), sum(
+                'django_session' in query['sql']
+                for query in queries.captured_queries)))
+            return response
+
+        check_in = timezone.now().date() + timedelta(
+            days=self.rng.randint(3000, 6000))
+        note = f'session-benchmark-{self.rng.random()}'
+
+        request('dashboard', 'GET', reverse('admin_dashboard'))
+        request('booking_list', 'GET', reverse('booking_list'))
+        request('create_form', 'GET', reverse('booking_create'))
+        request('create', 'POST', reverse('booking_create'), {
+            'first_name': 'Тест',
+            'last_name': 'Сессий',
+            'phone': '+70000000000',
+            'room': self.rng.choice(self.rooms),
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': (check_in + timedelta(days=2)).isoformat(),
+            'notes': note,
+        })
+        booking = Booking.objects.get(notes=note)
+        request('list_with_message', 'GET', reverse('booking_list'))
+        for url_name in ('confirm_booking', 'check_in_booking',
+                         'check_out_booking'):
+            request(url_name, 'GET', reverse(url_name, args=[booking.pk]))
+            request('detail_with_message', 'GET',
+                    reverse('booking_detail', args=[booking.pk]))
+        return steps
+
+    def _report(self, results):
+        profiles = list(results)
+        width = max(len(profile) for profile in profiles) + 2
+        header = f'{"Шаг":<22}' + ''.join(
+            f'{profile:>{width}}' for profile in profiles)
+        self.stdout.write('Запросов к базе (из них к сессиям):')
+        self.stdout.write(header)
+        for index, (step, *_) in enumerate(results[profiles[0]]):
+            row = f'{step:<22}'
+            for profile in profiles:
+                _, total, session = results[profile][index]
+                row += f'{f"{total} ({session})":>{width}}'
+            self.stdout.write(row)
+
+        row = f'{"Итого":<22}'
+        for profile in profiles:
+            total = sum(step[1] for step in results[profile])
+            session = sum(step[2] for step in results[profile])
+            row += f'{f"{total} ({session})":>{width}}'
+        self.stdout.write(self.style.SUCCESS(row))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from booking.hotels import use_hotel
+from booking.management.hotels import add_hotel_argument, command_hotels
+from booking.waitlist import expire_offers, expire_waiting
+
+
+class Command(BaseCommand):
+    help = (
+        'Отменяет предложения из листа ожидания без ответа дольше '
+        'WAITLIST_OFFER_HOURS и предлагает номера следующим в очереди; '
+        'закрывает запросы с прошедшей датой заезда'
+    )
+
+    def add_arguments(self, parser):
+        add_hotel_argument(parser)
+
+    def handle(self, *args, **options):
+        for hotel in command_hotels(options['hotel']):
+            with use_hotel(hotel):
+                expired, offered = expire_offers()
+                stale = expire_waiting()
+            self.stdout.write(f'{hotel}:')
+            self.stdout.write(
+                f'  истекло предложений (старше '
+                f'{settings.WAITLIST_OFFER_HOURS} ч): {expired}')
+            self.stdout.write(f'  новых предложений: {offered}')
+            self.stdout.write(self.style.SUCCESS(
+                f'  закрыто запросов с прошедшей датой заезда: {stale}'))
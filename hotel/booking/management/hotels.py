@@ -0,0 +1,38 @@
+"""
+Гостиницы в командах управления.
+
+Команда обходит гостиницы по очереди и выполняет работу внутри
+use_hotel: запросы отбирают строки этой гостиницы и идут в ее базу.
+--hotel ограничивает обход одной гостиницей.
+"""
+from django.core.management.base import CommandError
+
+from booking.hotels import hotel_database
+from booking.models import Hotel
+
+
+def add_hotel_argument(parser):
+    parser.add_argument(
+        '--hotel', metavar='CODE',
+        help='Код гостиницы; по умолчанию — все гостиницы по очереди')
+
+
+def command_hotels(code=None, per_database=False):
+    """
+    Гостиницы для обхода командой: одна по коду или все.
+    per_database — по одной на базу: для данных без поля гостиницы
+    (клиенты, профили гостей, ключи отправки) обход каждой гостиницы
+    повторял бы ту же работу
+    """
+    hotels = Hotel.objects.order_by('pk')
+    if code:
+        hotels = hotels.filter(code=code)
+    hotels = list(hotels)
+    if code and not hotels:
+        raise CommandError(f'Гостиница с кодом {code} не найдена')
+    if per_database:
+        databases = {}
+        for hotel in hotels:
+            databases.setdefault(hotel_database(hotel), hotel)
+        hotels = list(databases.values())
+    return hotels
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeasonalPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('start_date', models.DateField(verbose_name='Начало периода')),
+                ('end_date', models.DateField(help_text='Последняя ночь периода включительно', verbose_name='Окончание периода')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена за ночь')),
+                ('priority', models.IntegerField(default=0, help_text='При пересечении периодов действует больший приоритет', verbose_name='Приоритет')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активна')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seasonal_prices', to='booking.roomtype', verbose_name='Тип номера')),
+            ],
+            options={
+                'verbose_name': 'Сезонная цена',
+                'verbose_name_plural': 'Сезонные цены',
+                'ordering': ['room_type', 'start_date'],
+                'indexes': [models.Index(fields=['room_type', 'start_date'], name='booking_sea_room_ty_295717_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:35
+
+from collections import Counter
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Booking = apps.get_model('booking', 'Booking')
+    RoomTypeAvailability = apps.get_model(
+        'booking', 'RoomTypeAvailability')
+    booked = Counter()
+    bookings = Booking.objects.using(db).filter(
+        status__in=['confirmed', 'checked_in'],
+        room__is_available=True,
+    ).values_list('room__room_type_id', 'check_in_date', 'check_out_date')
+    for room_type_id, check_in_date, check_out_date in bookings.iterator():
+        for night in range((check_out_date - check_in_date).days):
+            booked[room_type_id,
+                   check_in_date + timedelta(days=night)] += 1
+    RoomTypeAvailability.objects.using(db).bulk_create([
+        RoomTypeAvailability(
+            room_type_id=room_type_id, date=date, booked=count)
+        for (room_type_id, date), count in booked.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_seasonalprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomTypeAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Ночь')),
+                ('booked', models.IntegerField(default=0, verbose_name='Занято номеров')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='booking.roomtype', verbose_name='Тип номера')),
+            ],
+            options={
+                'verbose_name': 'Занятость типа номера',
+                'verbose_name_plural': 'Занятость типов номеров',
+                'unique_together': {('room_type', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
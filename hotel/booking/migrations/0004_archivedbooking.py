@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_roomtypeavailability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in_date', models.DateField(verbose_name='Дата заезда')),
+                ('check_out_date', models.DateField(verbose_name='Дата выезда')),
+                ('actual_check_in', models.DateTimeField(blank=True, null=True, verbose_name='Фактическое время заезда')),
+                ('actual_check_out', models.DateTimeField(blank=True, null=True, verbose_name='Фактическое время выезда')),
+                ('needs_child_bed', models.BooleanField(default=False, verbose_name='Детская кровать')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Общая стоимость')),
+                ('status', models.CharField(choices=[('pending', 'Ожидание'), ('confirmed', 'Подтверждено'), ('checked_in', 'Заселен'), ('checked_out', 'Выселен'), ('cancelled', 'Отменено')], max_length=15, verbose_name='Статус')),
+                ('notes', models.TextField(blank=True, verbose_name='Примечания')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+            ],
+            options={
+                'verbose_name': 'Архивное бронирование',
+                'verbose_name_plural': 'Архив бронирований',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['confirmed', 'checked_in'])), fields=['room', 'check_in_date', 'check_out_date'], name='booking_active_stay_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='booking.client', verbose_name='Клиент'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_bookings', to=settings.AUTH_USER_MODEL, verbose_name='Создано администратором'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='discount_applied',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bookings', to='booking.discount', verbose_name='Примененная скидка'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_bookings', to='booking.room', verbose_name='Номер'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['created_at'], name='booking_arc_created_b1d45e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['check_out_date'], name='booking_arc_check_o_d3424c_idx'),
+        ),
+    ]
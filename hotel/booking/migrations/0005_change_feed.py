@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_archivedbooking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.BigIntegerField(verbose_name='ID бронирования')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Удалено')),
+            ],
+            options={
+                'verbose_name': 'Удаленное бронирование',
+                'verbose_name_plural': 'Удаленные бронирования',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at', 'id'], name='booking_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedbooking',
+            index=models.Index(fields=['deleted_at', 'id'], name='deleted_booking_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_change_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in_date', models.DateField(verbose_name='Дата заезда')),
+                ('check_out_date', models.DateField(verbose_name='Дата выезда')),
+                ('needs_child_bed', models.BooleanField(default=False, verbose_name='Детская кровать')),
+                ('status', models.CharField(choices=[('waiting', 'Ожидает'), ('offered', 'Предложен номер'), ('accepted', 'Бронь подтверждена'), ('declined', 'Предложение отклонено'), ('expired', 'Истекло'), ('cancelled', 'Отменено')], default='waiting', max_length=15, verbose_name='Статус')),
+                ('offered_at', models.DateTimeField(blank=True, null=True, verbose_name='Предложено')),
+                ('notes', models.TextField(blank=True, verbose_name='Примечания')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='booking.client', verbose_name='Клиент')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL, verbose_name='Создано администратором')),
+                ('offer', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='booking.booking', verbose_name='Предложенная бронь')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='booking.roomtype', verbose_name='Тип номера')),
+            ],
+            options={
+                'verbose_name': 'Запрос в листе ожидания',
+                'verbose_name_plural': 'Лист ожидания',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'waiting')), fields=['room_type', 'check_in_date', 'check_out_date'], name='waitlist_waiting_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('kind', models.CharField(choices=[('occupancy', 'Наценка за загрузку'), ('lead_time', 'Скидка за раннее бронирование'), ('promotion', 'Акция'), ('child_bed', 'Детская кровать')], max_length=15, verbose_name='Вид правила')),
+                ('category', models.CharField(blank=True, choices=[('standard', 'Стандарт'), ('comfort', 'Комфорт'), ('lux', 'Люкс')], help_text='Пусто — все категории', max_length=10, verbose_name='Категория')),
+                ('percent', models.DecimalField(decimal_places=2, default=0, help_text='Наценка за ночь или скидка со стоимости', max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='Процент')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Для детской кровати', max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Сумма за ночь')),
+                ('min_occupancy', models.PositiveSmallIntegerField(default=0, validators=[django.core.validators.MaxValueValidator(100)], verbose_name='Загрузка от, %')),
+                ('min_lead_days', models.PositiveIntegerField(default=0, verbose_name='Дней до заезда, от')),
+                ('max_lead_days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Дней до заезда, до')),
+                ('min_nights', models.PositiveIntegerField(default=1, verbose_name='Минимум ночей')),
+                ('start_date', models.DateField(blank=True, help_text='Для наценки — ночи проживания, для скидок — дата заезда', null=True, verbose_name='Действует с')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Действует по')),
+                ('stackable', models.BooleanField(default=False, help_text='Суммируемые скидки применяются вместе; иначе действует одна — самая выгодная', verbose_name='Суммируется')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+            ],
+            options={
+                'verbose_name': 'Правило цены',
+                'verbose_name_plural': 'Правила цен',
+                'ordering': ['kind', 'category', 'pk'],
+            },
+        ),
+    ]
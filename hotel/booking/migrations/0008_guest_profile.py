@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_pricingrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestProfile',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile', serialize=False, to='booking.client', verbose_name='Клиент')),
+                ('stays', models.PositiveIntegerField(default=0, verbose_name='Проживаний')),
+                ('nights', models.PositiveIntegerField(default=0, verbose_name='Ночей')),
+                ('lifetime_value', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Сумма проживаний')),
+                ('last_stay', models.DateField(blank=True, null=True, verbose_name='Последний заезд')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Обновлен')),
+            ],
+            options={
+                'verbose_name': 'Профиль гостя',
+                'verbose_name_plural': 'Профили гостей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['phone'], name='client_phone_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_guest_profile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['confirmed', 'checked_in', 'checked_out'])), fields=['check_out_date', 'check_in_date'], name='booking_day_idx'),
+        ),
+    ]
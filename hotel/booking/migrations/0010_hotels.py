@@ -0,0 +1,164 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:05
+
+import booking.hotels
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_main_hotel(apps, schema_editor):
+    """Все существующие данные относятся к одной гостинице"""
+    db = schema_editor.connection.alias
+    Hotel = apps.get_model('booking', 'Hotel')
+    hotel, _ = Hotel.objects.using(db).get_or_create(
+        code='main', defaults={'name': 'Основная гостиница'})
+    for model in ('RoomType', 'Discount'):
+        apps.get_model('booking', model).objects.using(db).update(
+            hotel=hotel)
+    RoomType = apps.get_model('booking', 'RoomType')
+    Room = apps.get_model('booking', 'Room')
+    for model in ('Room', 'Price'):
+        apps.get_model('booking', model).objects.using(db).update(
+            hotel_id=models.Subquery(
+                RoomType.objects.using(db).filter(
+                    pk=models.OuterRef('room_type_id')).values('hotel_id')))
+    for model in ('Booking', 'ArchivedBooking'):
+        apps.get_model('booking', model).objects.using(db).update(
+            hotel_id=models.Subquery(
+                Room.objects.using(db).filter(
+                    pk=models.OuterRef('room_id')).values('hotel_id')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_booking_day_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hotel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('code', models.SlugField(help_text='Для заголовка X-Hotel и настройки HOTEL_DATABASES', max_length=20, unique=True, verbose_name='Код')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Действует')),
+            ],
+            options={
+                'verbose_name': 'Гостиница',
+                'verbose_name_plural': 'Гостиницы',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='hotel',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_bookings', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='hotel',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AddField(
+            model_name='discount',
+            name='hotel',
+            field=models.ForeignKey(default=booking.hotels.default_hotel_id, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='discounts', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AddField(
+            model_name='price',
+            name='hotel',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='prices', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='hotel',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='rooms', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='hotel',
+            field=models.ForeignKey(default=booking.hotels.default_hotel_id, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='room_types', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.RunPython(assign_main_hotel, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedbooking',
+            name='hotel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_bookings', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='hotel',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AlterField(
+            model_name='discount',
+            name='hotel',
+            field=models.ForeignKey(default=booking.hotels.default_hotel_id, on_delete=django.db.models.deletion.PROTECT, related_name='discounts', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AlterField(
+            model_name='price',
+            name='hotel',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='prices', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='hotel',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='rooms', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.AlterField(
+            model_name='roomtype',
+            name='hotel',
+            field=models.ForeignKey(default=booking.hotels.default_hotel_id, on_delete=django.db.models.deletion.PROTECT, related_name='room_types', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_day_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='price',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='roomtype',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='number',
+            field=models.CharField(max_length=10, verbose_name='Номер комнаты'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['hotel', '-created_at'], name='archived_hotel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['confirmed', 'checked_in', 'checked_out'])), fields=['hotel', 'check_out_date', 'check_in_date'], name='booking_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['hotel', '-created_at'], name='booking_hotel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discount',
+            index=models.Index(fields=['hotel', 'is_active', 'min_nights'], name='discount_hotel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['hotel', 'floor', 'number'], name='room_floor_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='price',
+            constraint=models.UniqueConstraint(fields=('hotel', 'room_type', 'day_of_week'), name='price_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.UniqueConstraint(fields=('hotel', 'number'), name='room_number_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='roomtype',
+            constraint=models.UniqueConstraint(fields=('hotel', 'category', 'capacity'), name='room_type_unique'),
+        ),
+    ]
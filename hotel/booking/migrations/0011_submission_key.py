@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_hotels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, verbose_name='Ключ')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создан')),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='booking.booking', verbose_name='Бронирование')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_keys', to=settings.AUTH_USER_MODEL, verbose_name='Сотрудник')),
+            ],
+            options={
+                'verbose_name': 'Ключ отправки',
+                'verbose_name_plural': 'Ключи отправки',
+                'indexes': [models.Index(fields=['created_at'], name='submission_key_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='submission_key_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def assign_hotel(apps, schema_editor):
+    """
+    Гостиница удаленной брони уже неизвестна: прежние записи
+    относятся к первой гостинице базы
+    """
+    db = schema_editor.connection.alias
+    Hotel = apps.get_model('booking', 'Hotel')
+    DeletedBooking = apps.get_model('booking', 'DeletedBooking')
+    hotel_id = Hotel.objects.using(db).order_by('pk').values_list(
+        'pk', flat=True).first()
+    DeletedBooking.objects.using(db).update(hotel_id=hotel_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_submission_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletedbooking',
+            name='hotel',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deleted_bookings', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+        migrations.RunPython(assign_hotel, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='deletedbooking',
+            name='hotel',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='deleted_bookings', to='booking.hotel', verbose_name='Гостиница'),
+        ),
+    ]
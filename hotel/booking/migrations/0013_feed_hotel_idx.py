@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_deleted_booking_hotel'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='deletedbooking',
+            name='deleted_booking_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['hotel', 'updated_at', 'id'], name='booking_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedbooking',
+            index=models.Index(fields=['hotel', 'deleted_at', 'id'], name='deleted_booking_feed_idx'),
+        ),
+    ]
@@ -1,6 +1,36 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .hotels import HotelManager, default_hotel_id
+
+
+class Hotel(models.Model):
+    """Гостиница. Номера, цены, скидки и брони относятся к одной из них"""
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Название'
+    )
+    code = models.SlugField(
+        max_length=20,
+        unique=True,
+        verbose_name='Код',
+        help_text='Для заголовка X-Hotel и настройки HOTEL_DATABASES'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='Действует'
+    )
+
+    class Meta:
+        verbose_name = 'Гостиница'
+        verbose_name_plural = 'Гостиницы'
+        ordering = ['pk']
+
+    def __str__(self):
+        return self.name
 
 
 class Client(models.Model):
@@ -12,11 +42,63 @@ class Client(models.Model):
     class Meta:
         verbose_name = 'Клиент'
         verbose_name_plural = 'Клиенты'
+        indexes = [
+            # Поиск постоянного гостя по телефону при создании брони
+            models.Index(fields=['phone'], name='client_phone_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.phone})"
 
 
+class GuestProfile(models.Model):
+    """
+    Статистика проживаний клиента. Сдвигается вместе с изменением
+    броней, чтобы не считать агрегаты по броням на каждой странице
+    """
+    client = models.OneToOneField(
+        Client,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='profile',
+        verbose_name='Клиент'
+    )
+    stays = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Проживаний'
+    )
+    nights = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ночей'
+    )
+    lifetime_value = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Сумма проживаний'
+    )
+    last_stay = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Последний заезд'
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Обновлен'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль гостя'
+        verbose_name_plural = 'Профили гостей'
+
+    def __str__(self):
+        return f"{self.client}: {self.stays} проживаний"
+
+    @property
+    def is_repeat(self):
+        return self.stays > 1
+
+
 class RoomType(models.Model):
     CATEGORY_CHOICES = (
         ('standard', 'Стандарт'),
@@ -43,11 +125,26 @@ class RoomType(models.Model):
         blank=True,
         verbose_name='Описание'
     )
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        default=default_hotel_id,
+        related_name='room_types',
+        verbose_name='Гостиница'
+    )
+
+    objects = HotelManager()
+    all_hotels = models.Manager()
 
     class Meta:
         verbose_name = 'Тип номера'
         verbose_name_plural = 'Типы номеров'
-        unique_together = ['category', 'capacity']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hotel', 'category', 'capacity'],
+                name='room_type_unique',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_category_display()} {self.get_capacity_display()}"
@@ -56,7 +153,6 @@ class RoomType(models.Model):
 class Room(models.Model):
     number = models.CharField(
         max_length=10,
-        unique=True,
         verbose_name='Номер комнаты'
     )
     room_type = models.ForeignKey(
@@ -72,15 +168,46 @@ class Room(models.Model):
         default=True,
         verbose_name='Доступен для бронирования'
     )
+    # Гостиница номера — гостиница его типа; хранится в строке,
+    # чтобы отбор по гостинице шел по индексу без соединения
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        editable=False,
+        related_name='rooms',
+        verbose_name='Гостиница'
+    )
+
+    objects = HotelManager()
+    all_hotels = models.Manager()
 
     class Meta:
         verbose_name = 'Номер'
         verbose_name_plural = 'Номера'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hotel', 'number'],
+                name='room_number_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['hotel', 'floor', 'number'],
+                name='room_floor_idx',
+            ),
+        ]
 
     def __str__(self):
         status = "✅" if self.is_available else "❌"
         return f"Номер {self.number} ({self.room_type}) {status}"
 
+    def save(self, *args, **kwargs):
+        # Гостиница берется из типа номера, если он загружен или задан
+        if self.hotel_id is None or \
+                self._meta.get_field('room_type').is_cached(self):
+            self.hotel_id = self.room_type.hotel_id
+        super().save(*args, **kwargs)
+
 
 class Price(models.Model):
     DAYS_OF_WEEK = (
@@ -108,11 +235,26 @@ class Price(models.Model):
         decimal_places=2,
         verbose_name='Цена'
     )
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        editable=False,
+        related_name='prices',
+        verbose_name='Гостиница'
+    )
+
+    objects = HotelManager()
+    all_hotels = models.Manager()
 
     class Meta:
         verbose_name = 'Цена'
         verbose_name_plural = 'Цены'
-        unique_together = ['room_type', 'day_of_week']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hotel', 'room_type', 'day_of_week'],
+                name='price_unique',
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -120,6 +262,67 @@ class Price(models.Model):
             f"{self.get_day_of_week_display()}: {self.price}₽"
         )
 
+    def save(self, *args, **kwargs):
+        # Гостиница берется из типа номера, если он загружен или задан
+        if self.hotel_id is None or \
+                self._meta.get_field('room_type').is_cached(self):
+            self.hotel_id = self.room_type.hotel_id
+        super().save(*args, **kwargs)
+
+
+class SeasonalPrice(models.Model):
+    """Цена на период (сезон, праздники, события) поверх цен по дням"""
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name='seasonal_prices',
+        verbose_name='Тип номера'
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Название'
+    )
+    start_date = models.DateField(verbose_name='Начало периода')
+    end_date = models.DateField(
+        verbose_name='Окончание периода',
+        help_text='Последняя ночь периода включительно'
+    )
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='Цена за ночь'
+    )
+    priority = models.IntegerField(
+        default=0,
+        verbose_name='Приоритет',
+        help_text='При пересечении периодов действует больший приоритет'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='Активна'
+    )
+
+    class Meta:
+        verbose_name = 'Сезонная цена'
+        verbose_name_plural = 'Сезонные цены'
+        ordering = ['room_type', 'start_date']
+        indexes = [
+            models.Index(fields=['room_type', 'start_date']),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.room_type} - {self.name} "
+            f"({self.start_date:%d.%m.%Y}–{self.end_date:%d.%m.%Y}): "
+            f"{self.price}₽"
+        )
+
+    def clean(self):
+        if (self.start_date and self.end_date
+                and self.end_date < self.start_date):
+            raise ValidationError(
+                'Окончание периода не может быть раньше начала')
+
 
 class Discount(models.Model):
     name = models.CharField(
@@ -139,16 +342,136 @@ class Discount(models.Model):
         default=True,
         verbose_name='Активна'
     )
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        default=default_hotel_id,
+        related_name='discounts',
+        verbose_name='Гостиница'
+    )
+
+    objects = HotelManager()
+    all_hotels = models.Manager()
 
     class Meta:
         verbose_name = 'Скидка'
         verbose_name_plural = 'Скидки'
+        indexes = [
+            models.Index(
+                fields=['hotel', 'is_active', 'min_nights'],
+                name='discount_hotel_idx',
+            ),
+        ]
 
     def __str__(self):
         status = "✅" if self.is_active else "❌"
         return f"{self.name} ({self.discount_percent}%) {status}"
 
 
+class PricingRule(models.Model):
+    """
+    Правило динамического ценообразования.
+    Правила собираются в план расчета один раз на версию цен
+    """
+    KIND_CHOICES = (
+        ('occupancy', 'Наценка за загрузку'),
+        ('lead_time', 'Скидка за раннее бронирование'),
+        ('promotion', 'Акция'),
+        ('child_bed', 'Детская кровать'),
+    )
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Название'
+    )
+    kind = models.CharField(
+        max_length=15,
+        choices=KIND_CHOICES,
+        verbose_name='Вид правила'
+    )
+    category = models.CharField(
+        max_length=10,
+        choices=RoomType.CATEGORY_CHOICES,
+        blank=True,
+        verbose_name='Категория',
+        help_text='Пусто — все категории'
+    )
+    percent = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        verbose_name='Процент',
+        help_text='Наценка за ночь или скидка со стоимости'
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Сумма за ночь',
+        help_text='Для детской кровати'
+    )
+    min_occupancy = models.PositiveSmallIntegerField(
+        default=0,
+        validators=[MaxValueValidator(100)],
+        verbose_name='Загрузка от, %'
+    )
+    min_lead_days = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Дней до заезда, от'
+    )
+    max_lead_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Дней до заезда, до'
+    )
+    min_nights = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Минимум ночей'
+    )
+    start_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Действует с',
+        help_text='Для наценки — ночи проживания, для скидок — дата заезда'
+    )
+    end_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Действует по'
+    )
+    stackable = models.BooleanField(
+        default=False,
+        verbose_name='Суммируется',
+        help_text='Суммируемые скидки применяются вместе; иначе '
+                  'действует одна — самая выгодная'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='Активно'
+    )
+
+    class Meta:
+        verbose_name = 'Правило цены'
+        verbose_name_plural = 'Правила цен'
+        ordering = ['kind', 'category', 'pk']
+
+    def __str__(self):
+        status = "✅" if self.is_active else "❌"
+        return f"{self.name} ({self.get_kind_display()}) {status}"
+
+    def clean(self):
+        if (self.start_date and self.end_date
+                and self.end_date < self.start_date):
+            raise ValidationError(
+                'Окончание периода не может быть раньше начала')
+        if (self.max_lead_days is not None
+                and self.max_lead_days < self.min_lead_days):
+            raise ValidationError(
+                'Верхняя граница дней до заезда меньше нижней')
+
+
 class Booking(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Ожидание'),
@@ -158,6 +481,13 @@ class Booking(models.Model):
         ('cancelled', 'Отменено'),
     )
 
+    # Допустимые смены статуса — действия на странице брони
+    STATUS_TRANSITIONS = {
+        'pending': ('confirmed', 'cancelled'),
+        'confirmed': ('checked_in', 'cancelled'),
+        'checked_in': ('checked_out',),
+    }
+
     client = models.ForeignKey(
         Client,
         on_delete=models.CASCADE,
@@ -210,19 +540,358 @@ class Booking(models.Model):
         verbose_name='Создано администратором'
     )
     notes = models.TextField(blank=True, verbose_name='Примечания')
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        editable=False,
+        related_name='bookings',
+        verbose_name='Гостиница'
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HotelManager()
+    all_hotels = models.Manager()
+
+    # Закрытые брони со временем переносятся в ArchivedBooking
+    is_archived = False
+
     class Meta:
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['-created_at']
+        indexes = [
+            # Проверки пересечений читают только активные брони:
+            # частичный индекс не растет за счет закрытых
+            models.Index(
+                fields=['room', 'check_in_date', 'check_out_date'],
+                condition=models.Q(status__in=['confirmed', 'checked_in']),
+                name='booking_active_stay_idx',
+            ),
+            # Лента изменений гостиницы читает диапазон по отметке
+            # (updated_at, id)
+            models.Index(
+                fields=['hotel', 'updated_at', 'id'],
+                name='booking_updated_idx',
+            ),
+            # Рабочие листы дня: брони гостиницы с выездом не раньше
+            # дня, заезд проверяется по тому же индексу
+            models.Index(
+                fields=['hotel', 'check_out_date', 'check_in_date'],
+                condition=models.Q(
+                    status__in=['confirmed', 'checked_in', 'checked_out']),
+                name='booking_day_idx',
+            ),
+            # Списки броней гостиницы по дате создания
+            models.Index(
+                fields=['hotel', '-created_at'],
+                name='booking_hotel_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Бронирование #{self.id} - {self.client}"
 
+    def save(self, *args, **kwargs):
+        # Гостиница брони — гостиница номера; номер загружается,
+        # только если гостиница еще не известна
+        if self.hotel_id is None or \
+                self._meta.get_field('room').is_cached(self):
+            self.hotel_id = self.room.hotel_id
+        super().save(*args, **kwargs)
+
     @property
     def nights(self):
         """Количество ночей в бронировании"""
         return (self.check_out_date - self.check_in_date).days
+
+
+class ArchivedBooking(models.Model):
+    """
+    Закрытая бронь, перенесенная из Booking.
+    Первичный ключ совпадает с исходным, поэтому ссылки остаются рабочими
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings',
+        verbose_name='Клиент'
+    )
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.PROTECT,
+        related_name='archived_bookings',
+        verbose_name='Номер'
+    )
+    check_in_date = models.DateField(verbose_name='Дата заезда')
+    check_out_date = models.DateField(verbose_name='Дата выезда')
+    actual_check_in = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Фактическое время заезда'
+    )
+    actual_check_out = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Фактическое время выезда'
+    )
+    needs_child_bed = models.BooleanField(
+        default=False,
+        verbose_name='Детская кровать'
+    )
+    total_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name='Общая стоимость'
+    )
+    discount_applied = models.ForeignKey(
+        Discount,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_bookings',
+        verbose_name='Примененная скидка'
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=Booking.STATUS_CHOICES,
+        verbose_name='Статус'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT,
+        related_name='archived_bookings',
+        verbose_name='Создано администратором'
+    )
+    notes = models.TextField(blank=True, verbose_name='Примечания')
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        related_name='archived_bookings',
+        verbose_name='Гостиница'
+    )
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Перенесено в архив'
+    )
+
+    objects = HotelManager()
+    all_hotels = models.Manager()
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'Архивное бронирование'
+        verbose_name_plural = 'Архив бронирований'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['check_out_date']),
+            models.Index(
+                fields=['hotel', '-created_at'],
+                name='archived_hotel_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Бронирование #{self.id} (архив) - {self.client}"
+
+    @property
+    def nights(self):
+        """Количество ночей в бронировании"""
+        return (self.check_out_date - self.check_in_date).days
+
+
+class DeletedBooking(models.Model):
+    """
+    Запись об удалении брони для ленты изменений.
+    Перенос в архив удалением не считается
+    """
+    booking_id = models.BigIntegerField(verbose_name='ID бронирования')
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Удалено'
+    )
+    hotel = models.ForeignKey(
+        Hotel,
+        on_delete=models.PROTECT,
+        editable=False,
+        related_name='deleted_bookings',
+        verbose_name='Гостиница'
+    )
+
+    objects = HotelManager()
+    all_hotels = models.Manager()
+
+    class Meta:
+        verbose_name = 'Удаленное бронирование'
+        verbose_name_plural = 'Удаленные бронирования'
+        indexes = [
+            models.Index(
+                fields=['hotel', 'deleted_at', 'id'],
+                name='deleted_booking_feed_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Бронирование #{self.booking_id} удалено"
+
+
+class SubmissionKey(models.Model):
+    """
+    Ключ отправки формы или запроса API на создание брони.
+    Повтор с тем же ключом получает уже созданную бронь
+    """
+    key = models.CharField(max_length=64, verbose_name='Ключ')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='submission_keys',
+        verbose_name='Сотрудник'
+    )
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Бронирование'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Создан'
+    )
+
+    class Meta:
+        verbose_name = 'Ключ отправки'
+        verbose_name_plural = 'Ключи отправки'
+        constraints = [
+            # Одновременные повторы ждут друг друга на этом индексе
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='submission_key_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                name='submission_key_created_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Ключ {self.key} ({self.user})"
+
+
+class WaitlistEntry(models.Model):
+    """
+    Запрос клиента на тип номера и даты, когда свободных номеров нет.
+    При отмене или раннем выезде клиенту создается предложение —
+    неподтвержденная бронь освободившегося номера
+    """
+    STATUS_CHOICES = (
+        ('waiting', 'Ожидает'),
+        ('offered', 'Предложен номер'),
+        ('accepted', 'Бронь подтверждена'),
+        ('declined', 'Предложение отклонено'),
+        ('expired', 'Истекло'),
+        ('cancelled', 'Отменено'),
+    )
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='waitlist',
+        verbose_name='Клиент'
+    )
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name='waitlist',
+        verbose_name='Тип номера'
+    )
+    check_in_date = models.DateField(verbose_name='Дата заезда')
+    check_out_date = models.DateField(verbose_name='Дата выезда')
+    needs_child_bed = models.BooleanField(
+        default=False,
+        verbose_name='Детская кровать'
+    )
+    status = models.CharField(
+        max_length=15,
+        choices=STATUS_CHOICES,
+        default='waiting',
+        verbose_name='Статус'
+    )
+    offer = models.OneToOneField(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='waitlist_entry',
+        verbose_name='Предложенная бронь'
+    )
+    offered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Предложено'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT,
+        verbose_name='Создано администратором'
+    )
+    notes = models.TextField(blank=True, verbose_name='Примечания')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Запрос в листе ожидания'
+        verbose_name_plural = 'Лист ожидания'
+        ordering = ['created_at']
+        indexes = [
+            # Индекс интервалов ожидающих запросов: освободившийся
+            # период ищется диапазоном по дате заезда внутри типа
+            models.Index(
+                fields=['room_type', 'check_in_date', 'check_out_date'],
+                condition=models.Q(status='waiting'),
+                name='waitlist_waiting_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return (f"Лист ожидания #{self.id} - {self.client}, "
+                f"{self.check_in_date:%d.%m} - {self.check_out_date:%d.%m}")
+
+    @property
+    def nights(self):
+        """Количество ночей в запросе"""
+        return (self.check_out_date - self.check_in_date).days
+
+
+class RoomTypeAvailability(models.Model):
+    """
+    Сколько номеров типа занято активными бронями в каждую ночь.
+    Поддерживается сигналами при каждом изменении брони
+    """
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name='availability',
+        verbose_name='Тип номера'
+    )
+    date = models.DateField(verbose_name='Ночь')
+    booked = models.IntegerField(
+        default=0,
+        verbose_name='Занято номеров'
+    )
+
+    class Meta:
+        verbose_name = 'Занятость типа номера'
+        verbose_name_plural = 'Занятость типов номеров'
+        unique_together = ['room_type', 'date']
+
+    def __str__(self):
+        return f"{self.room_type} {self.date:%d.%m.%Y}: {self.booked}"
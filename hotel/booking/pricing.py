@@ -0,0 +1,468 @@
+"""
+Снимок цен для быстрых расчетов.
+
+Для каждого типа номера строится индекс: цены по дням недели и
+отсортированный список непересекающихся сезонных интервалов.
+Стоимость проживания считается одним проходом по ночам и интервалам,
+без запросов к базе. Правила цен (PricingRule) и скидки разбираются
+в план расчета для каждой категории гостиницы: уровни наценки
+за загрузку, тариф детской кровати и кандидаты в скидки (правила общие,
+скидки — свои у каждой гостиницы). Снимок и планы пересобираются
+при смене версии цен или календарного дня; при гостиницах в отдельных
+базах снимок у каждой базы свой.
+"""
+import heapq
+import threading
+from bisect import bisect_right
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .hotels import hotel_database
+from .models import Discount, Price, PricingRule, RoomType, SeasonalPrice
+from .versions import BOOKINGS, PRICING, get_version
+
+BASE_PRICES = {
+    'standard': 2000,
+    'comfort': 2500,
+    'lux': 3000
+}
+
+# Детская кровать за ночь, если для категории нет правила
+CHILD_BED_PRICE = Decimal(500)
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal(100)
+
+
+def flatten_seasons(seasons):
+    """
+    Пересекающиеся периоды -> отсортированные непересекающиеся
+    интервалы [начало, конец) с ценой периода наибольшего приоритета.
+    seasons: (start, end_exclusive, priority, order, price)
+    """
+    boundaries = sorted({
+        point for start, end, *_ in seasons for point in (start, end)
+    })
+    by_start = sorted(seasons, key=lambda season: season[0])
+
+    segments = []
+    active = []
+    next_season = 0
+    for left, right in zip(boundaries, boundaries[1:]):
+        while (next_season < len(by_start)
+               and by_start[next_season][0] <= left):
+            start, end, priority, order, price = by_start[next_season]
+            heapq.heappush(active, (-priority, -order, end, price))
+            next_season += 1
+        # Ленивое удаление закончившихся периодов
+        while active and active[0][2] <= left:
+            heapq.heappop(active)
+        if not active:
+            continue
+        price = active[0][3]
+        if segments and segments[-1][1] == left \
+                and segments[-1][2] == price:
+            segments[-1] = (segments[-1][0], right, price)
+        else:
+            segments.append((left, right, price))
+    return segments
+
+
+class RoomTypePrices:
+    """Индекс цен одного типа номера"""
+
+    def __init__(self, weekday_prices, segments):
+        # weekday_prices[0] — понедельник
+        self.weekday_prices = weekday_prices
+        self.segments = segments
+        self.starts = [segment[0] for segment in segments]
+        # (первая дата, цены по ночам) — заранее рассчитанный горизонт
+        self.horizon = None
+
+    def nightly_prices(self, check_in_date, check_out_date):
+        """Цены всех ночей периода одним проходом по интервалам"""
+        if self.horizon is not None:
+            horizon_start, horizon = self.horizon
+            offset = (check_in_date - horizon_start).days
+            end = (check_out_date - horizon_start).days
+            if offset >= 0 and end <= len(horizon):
+                return horizon[offset:end]
+
+        prices = []
+        segments = self.segments
+        index = max(bisect_right(self.starts, check_in_date) - 1, 0)
+        current_date = check_in_date
+        while current_date < check_out_date:
+            while index < len(segments) and \
+                    segments[index][1] <= current_date:
+                index += 1
+            if index < len(segments) and \
+                    segments[index][0] <= current_date:
+                prices.append(segments[index][2])
+            else:
+                prices.append(
+                    self.weekday_prices[current_date.weekday()])
+            current_date += timedelta(days=1)
+        return prices
+
+    def precompute(self, start_date, days):
+        """Заранее рассчитать цены на горизонт продаж"""
+        self.horizon = (start_date, self.nightly_prices(
+            start_date, start_date + timedelta(days=days)))
+
+
+class DiscountRule:
+    """Кандидат в скидки: правило PricingRule или скидка Discount"""
+    __slots__ = ('name', 'kind', 'percent', 'min_nights', 'min_lead',
+                 'max_lead', 'start', 'end', 'stackable', 'discount_id')
+
+    def __init__(self, name, kind, percent, min_nights=1, min_lead=0,
+                 max_lead=None, start=None, end=None, stackable=False,
+                 discount_id=None):
+        self.name = name
+        self.kind = kind
+        self.percent = percent
+        self.min_nights = min_nights
+        self.min_lead = min_lead
+        self.max_lead = max_lead
+        self.start = start
+        self.end = end
+        self.stackable = stackable
+        self.discount_id = discount_id
+
+    def applies(self, check_in_date, nights, lead):
+        return (nights >= self.min_nights
+                and lead >= self.min_lead
+                and (self.max_lead is None or lead <= self.max_lead)
+                and (self.start is None or check_in_date >= self.start)
+                and (self.end is None or check_in_date <= self.end))
+
+
+class RulePlan:
+    """
+    Правила одной категории, разобранные для расчета:
+    уровни наценки по убыванию порога, тариф детской кровати,
+    суммируемые и исключающие друг друга скидки
+    """
+
+    def __init__(self, rules, discounts):
+        # (доля загрузки, процент, начало, конец, название)
+        self.surcharges = sorted(
+            (
+                (Decimal(rule.min_occupancy) / HUNDRED, rule.percent,
+                 rule.start_date, rule.end_date, rule.name)
+                for rule in rules if rule.kind == 'occupancy'
+            ),
+            key=lambda tier: tier[0], reverse=True)
+
+        # Правило категории важнее общего
+        child_bed = sorted(
+            (rule for rule in rules if rule.kind == 'child_bed'),
+            key=lambda rule: (not rule.category, rule.pk))
+        self.child_bed_price = (
+            child_bed[0].amount if child_bed else CHILD_BED_PRICE)
+
+        candidates = [
+            DiscountRule(
+                rule.name, rule.kind, rule.percent, rule.min_nights,
+                rule.min_lead_days, rule.max_lead_days, rule.start_date,
+                rule.end_date, rule.stackable)
+            for rule in rules if rule.kind in ('lead_time', 'promotion')
+        ]
+        # Скидки за длительность всегда исключающие
+        candidates += [
+            DiscountRule(
+                discount.name, 'discount', discount.discount_percent,
+                discount.min_nights, discount_id=discount.pk)
+            for discount in discounts
+        ]
+        self.stackable = [rule for rule in candidates if rule.stackable]
+        self.exclusive = [
+            rule for rule in candidates if not rule.stackable]
+
+        self.uses_occupancy = bool(self.surcharges)
+        self.uses_lead_time = any(
+            rule.min_lead or rule.max_lead is not None
+            for rule in candidates)
+
+    def surcharge_for(self, night, ratio):
+        """(процент, название) наценки за ночь или None"""
+        for threshold, percent, start, end, name in self.surcharges:
+            if ratio >= threshold \
+                    and (start is None or night >= start) \
+                    and (end is None or night <= end):
+                return percent, name
+        return None
+
+    def best_discount(self, check_in_date, nights, lead):
+        """
+        (процент, названия, id скидки Discount): суммируемые скидки
+        вместе против лучшей исключающей — берется выгоднейшее
+        """
+        exclusive = None
+        for rule in self.exclusive:
+            if rule.applies(check_in_date, nights, lead) and (
+                    exclusive is None or rule.percent > exclusive.percent):
+                exclusive = rule
+
+        factor = Decimal(1)
+        stacked = []
+        for rule in self.stackable:
+            if rule.applies(check_in_date, nights, lead):
+                factor *= 1 - rule.percent / HUNDRED
+                stacked.append(rule.name)
+        stacked_percent = (1 - factor) * HUNDRED
+
+        if exclusive is not None and exclusive.percent >= stacked_percent:
+            return exclusive.percent, [exclusive.name], exclusive.discount_id
+        if stacked:
+            return stacked_percent, stacked, None
+        return Decimal(0), [], None
+
+
+class PriceResolver:
+    """
+    Снимок цен, скидок и правил всех типов номеров.
+    room_types: (id, категория, гостиница)
+    """
+
+    def __init__(self, version, room_types, prices, seasons, discounts,
+                 rules=()):
+        self.version = version
+        self.discounts = discounts
+        self.horizon_start = None
+        self.horizon_days = 0
+        self.room_types = {}
+        self.categories = {}
+        self.hotels = {}
+
+        room_types = list(room_types)
+        hotel_discounts = {}
+        for discount in discounts:
+            hotel_discounts.setdefault(discount.hotel_id, []).append(
+                discount)
+        plans_rules = {}
+        for rule in rules:
+            plans_rules.setdefault(rule.category, []).append(rule)
+        self.plans = {
+            (hotel_id, category): RulePlan(
+                plans_rules.get('', []) + plans_rules.get(category, []),
+                hotel_discounts.get(hotel_id, []))
+            for hotel_id in {hotel_id for _, _, hotel_id in room_types}
+            for category, _ in RoomType.CATEGORY_CHOICES
+        }
+        self.default_plan = RulePlan(plans_rules.get('', []), [])
+        self.uses_lead_time = any(
+            plan.uses_lead_time for plan in self.plans.values())
+
+        weekday = {}
+        first_price = {}
+        for room_type_id, day_of_week, price in prices:
+            weekday[(room_type_id, day_of_week)] = price
+            first_price.setdefault(room_type_id, price)
+
+        grouped = {}
+        for order, season in enumerate(seasons):
+            room_type_id, start, end, priority, price = season
+            grouped.setdefault(room_type_id, []).append(
+                (start, end + timedelta(days=1), priority, order, price))
+
+        for room_type_id, category, hotel_id in room_types:
+            self.categories[room_type_id] = category
+            self.hotels[room_type_id] = hotel_id
+            fallback = first_price.get(
+                room_type_id, BASE_PRICES.get(category, 2000))
+            weekday_prices = [
+                weekday.get((room_type_id, day), fallback)
+                for day in range(1, 8)
+            ]
+            self.room_types[room_type_id] = RoomTypePrices(
+                weekday_prices,
+                flatten_seasons(grouped.get(room_type_id, [])))
+
+    @classmethod
+    def load(cls, version):
+        # Снимок общий для всех гостиниц базы: менеджеры без отбора
+        return cls(
+            version,
+            RoomType.all_hotels.values_list('id', 'category', 'hotel_id'),
+            Price.all_hotels.order_by('pk').values_list(
+                'room_type_id', 'day_of_week', 'price'),
+            SeasonalPrice.objects.filter(is_active=True).order_by(
+                'pk').values_list('room_type_id', 'start_date',
+                                  'end_date', 'priority', 'price'),
+            list(Discount.all_hotels.filter(is_active=True).order_by(
+                '-min_nights', 'pk')),
+            list(PricingRule.objects.filter(is_active=True).order_by('pk')),
+        )
+
+    def for_room_type(self, room_type):
+        room_type_id = getattr(room_type, 'pk', room_type)
+        prices = self.room_types.get(room_type_id)
+        if prices is None:
+            # Тип добавлен после сборки снимка
+            category = getattr(room_type, 'category', None)
+            fallback = BASE_PRICES.get(category, 2000)
+            prices = RoomTypePrices([fallback] * 7, [])
+        return prices
+
+    def nightly_prices(self, room_type, check_in_date, check_out_date):
+        return self.for_room_type(room_type).nightly_prices(
+            check_in_date, check_out_date)
+
+    def price_for_date(self, room_type, date_obj):
+        return self.nightly_prices(
+            room_type, date_obj, date_obj + timedelta(days=1))[0]
+
+    def plan_for(self, room_type):
+        room_type_id = getattr(room_type, 'pk', room_type)
+        category = self.categories.get(
+            room_type_id, getattr(room_type, 'category', None))
+        hotel_id = self.hotels.get(
+            room_type_id, getattr(room_type, 'hotel_id', None))
+        return self.plans.get((hotel_id, category), self.default_plan)
+
+    def uses_occupancy(self, room_type):
+        """Зависит ли расчет типа от загрузки"""
+        return self.plan_for(room_type).uses_occupancy
+
+    def surcharged_prices(self, room_type, check_in_date, check_out_date,
+                          ratios):
+        """Цены ночей с наценкой за загрузку; ratios — доли по ночам"""
+        prices = self.nightly_prices(room_type, check_in_date, check_out_date)
+        plan = self.plan_for(room_type)
+        if not plan.uses_occupancy or ratios is None:
+            return prices
+        result = []
+        for offset, price in enumerate(prices):
+            surcharge = plan.surcharge_for(
+                check_in_date + timedelta(days=offset), ratios[offset])
+            if surcharge is not None:
+                price = price + price * surcharge[0] / HUNDRED
+            result.append(price)
+        return result
+
+    def quote(self, room_type, check_in_date, check_out_date,
+              needs_child_bed=False, ratios=None, today=None):
+        """
+        Расчет по плану без запросов к базе.
+        ratios — доля занятых номеров типа на каждую ночь
+        (нужна, только если у категории есть наценки за загрузку);
+        today — от него считается срок до заезда
+        """
+        if today is None:
+            today = self.horizon_start or timezone.now().date()
+        plan = self.plan_for(room_type)
+        nightly = self.nightly_prices(room_type, check_in_date, check_out_date)
+        nights = len(nightly)
+        base_total = sum(nightly, Decimal(0))
+        adjustments = []
+
+        surcharge_total = Decimal(0)
+        if plan.uses_occupancy and ratios is not None:
+            night = check_in_date
+            for price, ratio in zip(nightly, ratios):
+                surcharge = plan.surcharge_for(night, ratio)
+                if surcharge is not None:
+                    amount = price * surcharge[0] / HUNDRED
+                    surcharge_total += amount
+                    adjustments.append({
+                        'kind': 'occupancy', 'name': surcharge[1],
+                        'date': night, 'amount': _money(amount),
+                    })
+                night += timedelta(days=1)
+
+        child_bed_total = Decimal(0)
+        if needs_child_bed:
+            child_bed_total = plan.child_bed_price * nights
+
+        total = base_total + surcharge_total + child_bed_total
+        percent, names, discount_id = plan.best_discount(
+            check_in_date, nights, (check_in_date - today).days)
+        discount_amount = _money(total * percent / HUNDRED)
+        if discount_amount:
+            adjustments.append({
+                'kind': 'discount', 'name': ' + '.join(names),
+                'amount': -discount_amount,
+            })
+
+        return {
+            'total_price': _money(total) - discount_amount,
+            'base_price': _money(base_total),
+            'surcharge': _money(surcharge_total),
+            'child_bed_price': _money(child_bed_total),
+            'nights': nights,
+            'discount_amount': discount_amount,
+            'discount_percent': _money(percent),
+            'has_discount': bool(names),
+            'discount_id': discount_id,
+            'discount_name': ' + '.join(names) if names else None,
+            'adjustments': adjustments,
+        }
+
+    def discount_for(self, nights, hotel_id):
+        """Лучшая активная скидка гостиницы по количеству ночей"""
+        for discount in self.discounts:
+            if discount.hotel_id == hotel_id \
+                    and discount.min_nights <= nights:
+                return discount
+        return None
+
+    def precompute(self, start_date, days):
+        """Заранее рассчитать цены всех типов на горизонт продаж"""
+        for prices in self.room_types.values():
+            prices.precompute(start_date, days)
+        self.horizon_start = start_date
+        self.horizon_days = days
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+_lock = threading.Lock()
+_resolvers = {}
+
+
+def get_resolver():
+    """
+    Снимок цен для текущей версии и базы текущей гостиницы.
+    Собирается один раз на процесс и пересобирается при смене версии
+    цен или календарного дня
+    """
+    database = hotel_database()
+    version = get_version(PRICING)
+    today = timezone.now().date()
+    resolver = _resolvers.get(database)
+    if resolver is None or resolver.version != version \
+            or resolver.horizon_start != today:
+        with _lock:
+            resolver = _resolvers.get(database)
+            if resolver is None or resolver.version != version \
+                    or resolver.horizon_start != today:
+                resolver = PriceResolver.load(version)
+                resolver.precompute(today, settings.PRICE_HORIZON_DAYS)
+                _resolvers[database] = resolver
+    return resolver
+
+
+def quote_version(resolver=None):
+    """
+    От чего зависит результат расчета: версия цен, а при правилах
+    раннего бронирования и наценках за загрузку — еще текущий день
+    и версия броней. Часть ключей кэша расчетов и ETag
+    """
+    if resolver is None:
+        resolver = get_resolver()
+    parts = [str(resolver.version)]
+    database = hotel_database()
+    if database != 'default':
+        parts.append(database)
+    if resolver.uses_lead_time:
+        parts.append(resolver.horizon_start.strftime('%Y%m%d'))
+    if any(plan.uses_occupancy for plan in resolver.plans.values()):
+        parts.append('b%s' % get_version(BOOKINGS))
+    return '.'.join(parts)
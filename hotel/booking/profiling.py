@@ -0,0 +1,183 @@
+"""
+Выборочное профилирование запросов.
+
+Профилируется доля PROFILING_SAMPLE_RATE запросов и каждый запрос
+сотрудника с заголовком PROFILING_HEADER. Для каждого имени маршрута
+на диске хранятся PROFILING_KEEP самых медленных профилей cProfile:
+длительность записана в начале имени файла, поэтому отбор — это
+сортировка имен без чтения самих профилей. Когда выборка выключена,
+запрос стоит одну проверку словаря заголовков.
+"""
+import cProfile
+import json
+import pstats
+import random
+import re
+import secrets
+import shutil
+import time
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+# Имена каталогов и файлов, которые отдаются по ссылкам страницы;
+# имя не может начинаться с точки, поэтому . и .. не проходят
+NAME_RE = re.compile(r'^[\w-][\w.-]*$')
+
+
+def profiles_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def _inside(path, root):
+    """Путь после разрешения ссылок остается внутри root"""
+    return path.resolve().is_relative_to(root.resolve())
+
+
+def _header_key():
+    header = settings.PROFILING_HEADER
+    if not header:
+        return None
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+
+class ProfilingMiddleware:
+    """
+    Синхронные запросы профилируются целиком, включая остальные
+    middleware ниже по списку. Асинхронные представления (поток
+    событий панели) пропускаются: cProfile видит только один поток
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.header_key = _header_key()
+        if not self.sample_rate and not self.header_key:
+            # Полностью выключено: middleware выпадает из цепочки
+            raise MiddlewareNotUsed
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.get_response(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В потоке уже работает другой профилировщик
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+        save_profile(profiler, request, response, duration)
+        return response
+
+    def should_profile(self, request):
+        if self.header_key and self.header_key in request.META:
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_staff)
+        return bool(self.sample_rate) and \
+            random.random() < self.sample_rate
+
+
+def save_profile(profiler, request, response, duration):
+    """Сохранить профиль, если он входит в число самых медленных"""
+    match = request.resolver_match
+    url_name = (match.url_name if match and match.url_name
+                else 'unresolved')
+    if not NAME_RE.match(url_name):
+        url_name = 'unresolved'
+    directory = profiles_dir() / url_name
+    directory.mkdir(parents=True, exist_ok=True)
+
+    duration_ms = int(duration * 1000)
+    keep = settings.PROFILING_KEEP
+    stored = sorted(directory.glob('*.prof'), reverse=True)
+    if len(stored) >= keep and \
+            duration_ms <= _duration_of(stored[keep - 1]):
+        return None
+
+    name = f'{duration_ms:08d}-{int(time.time())}-{secrets.token_hex(3)}'
+    profiler.dump_stats(directory / f'{name}.prof')
+    (directory / f'{name}.json').write_text(json.dumps({
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'duration_ms': duration_ms,
+        'user': getattr(getattr(request, 'user', None), 'username', ''),
+        'created_at': timezone.now().isoformat(),
+    }, ensure_ascii=False))
+
+    for path in sorted(directory.glob('*.prof'), reverse=True)[keep:]:
+        # Лишние профили могут одновременно удалять другие процессы
+        path.unlink(missing_ok=True)
+        path.with_suffix('.json').unlink(missing_ok=True)
+    return name
+
+
+def _duration_of(path):
+    return int(path.name.split('-', 1)[0])
+
+
+def list_profiles():
+    """{имя маршрута: [описания профилей, самые медленные первыми]}"""
+    root = profiles_dir()
+    if not root.is_dir():
+        return {}
+    result = {}
+    for directory in sorted(root.iterdir()):
+        if not directory.is_dir():
+            continue
+        items = []
+        for path in sorted(directory.glob('*.prof'), reverse=True):
+            try:
+                meta = json.loads(path.with_suffix('.json').read_text())
+            except (OSError, ValueError):
+                meta = {'duration_ms': _duration_of(path)}
+            items.append({'name': path.stem, **meta})
+        if items:
+            result[directory.name] = items
+    return result
+
+
+def profile_path(url_name, name):
+    """Путь к профилю или None, если имя некорректно или файла нет"""
+    if not NAME_RE.match(url_name) or not NAME_RE.match(name):
+        return None
+    root = profiles_dir()
+    path = root / url_name / f'{name}.prof'
+    if not _inside(path, root):
+        return None
+    return path if path.is_file() else None
+
+
+def profile_report(path, limit=40):
+    """Текстовая сводка: самые дорогие функции по общему времени"""
+    out = StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def clear_profiles(url_name=None):
+    root = profiles_dir()
+    target = root / url_name if url_name else root
+    if url_name and not NAME_RE.match(url_name):
+        return
+    if not _inside(target, root):
+        return
+    shutil.rmtree(target, ignore_errors=True)
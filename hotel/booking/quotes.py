@@ -0,0 +1,192 @@
+"""
+Повторное использование расчетов стоимости.
+
+Одинаковые расчеты в процессе берутся из ограниченного LRU-кэша,
+а одновременные одинаковые запросы ждут единственного вычисления.
+calculate_price выдает подписанный токен с уже рассчитанной ценой
+и версией расчета; при создании брони токен позволяет не пересчитывать
+стоимость, если цены с тех пор не менялись.
+"""
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+
+from .pricing import quote_version
+from .utils import calculate_room_price_preview
+
+QUOTE_TOKEN_SALT = 'booking.quote'
+
+
+class _Flight:
+    """Вычисление, которого ждут одинаковые запросы"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QuoteMemo:
+    """LRU-кэш расчетов с объединением одновременных запросов"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(self._entries[key])
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result)
+
+        try:
+            flight.result = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None:
+                    self._entries[key] = flight.result
+                    if len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            flight.event.set()
+        return dict(flight.result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+
+quote_memo = QuoteMemo(settings.QUOTE_MEMO_SIZE)
+
+
+def cached_price_preview(room_type, check_in_date, check_out_date,
+                         needs_child_bed=False):
+    """calculate_room_price_preview через LRU-кэш процесса"""
+    key = (
+        getattr(room_type, 'pk', room_type),
+        check_in_date,
+        check_out_date,
+        bool(needs_child_bed),
+        quote_version(),
+    )
+    return quote_memo.get_or_compute(
+        key, lambda: calculate_room_price_preview(
+            room_type, check_in_date, check_out_date, needs_child_bed))
+
+
+def price_booking(booking):
+    """Рассчитать стоимость брони и записать ее вместе со скидкой"""
+    price_data = cached_price_preview(
+        booking.room.room_type,
+        booking.check_in_date,
+        booking.check_out_date,
+        booking.needs_child_bed
+    )
+    booking.total_price = price_data['total_price']
+    booking.discount_applied_id = price_data['discount_id']
+    return price_data
+
+
+def issue_quote_token(room_type_id, check_in_date, check_out_date,
+                      needs_child_bed, price_data, pricing_version=None):
+    """Подписать результат расчета"""
+    if pricing_version is None:
+        pricing_version = quote_version()
+    return signing.dumps({
+        'rt': room_type_id,
+        'ci': check_in_date.isoformat(),
+        'co': check_out_date.isoformat(),
+        'cb': bool(needs_child_bed),
+        't': str(price_data['total_price']),
+        'd': price_data['discount_id'],
+        'v': pricing_version,
+    }, salt=QUOTE_TOKEN_SALT, compress=True)
+
+
+def quote_cache_seconds():
+    """Срок свежести расчета в браузере: не дольше срока токена"""
+    return min(settings.QUOTE_CACHE_SECONDS, settings.QUOTE_TOKEN_MAX_AGE)
+
+
+def quote_token_window(now=None):
+    """
+    Номер окна выдачи токенов расчета — часть ETag ответа с токеном.
+    Сохраненный браузером ответ подтверждается только в окне, где он
+    выдан, а после подтверждения живет еще QUOTE_CACHE_SECONDS:
+    окно короче срока токена на это время, поэтому браузер не отдаст
+    истекший токен
+    """
+    if now is None:
+        now = time.time()
+    window = max(
+        settings.QUOTE_TOKEN_MAX_AGE - quote_cache_seconds(), 1)
+    return int(now) // window
+
+
+def load_quote_token(token):
+    """Содержимое действующего токена или None"""
+    if not token:
+        return None
+    try:
+        return signing.loads(
+            token, salt=QUOTE_TOKEN_SALT,
+            max_age=settings.QUOTE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def apply_quote_token(booking, token):
+    """
+    Записать в бронь цену из токена.
+    Возвращает False, если токен недействителен, выдан для других
+    параметров или цены успели измениться — тогда нужен полный расчет
+    """
+    payload = load_quote_token(token)
+    if payload is None:
+        return False
+    if (payload['rt'] != booking.room.room_type_id
+            or payload['ci'] != booking.check_in_date.isoformat()
+            or payload['co'] != booking.check_out_date.isoformat()
+            or payload['cb'] != bool(booking.needs_child_bed)
+            or payload['v'] != quote_version()):
+        return False
+    booking.total_price = Decimal(payload['t'])
+    booking.discount_applied_id = payload['d']
+    return True
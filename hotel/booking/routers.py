@@ -0,0 +1,41 @@
+"""
+Маршрутизация запросов приложения booking по базам гостиниц.
+
+Пока выбрана гостиница из HOTEL_DATABASES, чтения и записи моделей
+booking (кроме самих гостиниц) идут в ее базу; иначе — в default.
+Схема во всех базах одна: база гостиницы создается
+migrate --database=<псевдоним>, а строку гостиницы и пользователей,
+создающих брони, в нее нужно перенести (loaddata), чтобы внешние
+ключи на них были выполнимы.
+"""
+from .hotels import hotel_database
+
+APP_LABEL = 'booking'
+
+
+def _routed(model):
+    return (model._meta.app_label == APP_LABEL
+            and model._meta.model_name != 'hotel')
+
+
+class HotelRouter:
+
+    def db_for_read(self, model, **hints):
+        if _routed(model):
+            return hotel_database()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if _routed(model):
+            return hotel_database()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Гостиница и пользователи читаются из default, а ссылаются
+        # на них брони из базы гостиницы
+        if APP_LABEL in (obj1._meta.app_label, obj2._meta.app_label):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,421 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .availability import ACTIVE_STATUSES, shift_counters
+from .events import publish_on_commit
+from .groups import RoomsUnavailable, create_group_booking
+from .hotels import hotel_database
+from .models import Booking, Client, Room, RoomType
+from .quotes import apply_quote_token, price_booking
+from .utils import is_room_available
+from .versions import BOOKINGS, bump_version
+
+
+class SparseFieldsetsMixin:
+    """
+    Разреженный набор полей: ?fields=id,status оставляет
+    в ответе только перечисленные поля
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    """Поля из параметра ?fields= или None"""
+    if request is None:
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def validate_stay_dates(check_in_date, check_out_date):
+    """Даты новой брони: те же проверки, что в формах"""
+    if check_in_date < timezone.now().date():
+        raise serializers.ValidationError(
+            'Дата заезда не может быть в прошлом')
+    if check_out_date <= check_in_date:
+        raise serializers.ValidationError(
+            'Дата выезда должна быть после даты заезда')
+
+
+class RoomTypeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = RoomType
+        fields = ['id', 'category', 'capacity', 'description']
+
+
+class RoomSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    category = serializers.ReadOnlyField(source='room_type.category')
+    capacity = serializers.ReadOnlyField(source='room_type.capacity')
+
+    class Meta:
+        model = Room
+        fields = ['id', 'number', 'floor', 'is_available',
+                  'room_type', 'category', 'capacity']
+
+
+class ClientSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Client
+        fields = ['id', 'first_name', 'last_name', 'phone']
+
+
+class BookingListSerializer(SparseFieldsetsMixin, serializers.Serializer):
+    """Облегченное представление для списков: только плоские поля"""
+    id = serializers.ReadOnlyField()
+    room = serializers.ReadOnlyField(source='room_id')
+    room_number = serializers.ReadOnlyField(source='room.number')
+    client = serializers.ReadOnlyField(source='client_id')
+    client_name = serializers.SerializerMethodField()
+    check_in_date = serializers.ReadOnlyField()
+    check_out_date = serializers.ReadOnlyField()
+    needs_child_bed = serializers.ReadOnlyField()
+    status = serializers.ReadOnlyField()
+    total_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True)
+    updated_at = serializers.ReadOnlyField()
+
+    # Поле -> связь, которую нужно подтянуть через select_related
+    related_fields = {
+        'room_number': 'room',
+        'client_name': 'client',
+    }
+
+    def get_client_name(self, obj):
+        return f'{obj.client.first_name} {obj.client.last_name}'
+
+
+class BookingSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """Полное представление брони; клиент создается вместе с ней"""
+    client = ClientSerializer()
+    room = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.select_related('room_type'))
+    status = serializers.ChoiceField(
+        choices=['pending', 'confirmed'], default='pending')
+    quote_token = serializers.CharField(write_only=True, required=False)
+
+    class Meta:
+        model = Booking
+        fields = [
+            'id', 'client', 'room', 'check_in_date', 'check_out_date',
+            'actual_check_in', 'actual_check_out', 'needs_child_bed',
+            'total_price', 'discount_applied', 'status', 'notes',
+            'created_by', 'created_at', 'updated_at', 'quote_token',
+        ]
+        read_only_fields = [
+            'actual_check_in', 'actual_check_out', 'total_price',
+            'discount_applied', 'created_by', 'created_at', 'updated_at',
+        ]
+
+    def validate(self, attrs):
+        check_in_date = attrs['check_in_date']
+        check_out_date = attrs['check_out_date']
+        validate_stay_dates(check_in_date, check_out_date)
+        if not is_room_available(attrs['room'], check_in_date,
+                                 check_out_date):
+            raise serializers.ValidationError(
+                'Номер уже забронирован на выбранные даты')
+        return attrs
+
+    def create(self, validated_data):
+        with transaction.atomic(using=hotel_database()):
+            client = Client.objects.create(**validated_data.pop('client'))
+            token = validated_data.pop('quote_token', None)
+            booking = Booking(client=client, **validated_data)
+            if not apply_quote_token(booking, token):
+                price_booking(booking)
+            booking.save()
+        return booking
+
+
+class BookingUpdateSerializer(SparseFieldsetsMixin,
+                              serializers.ModelSerializer):
+    """Изменение брони через API: только статус и примечания"""
+    client = ClientSerializer(read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = BookingSerializer.Meta.fields[:-1]
+        read_only_fields = [
+            name for name in fields if name not in ('status', 'notes')
+        ]
+
+    def validate_status(self, value):
+        booking = self.instance
+        if value == booking.status:
+            return value
+        if value not in Booking.STATUS_TRANSITIONS.get(booking.status, ()):
+            statuses = dict(Booking.STATUS_CHOICES)
+            raise serializers.ValidationError(
+                f'Нельзя сменить статус «{statuses[booking.status]}» '
+                f'на «{statuses[value]}»')
+        # Неподтвержденная бронь не занимала номер: за это время
+        # его могли забронировать
+        if value in ACTIVE_STATUSES \
+                and booking.status not in ACTIVE_STATUSES \
+                and not is_room_available(
+                    booking.room, booking.check_in_date,
+                    booking.check_out_date, exclude=booking.pk):
+            raise serializers.ValidationError(
+                'Номер уже забронирован на выбранные даты')
+        return value
+
+    def update(self, instance, validated_data):
+        status = validated_data.get('status', instance.status)
+        if status != instance.status:
+            if status == 'checked_in':
+                validated_data['actual_check_in'] = timezone.now()
+            elif status == 'checked_out':
+                validated_data['actual_check_out'] = timezone.now()
+        # Счетчики занятости и профиль гостя сдвигаются сигналами
+        # в той же транзакции
+        with transaction.atomic(using=hotel_database()):
+            return super().update(instance, validated_data)
+
+
+class BookingBulkListSerializer(serializers.ListSerializer):
+    """
+    Пакетное создание: номера загружаются одним запросом,
+    пересечения проверяются одним запросом на весь пакет,
+    брони вставляются через bulk_create в одной транзакции
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            room_ids = set()
+            for item in data:
+                try:
+                    room_ids.add(int(item['room']))
+                except (TypeError, KeyError, ValueError):
+                    continue
+            self.child.context['rooms'] = Room.objects.select_related(
+                'room_type').in_bulk(room_ids)
+        attrs = super().to_internal_value(data)
+        # Ошибки пересечений возвращаются поэлементно, как и ошибки полей
+        self.check_overlaps(attrs)
+        return attrs
+
+    def check_overlaps(self, attrs):
+        active = [
+            item for item in attrs if item['status'] in ACTIVE_STATUSES
+        ]
+        if not active:
+            return
+
+        existing = Booking.objects.filter(
+            room__in={item['room'] for item in active},
+            status__in=ACTIVE_STATUSES,
+            check_in_date__lt=max(item['check_out_date'] for item in active),
+            check_out_date__gt=min(item['check_in_date'] for item in active),
+        ).values_list('room_id', 'check_in_date', 'check_out_date')
+
+        occupied = {}
+        for room_id, check_in_date, check_out_date in existing:
+            occupied.setdefault(room_id, []).append(
+                (check_in_date, check_out_date))
+
+        errors = []
+        for item in attrs:
+            error = {}
+            if item['status'] in ACTIVE_STATUSES:
+                intervals = occupied.setdefault(item['room'].pk, [])
+                if any(item['check_in_date'] < check_out_date
+                       and item['check_out_date'] > check_in_date
+                       for check_in_date, check_out_date in intervals):
+                    error = {'non_field_errors': [
+                        'Номер уже забронирован на выбранные даты']}
+                else:
+                    intervals.append(
+                        (item['check_in_date'], item['check_out_date']))
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+    def create(self, validated_data):
+        with transaction.atomic(using=hotel_database()):
+            clients = Client.objects.bulk_create([
+                Client(**item.pop('client')) for item in validated_data
+            ])
+            bookings = []
+            for client, item in zip(clients, validated_data):
+                token = item.pop('quote_token', None)
+                # bulk_create не вызывает save(): гостиница — из номера
+                booking = Booking(
+                    client=client, hotel_id=item['room'].hotel_id, **item)
+                if not apply_quote_token(booking, token):
+                    price_booking(booking)
+                bookings.append(booking)
+            bookings = Booking.objects.bulk_create(bookings)
+            # bulk_create не отправляет сигналы: счетчики занятости
+            # сдвигаются в той же транзакции
+            shift_counters([
+                (booking.room.room_type_id, booking.check_in_date,
+                 booking.check_out_date)
+                for booking in bookings
+                if booking.status in ACTIVE_STATUSES
+                and booking.room.is_available
+            ], 1)
+        bump_version(BOOKINGS)
+        publish_on_commit(created=[booking.pk for booking in bookings])
+        return bookings
+
+
+class BookingBulkSerializer(BookingSerializer):
+    """Элемент пакета: номер берется из заранее загруженного словаря"""
+    room = serializers.IntegerField()
+
+    class Meta(BookingSerializer.Meta):
+        list_serializer_class = BookingBulkListSerializer
+
+    def validate_room(self, value):
+        room = self.context.get('rooms', {}).get(value)
+        if room is None:
+            raise serializers.ValidationError('Номер не найден')
+        return room
+
+    def validate(self, attrs):
+        validate_stay_dates(attrs['check_in_date'], attrs['check_out_date'])
+        return attrs
+
+
+class GroupBookingSerializer(serializers.Serializer):
+    """Групповое бронирование: один клиент, несколько номеров"""
+    client = ClientSerializer()
+    rooms = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.filter(is_available=True), many=True,
+        allow_empty=False)
+    child_bed_rooms = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.all(), many=True, required=False)
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+    status = serializers.ChoiceField(
+        choices=['pending', 'confirmed'], default='pending')
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        validate_stay_dates(attrs['check_in_date'], attrs['check_out_date'])
+        if set(attrs.get('child_bed_rooms', [])) - set(attrs['rooms']):
+            raise serializers.ValidationError(
+                'Детская кровать указана для номеров вне группы')
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return create_group_booking(
+                validated_data['client'],
+                [room.pk for room in validated_data['rooms']],
+                validated_data['check_in_date'],
+                validated_data['check_out_date'],
+                created_by=validated_data['created_by'],
+                status=validated_data['status'],
+                child_bed_rooms=[
+                    room.pk for room
+                    in validated_data.get('child_bed_rooms', [])],
+                notes=validated_data.get('notes', ''),
+            )
+        except RoomsUnavailable as e:
+            raise serializers.ValidationError({'rooms': [str(e)]})
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    room = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.select_related('room_type'), required=False)
+    room_type = serializers.PrimaryKeyRelatedField(
+        queryset=RoomType.objects.all(), required=False)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    needs_child_bed = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs['check_out'] <= attrs['check_in']:
+            raise serializers.ValidationError(
+                'Дата выезда должна быть после даты заезда')
+        if 'room' in attrs:
+            attrs['room_type'] = attrs['room'].room_type
+        elif 'room_type' not in attrs:
+            raise serializers.ValidationError(
+                'Укажите номер или тип номера')
+        return attrs
+
+
+class QuoteBatchListSerializer(serializers.ListSerializer):
+    """Пакет расчетов: номера и типы загружаются двумя запросами"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = {'room': set(), 'room_type': set()}
+            for item in data:
+                for field, values in ids.items():
+                    try:
+                        values.add(int(item[field]))
+                    except (TypeError, KeyError, ValueError):
+                        continue
+            self.child.context['rooms'] = Room.objects.select_related(
+                'room_type').in_bulk(ids['room'])
+            self.child.context['room_types'] = RoomType.objects.in_bulk(
+                ids['room_type'])
+        return super().to_internal_value(data)
+
+
+class QuoteBatchSerializer(QuoteRequestSerializer):
+    """Элемент пакета: номер и тип берутся из загруженных словарей"""
+    room = serializers.IntegerField(required=False)
+    room_type = serializers.IntegerField(required=False)
+
+    class Meta:
+        list_serializer_class = QuoteBatchListSerializer
+
+    def validate_room(self, value):
+        room = self.context.get('rooms', {}).get(value)
+        if room is None:
+            raise serializers.ValidationError('Номер не найден')
+        return room
+
+    def validate_room_type(self, value):
+        room_type = self.context.get('room_types', {}).get(value)
+        if room_type is None:
+            raise serializers.ValidationError('Тип номера не найден')
+        return room_type
+
+
+class RoomFilterSerializer(serializers.Serializer):
+    """Параметры списка номеров"""
+    room_type = serializers.IntegerField(required=False)
+
+
+class BookingFilterSerializer(serializers.Serializer):
+    """Параметры списка броней"""
+    room = serializers.IntegerField(required=False)
+    check_in_from = serializers.DateField(required=False)
+    check_in_to = serializers.DateField(required=False)
+
+
+class AvailabilityRequestSerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    room_type = serializers.IntegerField(required=False)
+    category = serializers.ChoiceField(
+        choices=RoomType.CATEGORY_CHOICES, required=False)
+    capacity = serializers.ChoiceField(
+        choices=RoomType.CAPACITY_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if attrs['check_out'] <= attrs['check_in']:
+            raise serializers.ValidationError(
+                'Дата выезда должна быть после даты заезда')
+        return attrs
+
+
+class CalendarRequestSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(
+        min_value=1, max_value=2 * 365, required=False)
+    room_type = serializers.IntegerField(required=False)
@@ -0,0 +1,198 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .archive import CLOSED_STATUSES, is_archiving
+from .availability import (
+    ACTIVE_STATUSES, counted_stay, rebuild_counters, shift_counters
+)
+from .events import publish_on_commit
+from .guests import apply_stay_change, recorded_stay, stay_of
+from .hotels import hotel_database
+from .models import (
+    Booking, Client, DeletedBooking, Discount, Hotel, Price, PricingRule,
+    Room, RoomType, SeasonalPrice,
+)
+from .versions import BOOKINGS, CATALOG, PRICING, bump_version
+from .waitlist import match_released_room, settle_offer
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, **kwargs):
+    """Изменение брони сбрасывает панель управления и списки"""
+    bump_version(BOOKINGS)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_counted_stay(sender, instance, raw=False, **kwargs):
+    """Учтенное в счетчиках состояние брони до изменения"""
+    if raw:
+        return
+    instance._counted_stay = (
+        counted_stay(instance.pk) if instance.pk else None)
+
+
+@receiver(pre_delete, sender=Booking)
+def remember_deleted_stay(sender, instance, **kwargs):
+    # Удаляемая бронь загружена из базы: закрытые (например, при
+    # переносе в архив) в счетчиках не учтены, запрос не нужен
+    instance._counted_stay = (
+        counted_stay(instance.pk)
+        if instance.status in ACTIVE_STATUSES else None)
+
+
+@receiver(post_save, sender=Booking)
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    """Сдвиг счетчиков занятости типов при смене статуса, дат или номера"""
+    if raw:
+        return
+    old = getattr(instance, '_counted_stay', None)
+    new = (counted_stay(instance.pk)
+           if instance.status in ACTIVE_STATUSES else None)
+    if old != new:
+        if old:
+            shift_counters([old], -1)
+        if new:
+            shift_counters([new], 1)
+    instance._counted_stay = new
+    # Бронь перестала занимать номер: период для листа ожидания
+    instance._released_stay = old if old and not new else None
+
+
+@receiver(pre_save, sender=Booking)
+def remember_guest_stay(sender, instance, raw=False, **kwargs):
+    """Вклад брони в профиль гостя до изменения"""
+    if raw:
+        return
+    instance._guest_stay = recorded_stay(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Booking)
+def update_guest_profile(sender, instance, raw=False, **kwargs):
+    """Заселение, правка или отмена заселения сдвигает профиль гостя"""
+    if raw:
+        return
+    new = stay_of(
+        instance.client_id, instance.status, instance.check_in_date,
+        instance.check_out_date, instance.total_price)
+    apply_stay_change(getattr(instance, '_guest_stay', None), new)
+    instance._guest_stay = new
+
+
+@receiver(post_delete, sender=Booking)
+def remove_guest_stay(sender, instance, **kwargs):
+    # Перенесенная в архив бронь остается в профиле
+    if is_archiving():
+        return
+    apply_stay_change(stay_of(
+        instance.client_id, instance.status, instance.check_in_date,
+        instance.check_out_date, instance.total_price), None)
+
+
+@receiver(post_save, sender=Booking)
+def offer_released_room(sender, instance, raw=False, **kwargs):
+    """Отмена или ранний выезд освобождает номер для листа ожидания"""
+    released = getattr(instance, '_released_stay', None)
+    if raw or released is None or instance.status not in CLOSED_STATUSES:
+        return
+    _, check_in_date, check_out_date = released
+    room_id = instance.room_id
+    transaction.on_commit(
+        lambda: match_released_room(room_id, check_in_date, check_out_date),
+        using=hotel_database())
+
+
+@receiver(post_save, sender=Booking)
+def settle_waitlist_offer(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        settle_offer(instance)
+
+
+@receiver(post_delete, sender=Booking)
+def update_counters_on_delete(sender, instance, **kwargs):
+    old = getattr(instance, '_counted_stay', None)
+    if old:
+        shift_counters([old], -1)
+
+
+@receiver(post_save, sender=Booking)
+def publish_booking_saved(sender, instance, created, raw=False, **kwargs):
+    """Событие для живой панели управления"""
+    if not raw:
+        publish_on_commit(
+            saved=[instance.pk], created=[instance.pk] if created else [])
+
+
+@receiver(post_delete, sender=Booking)
+def publish_booking_deleted(sender, instance, **kwargs):
+    # Перенос закрытых броней в архив панель управления не меняет
+    if instance.status not in CLOSED_STATUSES:
+        publish_on_commit(deleted=[(instance.hotel_id, instance.pk)])
+
+
+@receiver(post_delete, sender=Booking)
+def record_deleted_booking(sender, instance, **kwargs):
+    """Запись для ленты изменений; перенесенная в архив бронь не удалена"""
+    if not is_archiving():
+        DeletedBooking.objects.create(
+            booking_id=instance.pk, hotel_id=instance.hotel_id)
+
+
+@receiver(pre_save, sender=Room)
+def remember_room_state(sender, instance, raw=False, **kwargs):
+    instance._counted_state = None
+    if instance.pk and not raw:
+        instance._counted_state = Room.all_hotels.filter(
+            pk=instance.pk).values_list(
+                'room_type_id', 'is_available').first()
+
+
+@receiver(post_save, sender=Room)
+def rebuild_counters_on_room_change(sender, instance, raw=False, **kwargs):
+    """
+    Смена типа номера или его продаваемости меняет учет всех его броней:
+    счетчики затронутых типов пересобираются
+    """
+    old = getattr(instance, '_counted_state', None)
+    if raw or old is None:
+        return
+    if old != (instance.room_type_id, instance.is_available):
+        rebuild_counters({old[0], instance.room_type_id})
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=RoomType)
+@receiver(post_delete, sender=RoomType)
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+def catalog_changed(sender, **kwargs):
+    """Справочники выводятся во фрагментах броней"""
+    bump_version(CATALOG)
+
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+@receiver(post_save, sender=SeasonalPrice)
+@receiver(post_delete, sender=SeasonalPrice)
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+@receiver(post_save, sender=RoomType)
+@receiver(post_delete, sender=RoomType)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def pricing_changed(sender, **kwargs):
+    """
+    Любое изменение цен, скидок, правил или типов номеров
+    меняет расчеты
+    """
+    bump_version(PRICING)
@@ -0,0 +1,54 @@
+"""Общие данные тестов: гостиницы, справочник номеров, администратор"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from booking.hotels import use_hotel
+from booking.models import Hotel, Price, Room, RoomType
+
+
+def main_hotel():
+    """Гостиница, которую создает миграция 0010"""
+    return Hotel.objects.get(code='main')
+
+
+def make_admin(username='admin', using='default'):
+    user = get_user_model()(username=username, is_staff=True)
+    user.set_password('password')
+    user.save(using=using)
+    return user
+
+
+def make_rooms(hotel, count=2, category='standard', capacity=2,
+               price=Decimal('1000.00')):
+    """Тип номера с одинаковой ценой на все дни и count номеров"""
+    with use_hotel(hotel):
+        room_type = RoomType.objects.create(
+            category=category, capacity=capacity)
+        for day in range(1, 8):
+            Price.objects.create(
+                room_type=room_type, day_of_week=day, price=price)
+        return [
+            Room.objects.create(
+                number=f'{hotel.code}-{number}', room_type=room_type,
+                floor=1)
+            for number in range(1, count + 1)
+        ]
+
+
+def stay(days_ahead=10, nights=2):
+    """Даты проживания через days_ahead дней"""
+    check_in = timezone.localdate() + timedelta(days=days_ahead)
+    return check_in, check_in + timedelta(days=nights)
+
+
+class BookingTestCase(TestCase):
+    """Кэш общий для процесса, поэтому очищается перед каждым тестом"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
@@ -0,0 +1,140 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from booking.hotels import use_hotel
+from booking.models import Booking, Client
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+class BookingApiTestCase(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.admin = make_admin()
+        cls.room, = make_rooms(cls.hotel, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def book(self, status='pending', room=None, dates=None):
+        check_in, check_out = dates or stay()
+        with use_hotel(self.hotel):
+            return Booking.objects.create(
+                client=Client.objects.create(
+                    first_name='Иван', last_name='Петров', phone='+7900'),
+                room=room or self.room, check_in_date=check_in,
+                check_out_date=check_out, status=status,
+                created_by=self.admin)
+
+
+class BookingStatusTests(BookingApiTestCase):
+
+    def set_status(self, booking, status):
+        return self.api.patch(
+            reverse('api-booking-detail', args=[booking.pk]),
+            {'status': status}, format='json')
+
+    def test_follows_booking_lifecycle(self):
+        booking = self.book()
+        for status in ('confirmed', 'checked_in', 'checked_out'):
+            response = self.set_status(booking, status)
+            self.assertEqual(response.status_code, 200, response.data)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'checked_out')
+        self.assertIsNotNone(booking.actual_check_in)
+        self.assertIsNotNone(booking.actual_check_out)
+
+    def test_rejects_transition_outside_table(self):
+        for current, target in [('pending', 'checked_in'),
+                                ('cancelled', 'confirmed'),
+                                ('checked_out', 'checked_in')]:
+            booking = self.book(current)
+            response = self.set_status(booking, target)
+            self.assertEqual(response.status_code, 400)
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, current)
+
+    def test_confirming_rechecks_overlaps(self):
+        pending = self.book()
+        self.book('confirmed')
+        response = self.set_status(pending, 'confirmed')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data)
+
+
+class PastCheckInTests(BookingApiTestCase):
+    """API отклоняет заезд в прошлом, как и формы"""
+
+    def payload(self, **extra):
+        check_in, check_out = stay(days_ahead=-1)
+        return {
+            'client': {'first_name': 'Иван', 'last_name': 'Петров',
+                       'phone': '+7900'},
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': check_out.isoformat(),
+            **extra,
+        }
+
+    def assertRejected(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(
+            'Дата заезда не может быть в прошлом', str(response.data))
+        self.assertFalse(Booking.objects.exists())
+
+    def test_create(self):
+        self.assertRejected(self.api.post(
+            reverse('api-booking-list'),
+            self.payload(room=self.room.pk), format='json'))
+
+    def test_bulk(self):
+        self.assertRejected(self.api.post(
+            reverse('api-booking-bulk'),
+            [self.payload(room=self.room.pk)], format='json'))
+
+    def test_group(self):
+        self.assertRejected(self.api.post(
+            reverse('api-booking-group'),
+            self.payload(rooms=[self.room.pk]), format='json'))
+
+
+class QueryParameterTests(BookingApiTestCase):
+
+    def test_malformed_filters_are_bad_requests(self):
+        for url, params in [
+            (reverse('api-room-list'), {'room_type': 'x'}),
+            (reverse('api-booking-list'), {'room': 'x'}),
+            (reverse('api-booking-list'), {'check_in_from': '2026-13-01'}),
+            (reverse('api-booking-list'), {'check_in_to': 'завтра'}),
+        ]:
+            response = self.api.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_filters_bookings(self):
+        booking = self.book()
+        response = self.api.get(reverse('api-booking-list'), {
+            'room': self.room.pk,
+            'check_in_from': booking.check_in_date.isoformat(),
+            'check_in_to': booking.check_in_date.isoformat(),
+        })
+        self.assertEqual(
+            [row['id'] for row in response.data['results']], [booking.pk])
+
+    @override_settings(QUOTE_BATCH_MAX_SIZE=2)
+    def test_bulk_size_is_capped(self):
+        check_in, check_out = stay()
+        item = {
+            'client': {'first_name': 'Иван', 'last_name': 'Петров',
+                       'phone': '+7900'},
+            'room': self.room.pk,
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': check_out.isoformat(),
+        }
+        response = self.api.post(
+            reverse('api-booking-bulk'), [item] * 3, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from booking.audit import find_overlaps, find_price_mismatches
+from booking.hotels import use_hotel
+from booking.models import Booking, Client
+from booking.quotes import price_booking
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+class AuditTestCase(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.admin = make_admin()
+        cls.rooms = make_rooms(cls.hotel, 2)
+
+    def book(self, days_ahead, nights, room=None, status='confirmed'):
+        check_in, check_out = stay(days_ahead, nights)
+        with use_hotel(self.hotel):
+            booking = Booking(
+                client=Client.objects.create(
+                    first_name='Иван', last_name='Петров', phone='+7900'),
+                room=room or self.rooms[0], check_in_date=check_in,
+                check_out_date=check_out, status=status,
+                created_by=self.admin)
+            price_booking(booking)
+            booking.save()
+        return booking
+
+
+class OverlapTests(AuditTestCase):
+    """Заметающая прямая по броням номера"""
+
+    def overlaps(self):
+        with use_hotel(self.hotel):
+            return [
+                (booking_id, detail.split('№')[1].split()[0])
+                for _, booking_id, _, detail in find_overlaps(chunk_size=2)
+            ]
+
+    def test_adjacent_stays_do_not_overlap(self):
+        self.book(10, 2)
+        self.book(12, 2)
+        self.book(14, 3)
+        self.assertEqual(self.overlaps(), [])
+
+    def test_reports_every_stay_inside_a_long_one(self):
+        long = self.book(10, 4)
+        first = self.book(11, 1)
+        second = self.book(12, 1)
+        # Заезд в день выезда длинной брони: она уже вышла из кучи
+        self.book(14, 2)
+        self.assertEqual(self.overlaps(), [
+            (first.pk, str(long.pk)),
+            (second.pk, str(long.pk)),
+        ])
+
+    def test_reports_each_open_stay(self):
+        first = self.book(10, 5)
+        second = self.book(11, 5)
+        third = self.book(12, 1)
+        self.assertEqual(self.overlaps(), [
+            (second.pk, str(first.pk)),
+            (third.pk, str(first.pk)),
+            (third.pk, str(second.pk)),
+        ])
+
+    def test_ignores_other_rooms_and_inactive_stays(self):
+        self.book(10, 3)
+        self.book(10, 3, room=self.rooms[1])
+        self.book(11, 1, status='pending')
+        self.book(11, 1, status='cancelled')
+        self.assertEqual(self.overlaps(), [])
+
+
+class PriceMismatchTests(AuditTestCase):
+
+    def mismatches(self, **kwargs):
+        with use_hotel(self.hotel):
+            return [
+                booking_id for _, booking_id, _, _ in
+                find_price_mismatches(**kwargs)
+            ]
+
+    def test_reports_changed_total(self):
+        self.book(10, 2)
+        changed = self.book(20, 2)
+        Booking.objects.filter(pk=changed.pk).update(
+            total_price=changed.total_price + Decimal('100.00'))
+        self.assertEqual(self.mismatches(), [changed.pk])
+
+    def test_since_skips_bookings_priced_earlier(self):
+        old = self.book(10, 2)
+        Booking.objects.filter(pk=old.pk).update(
+            total_price=Decimal('1.00'),
+            created_at=timezone.now() - timedelta(days=30))
+        today = timezone.localdate()
+        self.assertEqual(self.mismatches(), [old.pk])
+        self.assertEqual(self.mismatches(since=today), [])
+        self.assertEqual(
+            self.mismatches(since=today - timedelta(days=31)), [old.pk])
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.archive import archive_batch
+from booking.availability import verify_counters
+from booking.hotels import use_hotel
+from booking.models import (
+    ArchivedBooking, Booking, Client, RoomTypeAvailability,
+)
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+class CounterConsistencyTests(BookingTestCase):
+    """Счетчики занятости совпадают с бронями после каждого изменения"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.admin = make_admin()
+        cls.rooms = make_rooms(cls.hotel, 2)
+        cls.room_type_id = cls.rooms[0].room_type_id
+
+    def book(self, room, dates, status='confirmed'):
+        with use_hotel(self.hotel):
+            return Booking.objects.create(
+                client=Client.objects.create(
+                    first_name='Иван', last_name='Петров', phone='+7900'),
+                room=room, check_in_date=dates[0], check_out_date=dates[1],
+                status=status, created_by=self.admin)
+
+    def booked(self, date):
+        counter = RoomTypeAvailability.objects.filter(
+            room_type_id=self.room_type_id, date=date).first()
+        return counter.booked if counter else 0
+
+    def assertConsistent(self):
+        self.assertEqual(verify_counters(), [])
+
+    def test_cancel_releases_nights(self):
+        dates = stay()
+        first = self.book(self.rooms[0], dates)
+        self.book(self.rooms[1], dates)
+        self.assertEqual(self.booked(dates[0]), 2)
+
+        self.client.force_login(self.admin)
+        self.client.post(reverse('booking_cancel', args=[first.pk]))
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'cancelled')
+        self.assertEqual(self.booked(dates[0]), 1)
+        self.assertConsistent()
+
+    def test_failed_profile_update_rolls_back_check_out(self):
+        dates = stay()
+        booking = self.book(self.rooms[0], dates, status='checked_in')
+        self.assertEqual(self.booked(dates[0]), 1)
+
+        self.client.force_login(self.admin)
+        with mock.patch('booking.signals.apply_stay_change',
+                        side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post(reverse('check_out_booking', args=[booking.pk]))
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'checked_in')
+        self.assertEqual(self.booked(dates[0]), 1)
+        self.assertConsistent()
+
+    def test_date_change_moves_nights(self):
+        dates = stay()
+        booking = self.book(self.rooms[0], dates)
+        booking.check_in_date += timedelta(days=1)
+        booking.check_out_date += timedelta(days=1)
+        with use_hotel(self.hotel):
+            booking.save()
+        self.assertEqual(self.booked(dates[0]), 0)
+        self.assertEqual(self.booked(booking.check_in_date), 1)
+        self.assertConsistent()
+
+    def test_unavailable_room_leaves_counters(self):
+        dates = stay()
+        self.book(self.rooms[0], dates)
+        room = self.rooms[0]
+        room.is_available = False
+        with use_hotel(self.hotel):
+            room.save()
+        self.assertEqual(self.booked(dates[0]), 0)
+        self.assertConsistent()
+
+    def test_archive_keeps_counters(self):
+        today = timezone.localdate()
+        past = today - timedelta(days=10), today - timedelta(days=8)
+        closed = self.book(self.rooms[0], past)
+        for status in ('checked_in', 'checked_out'):
+            closed.status = status
+            with use_hotel(self.hotel):
+                closed.save()
+        cancelled = self.book(self.rooms[1], past)
+        cancelled.status = 'cancelled'
+        with use_hotel(self.hotel):
+            cancelled.save()
+        future = stay()
+        self.book(self.rooms[0], future)
+
+        with use_hotel(self.hotel):
+            self.assertEqual(archive_batch(today), 2)
+        self.assertEqual(ArchivedBooking.objects.count(), 2)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(self.booked(past[0]), 0)
+        self.assertEqual(self.booked(future[0]), 1)
+        self.assertConsistent()
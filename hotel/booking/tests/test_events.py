@@ -0,0 +1,36 @@
+import json
+
+from asgiref.sync import async_to_sync
+
+from booking.events import current_seq, publish
+from booking.models import Hotel
+from booking.views import _dashboard_stream
+
+from .base import BookingTestCase, main_hotel
+
+
+class DashboardStreamTests(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.other = Hotel.objects.create(name='Флигель', code='annex')
+
+    def delta(self, cursor, hotel):
+        async def collect():
+            return [chunk async for chunk in
+                    _dashboard_stream(cursor, False, hotel)]
+        for chunk in async_to_sync(collect)():
+            if 'event: delta' in chunk:
+                return json.loads(chunk.split('data: ', 1)[1])
+        return None
+
+    def test_deletions_reach_only_their_hotel(self):
+        cursor = current_seq()
+        # В отдельных базах гостиниц id броней совпадают
+        publish(deleted=[(self.other.pk, 7)])
+        publish(deleted=[(self.hotel.pk, 8)])
+
+        self.assertEqual(self.delta(cursor, self.hotel)['deleted'], [8])
+        self.assertEqual(self.delta(cursor, self.other)['deleted'], [7])
+        self.assertEqual(self.delta(cursor, None)['deleted'], [7, 8])
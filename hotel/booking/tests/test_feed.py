@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+
+from booking.feed import StaleWatermark, encode_watermark, read_changes
+from booking.hotels import use_hotel
+from booking.models import Booking, Client, Hotel
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+@override_settings(CHANGE_FEED_LAG_SECONDS=0)
+class ChangeFeedTests(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.other = Hotel.objects.create(name='Флигель', code='annex')
+        cls.admin = make_admin()
+        cls.room, = make_rooms(cls.hotel, 1)
+        cls.other_room, = make_rooms(cls.other, 1)
+
+    def book(self, room):
+        check_in, check_out = stay()
+        with use_hotel(room.hotel):
+            return Booking.objects.create(
+                client=Client.objects.create(
+                    first_name='Иван', last_name='Петров', phone='+7900'),
+                room=room, check_in_date=check_in,
+                check_out_date=check_out, created_by=self.admin)
+
+    def read(self, hotel, watermark=None):
+        with use_hotel(hotel):
+            return read_changes(watermark)
+
+    def test_watermark_returns_only_later_changes(self):
+        first = self.book(self.room)
+        batch = self.read(self.hotel)
+        self.assertEqual([row['id'] for row in batch['changed']],
+                         [first.pk])
+
+        second = self.book(self.room)
+        batch = self.read(self.hotel, batch['watermark'])
+        self.assertEqual([row['id'] for row in batch['changed']],
+                         [second.pk])
+        self.assertFalse(batch['has_more'])
+
+    def test_deletions_belong_to_their_hotel(self):
+        booking = self.book(self.room)
+        other = self.book(self.other_room)
+        deleted_ids = booking.pk, other.pk
+        with use_hotel(self.hotel):
+            booking.delete()
+        with use_hotel(self.other):
+            other.delete()
+
+        deleted = self.read(self.hotel)['deleted']
+        self.assertEqual([row['id'] for row in deleted], [deleted_ids[0]])
+        deleted = self.read(self.other)['deleted']
+        self.assertEqual([row['id'] for row in deleted], [deleted_ids[1]])
+
+    def test_changes_of_other_hotel_are_hidden(self):
+        self.book(self.other_room)
+        self.assertEqual(self.read(self.hotel)['changed'], [])
+
+    def test_watermark_older_than_tombstones_is_stale(self):
+        old = timezone.now() - timedelta(days=31)
+        with self.assertRaises(StaleWatermark):
+            self.read(self.hotel, encode_watermark((old, 0), (old, 0)))
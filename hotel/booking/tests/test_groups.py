@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from booking.groups import RoomsUnavailable, create_group_booking
+from booking.hotels import use_hotel
+from booking.models import Booking, Client, Hotel, RoomTypeAvailability
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+GUEST = {'first_name': 'Иван', 'last_name': 'Петров', 'phone': '+7900'}
+
+
+class GroupBookingTests(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.admin = make_admin()
+        cls.rooms = make_rooms(cls.hotel, 3)
+
+    def book(self, rooms, **kwargs):
+        check_in, check_out = stay()
+        with use_hotel(self.hotel):
+            return create_group_booking(
+                dict(GUEST), [room.pk for room in rooms], check_in,
+                check_out, self.admin, **kwargs)
+
+    def test_creates_all_rooms(self):
+        bookings = self.book(self.rooms, status='confirmed')
+        self.assertEqual(len(bookings), 3)
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(
+            {booking.hotel_id for booking in bookings}, {self.hotel.pk})
+
+    def test_taken_room_rejects_whole_group(self):
+        self.book(self.rooms[:1], status='confirmed')
+        with self.assertRaises(RoomsUnavailable) as raised:
+            self.book(self.rooms, status='confirmed')
+        self.assertEqual(raised.exception.numbers, [self.rooms[0].number])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Client.objects.count(), 1)
+
+
+@override_settings(HOTEL_DATABASES={'annex': 'hotel_b'})
+class GroupBookingHotelDatabaseTests(BookingTestCase):
+    """Гостиница в отдельной базе: транзакция открывается в ней"""
+
+    databases = {'default', 'hotel_b'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = Hotel.objects.create(name='Флигель', code='annex')
+        cls.hotel.save(using='hotel_b')
+        cls.admin = make_admin()
+        cls.admin.save(using='hotel_b')
+        cls.rooms = make_rooms(cls.hotel, 2)
+
+    def book(self):
+        check_in, check_out = stay()
+        with use_hotel(self.hotel):
+            return create_group_booking(
+                dict(GUEST), [room.pk for room in self.rooms], check_in,
+                check_out, self.admin, status='confirmed')
+
+    def test_writes_go_to_hotel_database(self):
+        self.book()
+        self.assertEqual(Booking.all_hotels.using('hotel_b').count(), 2)
+        self.assertFalse(Booking.all_hotels.using('default').exists())
+
+    def test_failure_leaves_nothing_behind(self):
+        with mock.patch('booking.groups.shift_counters',
+                        side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError):
+                self.book()
+        for alias in self.databases:
+            self.assertFalse(Client.objects.using(alias).exists())
+            self.assertFalse(Booking.all_hotels.using(alias).exists())
+            self.assertFalse(
+                RoomTypeAvailability.objects.using(alias)
+                .filter(booked__gt=0).exists())
@@ -0,0 +1,83 @@
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from booking.hotels import use_hotel
+from booking.idempotency import (
+    DuplicateSubmission, claim_submission, record_submission,
+)
+from booking.models import Booking, Client, SubmissionKey
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+class IdempotentSubmissionTests(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.admin = make_admin()
+        cls.room, = make_rooms(cls.hotel, 1)
+
+    def stay_data(self):
+        check_in, check_out = stay()
+        return {
+            'room': self.room.pk,
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': check_out.isoformat(),
+        }
+
+    def test_form_resubmission_returns_first_booking(self):
+        self.client.force_login(self.admin)
+        data = {
+            'first_name': 'Иван', 'last_name': 'Петров', 'phone': '+7900',
+            'submission_key': 'form-key', **self.stay_data(),
+        }
+        first = self.client.post(reverse('booking_create'), data)
+        second = self.client.post(reverse('booking_create'), data)
+
+        self.assertRedirects(first, reverse('booking_list'))
+        self.assertRedirects(second, reverse('booking_list'))
+        booking = Booking.objects.get()
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(
+            SubmissionKey.objects.get(key='form-key').booking, booking)
+
+    def test_api_replay_is_marked(self):
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        data = {
+            'client': {'first_name': 'Иван', 'last_name': 'Петров',
+                       'phone': '+7900'},
+            **self.stay_data(),
+        }
+        url = reverse('api-booking-list')
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'api-key'}
+        first = api.post(url, data, format='json', **headers)
+        second = api.post(url, data, format='json', **headers)
+
+        self.assertEqual(first.status_code, 201, first.data)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_keys_belong_to_their_user(self):
+        other = make_admin('other')
+        with use_hotel(self.hotel):
+            claim_submission(self.admin, 'shared')
+            self.assertIsNotNone(claim_submission(other, 'shared'))
+
+    def test_claimed_key_raises_duplicate_with_booking(self):
+        check_in, check_out = stay()
+        with use_hotel(self.hotel):
+            submission = claim_submission(self.admin, 'key')
+            booking = Booking.objects.create(
+                client=Client.objects.create(
+                    first_name='Иван', last_name='Петров', phone='+7900'),
+                room=self.room, check_in_date=check_in,
+                check_out_date=check_out, created_by=self.admin)
+            record_submission(submission, booking)
+            with self.assertRaises(DuplicateSubmission) as raised:
+                claim_submission(self.admin, 'key')
+        self.assertEqual(raised.exception.booking, booking)
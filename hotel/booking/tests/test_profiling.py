@@ -0,0 +1,52 @@
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+from django.urls import reverse
+
+from booking.profiling import clear_profiles, profile_path
+
+from .base import BookingTestCase, make_admin
+
+
+class ProfileFilesTests(BookingTestCase):
+    """Имена из запроса не выводят за каталог профилей"""
+
+    def setUp(self):
+        super().setUp()
+        parent = tempfile.TemporaryDirectory()
+        self.addCleanup(parent.cleanup)
+        self.parent = Path(parent.name)
+        self.sentinel = self.parent / 'keep.txt'
+        self.sentinel.write_text('')
+        self.root = self.parent / 'profiles'
+        self.profile = self.root / 'booking_list' / '0000100-abc.prof'
+        self.profile.parent.mkdir(parents=True)
+        self.profile.write_bytes(b'')
+        settings = override_settings(PROFILING_DIR=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_clear_rejects_parent_directory(self):
+        self.client.force_login(make_admin())
+        for url_name in ('..', '.', '../profiles'):
+            self.client.post(
+                reverse('profile_clear'), {'url_name': url_name})
+        self.assertTrue(self.sentinel.exists())
+        self.assertTrue(self.profile.exists())
+
+    def test_clear_rejects_symlink_out_of_root(self):
+        (self.root / 'outside').symlink_to(self.parent)
+        clear_profiles('outside')
+        self.assertTrue(self.sentinel.exists())
+
+    def test_clear_one_route(self):
+        clear_profiles('booking_list')
+        self.assertFalse(self.profile.parent.exists())
+        self.assertTrue(self.sentinel.exists())
+
+    def test_profile_path_stays_in_root(self):
+        self.assertEqual(
+            profile_path('booking_list', '0000100-abc'), self.profile)
+        self.assertIsNone(profile_path('..', 'keep'))
+        self.assertIsNone(profile_path('.', '0000100-abc'))
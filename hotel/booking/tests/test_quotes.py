@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from booking.quotes import load_quote_token, quote_token_window
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+@override_settings(QUOTE_TOKEN_MAX_AGE=15 * 60, QUOTE_CACHE_SECONDS=5 * 60)
+class QuoteEtagTests(BookingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_admin()
+        cls.room, = make_rooms(main_hotel(), 1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        check_in, check_out = stay()
+        self.params = {
+            'room_id': self.room.pk,
+            'check_in': check_in.isoformat(),
+            'check_out': check_out.isoformat(),
+        }
+
+    def quote(self, now, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        with mock.patch('booking.views.quote_token_window',
+                        lambda: quote_token_window(now)):
+            return self.client.get(
+                reverse('calculate_price'), self.params, **headers)
+
+    def test_revalidates_only_within_issue_window(self):
+        window = 10 * 60
+        start = 1000 * window
+        response = self.quote(start)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(load_quote_token(response.json()['quote_token']))
+        etag = response['ETag']
+
+        self.assertEqual(self.quote(start + window - 1, etag).status_code,
+                         304)
+        self.assertEqual(self.quote(start + window, etag).status_code, 200)
+
+    def test_window_plus_freshness_fits_token_lifetime(self):
+        # Ответ из начала окна, подтвержденный в его конце, браузер
+        # держит еще QUOTE_CACHE_SECONDS — не дольше срока токена
+        window = 15 * 60 - 5 * 60
+        self.assertEqual(quote_token_window(0),
+                         quote_token_window(window - 1))
+        self.assertNotEqual(quote_token_window(0),
+                            quote_token_window(window))
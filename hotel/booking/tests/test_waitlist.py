@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from booking.forms import BookingForm
+from booking.hotels import use_hotel
+from booking.models import Booking, Client, WaitlistEntry
+from booking.waitlist import expire_offers
+
+from .base import BookingTestCase, main_hotel, make_admin, make_rooms, stay
+
+
+class WaitlistTests(BookingTestCase):
+    """Предложения освободившегося номера ожидающим клиентам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = main_hotel()
+        cls.admin = make_admin()
+        cls.room, = make_rooms(cls.hotel, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def guest(self):
+        with use_hotel(self.hotel):
+            return Client.objects.create(
+                first_name='Иван', last_name='Петров', phone='+7900')
+
+    def book(self, dates, status='confirmed'):
+        with use_hotel(self.hotel):
+            return Booking.objects.create(
+                client=self.guest(), room=self.room,
+                check_in_date=dates[0], check_out_date=dates[1],
+                status=status, created_by=self.admin)
+
+    def wait(self, dates):
+        with use_hotel(self.hotel):
+            return WaitlistEntry.objects.create(
+                client=self.guest(), room_type=self.room.room_type,
+                check_in_date=dates[0], check_out_date=dates[1],
+                created_by=self.admin)
+
+    def act(self, url_name, booking):
+        # Подбор запускается после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse(url_name, args=[booking.pk]))
+
+    def offer_room(self, dates):
+        """Отмена брони номера предлагает его первому в очереди"""
+        booking = self.book(dates)
+        first, second = self.wait(dates), self.wait(dates)
+        self.act('booking_cancel', booking)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        return first, second
+
+    def test_cancel_offers_room_in_queue_order(self):
+        dates = stay()
+        first, second = self.offer_room(dates)
+
+        self.assertEqual(first.status, 'offered')
+        self.assertEqual(second.status, 'waiting')
+        offer = first.offer
+        self.assertEqual(offer.status, 'pending')
+        self.assertEqual(offer.room, self.room)
+        self.assertEqual(
+            (offer.check_in_date, offer.check_out_date), dates)
+        self.assertEqual(offer.client, first.client)
+
+    def test_entry_outside_released_period_is_not_offered(self):
+        dates = stay()
+        booking = self.book(dates)
+        self.book(stay(days_ahead=12, nights=2))
+        entry = self.wait(stay(days_ahead=11, nights=2))
+        self.act('booking_cancel', booking)
+        entry.refresh_from_db()
+        # Запрос задевает бронь, которая по-прежнему занимает номер
+        self.assertEqual(entry.status, 'waiting')
+
+    def test_confirm_accepts_offer(self):
+        first, _ = self.offer_room(stay())
+        self.act('confirm_booking', first.offer)
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'accepted')
+        self.assertEqual(first.offer.status, 'confirmed')
+
+    def test_api_confirms_offer(self):
+        first, _ = self.offer_room(stay())
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        response = api.patch(
+            reverse('api-booking-detail', args=[first.offer.pk]),
+            {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'accepted')
+
+    def test_cancel_declines_offer_and_offers_next(self):
+        first, second = self.offer_room(stay())
+        self.act('booking_cancel', first.offer)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'declined')
+        self.assertEqual(second.status, 'offered')
+
+    def test_expired_offer_goes_to_next(self):
+        first, second = self.offer_room(stay())
+        WaitlistEntry.objects.filter(pk=first.pk).update(
+            offered_at=timezone.now() - timedelta(days=2))
+
+        with use_hotel(self.hotel):
+            self.assertEqual(expire_offers(), (1, 1))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'expired')
+        self.assertEqual(first.offer.status, 'cancelled')
+        self.assertEqual(second.status, 'offered')
+
+    def test_fresh_offer_does_not_expire(self):
+        first, _ = self.offer_room(stay())
+        with use_hotel(self.hotel):
+            self.assertEqual(expire_offers(), (0, 0))
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'offered')
+
+    def test_form_rejects_booking_over_open_offer(self):
+        dates = stay()
+        self.offer_room(dates)
+        with use_hotel(self.hotel):
+            form = BookingForm(data={
+                'room': self.room.pk,
+                'check_in_date': dates[0],
+                'check_out_date': dates[1],
+            })
+            self.assertFalse(form.is_valid())
+        self.assertIn('Номер уже забронирован на выбранные даты',
+                      form.non_field_errors())
+
+    def test_confirm_refuses_double_booking(self):
+        dates = stay()
+        # Неподтвержденная бронь не занимает номер при ручном выборе
+        pending = self.book(dates, status='pending')
+        self.book(dates)
+        self.act('confirm_booking', pending)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'pending')
@@ -0,0 +1,44 @@
+import csv
+import io
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from booking.worklists import write_worklist_csv
+
+
+class WorklistCsvTests(SimpleTestCase):
+
+    def arrival(self, **values):
+        row = {
+            'floor': 1, 'room': '101', 'category': 'Стандарт', 'id': 7,
+            'guest': 'Иван Петров', 'phone': '89001234567',
+            'check_in': date(2026, 1, 10), 'check_out': date(2026, 1, 12),
+            'nights': 2, 'needs_child_bed': False, 'done': True,
+            'notes': '',
+        }
+        row.update(values)
+        return row
+
+    def rows(self, *arrivals):
+        output = io.StringIO()
+        write_worklist_csv(output, {'arrivals': list(arrivals)}, 'arrivals')
+        output.seek(0)
+        return list(csv.DictReader(output, delimiter=';'))
+
+    def test_escapes_formula_cells(self):
+        row, = self.rows(self.arrival(
+            guest='=HYPERLINK("http://example.com")', phone='+79001234567',
+            notes='@SUM(A1)'))
+        self.assertEqual(row['Гость'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['Телефон'], "'+79001234567")
+        self.assertEqual(row['Примечания'], "'@SUM(A1)")
+
+    def test_keeps_plain_values(self):
+        row, = self.rows(self.arrival(notes='поздний заезд -- после 23'))
+        self.assertEqual(row['Гость'], 'Иван Петров')
+        self.assertEqual(row['Телефон'], '89001234567')
+        self.assertEqual(row['Ночей'], '2')
+        self.assertEqual(row['Выполнено'], 'да')
+        self.assertEqual(row['Детская кровать'], '')
+        self.assertEqual(row['Примечания'], 'поздний заезд -- после 23')
@@ -1,12 +1,25 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import api, views
+
+router = DefaultRouter()
+router.register('room-types', api.RoomTypeViewSet, basename='api-room-type')
+router.register('rooms', api.RoomViewSet, basename='api-room')
+router.register('bookings', api.BookingViewSet, basename='api-booking')
 
 urlpatterns = [
     path('', views.admin_dashboard, name='admin_dashboard'),
+    path('dashboard/events/', views.dashboard_events,
+         name='dashboard_events'),
 
     path('bookings/', views.BookingListView.as_view(), name='booking_list'),
     path('bookings/create/', views.BookingCreateView.as_view(),
          name='booking_create'),
+    path('bookings/create/auto/', views.BookingAutoCreateView.as_view(),
+         name='booking_auto_create'),
+    path('bookings/create/group/', views.GroupBookingCreateView.as_view(),
+         name='booking_group_create'),
     path('bookings/<int:pk>/', views.BookingDetailView.as_view(),
          name='booking_detail'),
 
@@ -19,7 +32,33 @@ urlpatterns = [
     path('bookings/<int:pk>/check-out/',
          views.check_out_booking, name='check_out_booking'),
 
+    path('worklists/', views.worklists, name='worklists'),
+    path('waitlist/', views.WaitlistView.as_view(), name='waitlist'),
+    path('waitlist/<int:pk>/cancel/', views.waitlist_cancel,
+         name='waitlist_cancel'),
+
+    path('rooms/grid/', views.room_grid, name='room_grid'),
+    path('rooms/grid/data/', views.room_grid_data, name='room_grid_data'),
+
+    path('profiles/', views.profile_list, name='profile_list'),
+    path('profiles/clear/', views.profile_clear, name='profile_clear'),
+    path('profiles/<str:url_name>/<str:name>/', views.profile_detail,
+         name='profile_detail'),
+
+    path('hotels/switch/', views.hotel_switch, name='hotel_switch'),
     path('accounts/logout/', views.custom_logout, name='logout'),
     path('calculate-price/', views.calculate_price, name='calculate_price'),
+    path('guests/lookup/', views.guest_lookup, name='guest_lookup'),
+
+    path('api/availability/', api.AvailabilityView.as_view(),
+         name='api_availability'),
+    path('api/quotes/', api.QuoteView.as_view(), name='api_quote'),
+    path('api/quotes/batch/', api.QuoteBatchView.as_view(),
+         name='api_quote_batch'),
+    path('api/quotes/stats/', api.QuoteStatsView.as_view(),
+         name='api_quote_stats'),
+    path('api/calendar/', api.CalendarView.as_view(), name='api_calendar'),
+    path('api/changes/', api.ChangeFeedView.as_view(), name='api_changes'),
+    path('api/', include(router.urls)),
 
 ]
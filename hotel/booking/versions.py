@@ -0,0 +1,54 @@
+"""
+Версии данных для инвалидации кэша.
+
+Ключи кэша строятся с номером версии, поэтому при изменении данных
+достаточно увеличить версию — старые записи просто перестают
+запрашиваться и вытесняются по таймауту.
+"""
+import time
+
+from django.core.cache import cache
+
+BOOKINGS = 'bookings'
+CATALOG = 'catalog'
+PRICING = 'pricing'
+
+KEY_PREFIX = 'booking:version:'
+
+
+def _initial_version():
+    # Версия от времени: после вытеснения ключа из кэша
+    # новая версия не совпадет ни с одной из старых
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Текущая версия набора данных"""
+    key = KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_versions(*names):
+    """Версии нескольких наборов данных одним обращением к кэшу"""
+    keys = [KEY_PREFIX + name for name in names]
+    found = cache.get_many(keys)
+    return tuple(
+        found[key] if key in found else get_version(name)
+        for key, name in zip(keys, names)
+    )
+
+
+def bump_version(name):
+    """Сделать недействительными все ключи, построенные на версии"""
+    key = KEY_PREFIX + name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
@@ -1,32 +1,72 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import (
-    ListView, DetailView, CreateView
+    ListView, DetailView, CreateView, FormView
+)
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 )
-from django.http import JsonResponse
 from django.contrib.auth import logout
-from django.urls import reverse_lazy
+from django.db import transaction
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.contrib import messages
-from datetime import datetime
-
-from .models import Room, Booking
-from .forms import BookingForm, ClientForm
-from .utils import (
-    calculate_room_price_preview, get_available_discount
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition, require_POST
+from datetime import datetime, timedelta
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+
+from .archive import get_booking_or_archived
+from .availability import ACTIVE_STATUSES
+from .models import (
+    ArchivedBooking, Room, RoomType, Booking, WaitlistEntry
+)
+from .events import SEQ_KEY, aevents_since, current_seq, watcher
+from .forms import (
+    AutoAssignBookingForm, BookingForm, ClientForm, GroupBookingForm,
+    WaitlistEntryForm,
+)
+from .groups import RoomsUnavailable, create_group_booking
+from .guests import guest_summary
+from .hotels import (
+    SESSION_KEY, active_hotels, hotel_database, hotel_key, use_hotel
+)
+from .idempotency import (
+    DuplicateSubmission, claim_submission, new_submission_key,
+    record_submission, replayed_booking, submission_key,
 )
+from .profiling import (
+    clear_profiles, list_profiles, profile_path, profile_report
+)
+from .grid import (
+    GRID_DEFAULT_DAYS, GRID_MAX_DAYS, build_room_grid, render_grid_rows
+)
+from .quotes import (
+    apply_quote_token, cached_price_preview, issue_quote_token,
+    price_booking, quote_cache_seconds, quote_token_window
+)
+from .pricing import quote_version
+from .versions import BOOKINGS, CATALOG, get_version, get_versions
+from .utils import is_room_available
+from .worklists import WORKLIST_NAMES, cached_worklists, write_worklist_csv
 
 
-@login_required
-def admin_dashboard(request):
-    """Главная панель управления"""
-    today = timezone.now().date()
-
-    # Статистика
-    stats = {
+def get_dashboard_stats(today):
+    """Счетчики панели управления"""
+    return {
         'total_bookings':
-            Booking.objects.count(),
+            Booking.objects.count() + ArchivedBooking.objects.count(),
         'active_bookings':
             Booking.objects.filter(
                 status__in=['confirmed', 'checked_in']).count(),
@@ -41,60 +81,225 @@ def admin_dashboard(request):
                 is_available=True).count(),
     }
 
+
+def cached_dashboard_stats(today):
+    """Счетчики панели: один расчет на версию данных для всех соединений"""
+    key = 'booking:dashboard:stats:%s:%s.%s:%s' % (
+        hotel_key(), *get_versions(BOOKINGS, CATALOG), today.isoformat())
+    stats = cache.get(key)
+    if stats is None:
+        stats = get_dashboard_stats(today)
+        cache.set(key, stats, settings.FRAGMENT_CACHE_TIMEOUT)
+    return stats
+
+
+@login_required
+def admin_dashboard(request):
+    """Главная панель управления"""
+    today = timezone.now().date()
+
+    # Статистика считается только при промахе кэша фрагмента
+    stats = SimpleLazyObject(lambda: get_dashboard_stats(today))
+
     # Ближайшие заезды
     upcoming_checkins = Booking.objects.filter(
         check_in_date__gte=today,
         status='confirmed'
-    ).order_by('check_in_date')[:10]
+    ).select_related('client', 'room').order_by('check_in_date')[:10]
 
-    # Текущие гости
+    # Текущие гости; полные списки дня — в рабочих листах
     current_guests = Booking.objects.filter(
-        status='checked_in').order_by('check_in_date')
+        status='checked_in'
+    ).select_related('client', 'room').order_by('check_in_date')[:10]
 
     # Последние бронирования
-    recent_bookings = Booking.objects.all().order_by('-created_at')[:10]
+    recent_bookings = Booking.objects.all().select_related(
+        'client', 'room').order_by('-created_at')[:10]
 
     context = {
         'stats': stats,
         'upcoming_checkins': upcoming_checkins,
         'current_guests': current_guests,
         'recent_bookings': recent_bookings,
+        'dashboard_version': '%s.%s.%s' % (
+            hotel_key(), *get_versions(BOOKINGS, CATALOG)),
+        'today': today,
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'events_cursor': current_seq(),
     }
 
     return render(request, 'booking/admin_dashboard.html', context)
 
 
-def calculate_total_price(
-        room_type, check_in_date, check_out_date, needs_child_bed=False):
-    """Расчет общей стоимости бронирования с использованием цен из базы"""
-    price_data = calculate_room_price_preview(
-        room_type,
-        check_in_date,
-        check_out_date,
-        needs_child_bed
-    )
-    discount = get_available_discount(price_data['nights'])
+def _sse(event, data, event_id=None):
+    message = f'event: {event}\ndata: {json.dumps(data)}\n\n'
+    if event_id is not None:
+        message = f'id: {event_id}\n' + message
+    return message
+
+
+def _hotel_dashboard_stats(hotel, today):
+    with use_hotel(hotel):
+        return cached_dashboard_stats(today)
+
+
+async def _dashboard_stream(cursor, streaming, hotel=None):
+    """
+    Изменения после cursor: счетчики, которые поменялись, и строки
+    измененных броней гостиницы hotel. Без ASGI отдается одна порция,
+    после чего EventSource сам переподключается через retry
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENTS_STREAM_LIFETIME
+    retry = 3 if streaming else settings.EVENTS_HEARTBEAT
+    yield f'retry: {retry * 1000}\n\n'
+
+    counters = None
+    while True:
+        events, seq, complete = await aevents_since(cursor)
+        if not complete:
+            # Клиент отстал больше, чем хранится событий
+            yield _sse('reset', {}, seq)
+            return
+
+        if events:
+            # Поток читается после выхода из middleware: гостиница
+            # передается явно
+            stats = await sync_to_async(_hotel_dashboard_stats)(
+                hotel, timezone.now().date())
+            bookings = {}
+            deleted = set()
+            for event in events:
+                for row in event['bookings']:
+                    if hotel is not None and row['hotel'] != hotel.pk:
+                        continue
+                    row['created'] = row['created'] or bookings.get(
+                        row['id'], {}).get('created', False)
+                    bookings[row['id']] = row
+                    deleted.discard(row['id'])
+                for hotel_id, booking_id in event['deleted']:
+                    if hotel is not None and hotel_id != hotel.pk:
+                        continue
+                    bookings.pop(booking_id, None)
+                    deleted.add(booking_id)
+            yield _sse('delta', {
+                'counters': {
+                    name: value for name, value in stats.items()
+                    if counters is None or counters.get(name) != value
+                },
+                'bookings': list(bookings.values()),
+                'deleted': sorted(deleted),
+            }, seq)
+            counters = stats
+        elif cursor != seq:
+            yield f'id: {seq}\n\n'
+        cursor = seq
+
+        if not streaming or loop.time() >= deadline:
+            return
+        await watcher.wait(cursor, settings.EVENTS_HEARTBEAT)
+        if await cache.aget(SEQ_KEY, 0) <= cursor:
+            yield ': ping\n\n'
+
+
+@login_required
+async def dashboard_events(request):
+    """Поток изменений для панели управления (server-sent events)"""
+    try:
+        cursor = int(request.headers.get('Last-Event-ID')
+                     or request.GET.get('cursor', ''))
+    except ValueError:
+        cursor = -1
+
+    stream = _dashboard_stream(
+        cursor, isinstance(request, ASGIRequest), request.hotel)
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            stream, content_type='text/event-stream')
+    else:
+        # WSGI не удерживает соединение: отдаем одну порцию
+        response = HttpResponse(
+            ''.join([chunk async for chunk in stream]),
+            content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _parse_quote_params(request):
+    """Параметры расчета из запроса или None, если они неполные"""
+    room_id = request.GET.get('room_id')
+    room_type_id = request.GET.get('room_type_id')
+    check_in = request.GET.get('check_in')
+    check_out = request.GET.get('check_out')
+    if not all([room_id or room_type_id, check_in, check_out]):
+        return None
+    try:
+        return (
+            int(room_id) if room_id else None,
+            int(room_type_id) if room_type_id else None,
+            datetime.strptime(check_in, '%Y-%m-%d').date(),
+            datetime.strptime(check_out, '%Y-%m-%d').date(),
+            request.GET.get('needs_child_bed') == 'true',
+        )
+    except ValueError:
+        return None
 
-    return price_data['total_price'], discount
+
+def quote_etag(request):
+    """
+    ETag расчета: зависит только от типа номера, дат,
+    детской кровати, версии расчета и окна выдачи токена
+    """
+    params = _parse_quote_params(request)
+    if params is None:
+        return None
+    (room_id, room_type_id, check_in_date, check_out_date,
+     needs_child_bed) = params
+    if (check_out_date <= check_in_date
+            or check_in_date < timezone.now().date()):
+        return None
+    if room_id is not None:
+        room_type_id = Room.objects.filter(pk=room_id).values_list(
+            'room_type_id', flat=True).first()
+    elif not RoomType.objects.filter(pk=room_type_id).exists():
+        room_type_id = None
+    if room_type_id is None:
+        return None
+    return '"q%s-%s-%s-%d-%s-w%d"' % (
+        room_type_id,
+        check_in_date.strftime('%Y%m%d'),
+        check_out_date.strftime('%Y%m%d'),
+        needs_child_bed,
+        quote_version(),
+        quote_token_window(),
+    )
 
 
 @login_required
+@condition(etag_func=quote_etag)
 def calculate_price(request):
     """AJAX endpoint для расчета стоимости бронирования"""
     if request.method == 'GET':
         room_id = request.GET.get('room_id')
+        room_type_id = request.GET.get('room_type_id')
         check_in = request.GET.get('check_in')
         check_out = request.GET.get('check_out')
         needs_child_bed = request.GET.get('needs_child_bed') == 'true'
 
-        if not all([room_id, check_in, check_out]):
+        if not all([room_id or room_type_id, check_in, check_out]):
             return JsonResponse(
                 {'error': 'Не все параметры указаны'},
                 status=400
             )
 
         try:
-            room = Room.objects.get(id=room_id)
+            # Без номера расчет идет по типу: номер подберется при создании
+            if room_id:
+                room_type = Room.objects.select_related(
+                    'room_type').get(id=room_id).room_type
+            else:
+                room_type = RoomType.objects.get(id=room_type_id)
             check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
             check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
 
@@ -111,8 +316,8 @@ def calculate_price(request):
                 )
 
             # Расчет стоимости
-            price_data = calculate_room_price_preview(
-                room.room_type,
+            price_data = cached_price_preview(
+                room_type,
                 check_in_date,
                 check_out_date,
                 needs_child_bed
@@ -134,12 +339,27 @@ def calculate_price(request):
                     if price_data['nights'] > 0 else 0
                 ),
                 'child_bed_price': float(price_data['child_bed_price']),
+                'quote_token': issue_quote_token(
+                    room_type.pk, check_in_date, check_out_date,
+                    needs_child_bed, price_data),
             }
 
-            return JsonResponse(data)
+            response = JsonResponse(data)
+            # URL с актуальной версией цен можно переиспользовать
+            # без запроса к серверу, остальные — только после проверки ETag
+            if request.GET.get('v') == quote_version():
+                patch_cache_control(
+                    response, private=True,
+                    max_age=quote_cache_seconds())
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
 
         except Room.DoesNotExist:
             return JsonResponse({'error': 'Номер не найден'}, status=400)
+        except RoomType.DoesNotExist:
+            return JsonResponse(
+                {'error': 'Тип номера не найден'}, status=400)
         except ValueError:
             return JsonResponse({'error': 'Неверный формат даты'}, status=400)
         except Exception as e:
@@ -149,50 +369,92 @@ def calculate_price(request):
     return JsonResponse({'error': 'Метод не разрешен'}, status=405)
 
 
+@login_required
+def guest_lookup(request):
+    """AJAX: постоянный ли гость с этим телефоном (форма создания брони)"""
+    phone = request.GET.get('phone', '').strip()
+    if not phone:
+        return JsonResponse({'error': 'Не указан телефон'}, status=400)
+    summary = guest_summary(phone)
+    return JsonResponse({
+        'stays': summary['stays'],
+        'nights': summary['nights'],
+        'lifetime_value': float(summary['lifetime_value']),
+        'last_stay': summary['last_stay'],
+    })
+
+
 class BookingCreateView(LoginRequiredMixin, CreateView):
     """Создание нового бронирования"""
     model = Booking
     form_class = BookingForm
     template_name = 'booking/booking_create.html'
     success_url = reverse_lazy('booking_list')
+    auto_assign = False
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['client_form'] = ClientForm()
-        context['booking_form'] = BookingForm()
+        context['booking_form'] = self.get_form_class()()
+        context['auto_assign'] = self.auto_assign
+        context['pricing_version'] = quote_version()
+        # После ошибок формы ключ прежний: брони по нему еще нет
+        context['submission_key'] = (
+            submission_key(self.request) or new_submission_key())
         return context
 
+    def replay(self, booking):
+        """Ответ на повторную отправку формы"""
+        if booking is None:
+            messages.info(self.request, 'Эта форма уже была отправлена')
+        else:
+            messages.info(
+                self.request,
+                f'Бронирование №{booking.pk} уже создано этой формой')
+        return redirect('booking_list')
+
     def post(self, request, *args, **kwargs):
+        self.object = None
+        key = submission_key(request)
+        # Повторная отправка: ответ сразу, без проверок и расчета цены
+        if key is not None:
+            booking = replayed_booking(request.user, key)
+            if booking is not None:
+                return self.replay(booking)
+
         client_form = ClientForm(request.POST)
-        booking_form = BookingForm(request.POST)
+        booking_form = self.get_form_class()(request.POST)
 
         if client_form.is_valid() and booking_form.is_valid():
-            # Сохраняем клиента
-            client = client_form.save()
-
-            # Создаем бронирование
-            booking = booking_form.save(commit=False)
-            booking.client = client
-            booking.created_by = request.user
-
-            # Расчет стоимости
-            price_data = calculate_room_price_preview(
-                booking.room.room_type,
-                booking.check_in_date,
-                booking.check_out_date,
-                booking.needs_child_bed
-            )
-            # Берем total_price из словаря
-            booking.total_price = price_data['total_price']
-
-            # Применяем скидку если есть
-            if price_data['has_discount']:
-                booking.discount_applied = get_available_discount(
-                    price_data['nights'])
-
-            booking.save()
-
-            messages.success(request, 'Бронирование успешно создано!')
+            try:
+                with transaction.atomic(using=hotel_database()):
+                    submission = claim_submission(request.user, key)
+
+                    # Сохраняем клиента
+                    client = client_form.save()
+
+                    # Создаем бронирование
+                    booking = booking_form.save(commit=False)
+                    booking.client = client
+                    booking.created_by = request.user
+
+                    # Цена из токена расчета, иначе полный пересчет
+                    if not apply_quote_token(
+                            booking, request.POST.get('quote_token')):
+                        price_booking(booking)
+
+                    booking.save()
+                    record_submission(submission, booking)
+            except DuplicateSubmission as duplicate:
+                return self.replay(duplicate.booking)
+
+            if self.auto_assign:
+                messages.success(
+                    request,
+                    f'Бронирование успешно создано! '
+                    f'Назначен номер {booking.room.number}')
+            else:
+                messages.success(request, 'Бронирование успешно создано!')
             return redirect('booking_list')
 
         # Если формы невалидны
@@ -202,6 +464,106 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
         return self.render_to_response(context)
 
 
+class BookingAutoCreateView(BookingCreateView):
+    """Создание бронирования по типу номера с автоматическим подбором"""
+    form_class = AutoAssignBookingForm
+    auto_assign = True
+
+
+class GroupBookingCreateView(LoginRequiredMixin, FormView):
+    """Групповое бронирование: один клиент, несколько номеров"""
+    form_class = GroupBookingForm
+    template_name = 'booking/group_create.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('client_form', ClientForm())
+        return context
+
+    def post(self, request, *args, **kwargs):
+        client_form = ClientForm(request.POST)
+        form = self.get_form()
+
+        if client_form.is_valid() and form.is_valid():
+            data = form.cleaned_data
+            try:
+                bookings = create_group_booking(
+                    client_form.cleaned_data,
+                    [room.pk for room in data['rooms']],
+                    data['check_in_date'],
+                    data['check_out_date'],
+                    created_by=request.user,
+                    child_bed_rooms=[
+                        room.pk for room in data['child_bed_rooms']],
+                    notes=data['notes'],
+                )
+            except RoomsUnavailable as e:
+                form.add_error('rooms', str(e))
+            else:
+                total = sum(booking.total_price for booking in bookings)
+                messages.success(
+                    request,
+                    f'Групповое бронирование создано: '
+                    f'{len(bookings)} номеров на сумму {total:.2f} ₽')
+                return redirect('booking_list')
+
+        return self.render_to_response(self.get_context_data(
+            form=form, client_form=client_form))
+
+
+class WaitlistView(LoginRequiredMixin, FormView):
+    """Лист ожидания: новые запросы и очередь по типам номеров"""
+    form_class = WaitlistEntryForm
+    template_name = 'booking/waitlist.html'
+    paginate_by = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('client_form', ClientForm())
+        entries = WaitlistEntry.objects.filter(
+            status__in=['waiting', 'offered'],
+        ).select_related(
+            'client', 'room_type', 'offer__room',
+        ).order_by('room_type', 'created_at', 'pk')
+        page = Paginator(entries, self.paginate_by).get_page(
+            self.request.GET.get('page'))
+        context['page_obj'] = page
+        context['entries'] = page.object_list
+        return context
+
+    def post(self, request, *args, **kwargs):
+        client_form = ClientForm(request.POST)
+        form = self.get_form()
+
+        if client_form.is_valid() and form.is_valid():
+            entry = form.save(commit=False)
+            entry.client = client_form.save()
+            entry.created_by = request.user
+            entry.save()
+            messages.success(
+                request,
+                f'Клиент добавлен в лист ожидания: {entry.room_type}, '
+                f'{entry.check_in_date:%d.%m.%Y} - '
+                f'{entry.check_out_date:%d.%m.%Y}')
+            return redirect('waitlist')
+
+        return self.render_to_response(self.get_context_data(
+            form=form, client_form=client_form))
+
+
+@login_required
+@require_POST
+def waitlist_cancel(request, pk):
+    """Снять запрос с ожидания"""
+    updated = WaitlistEntry.objects.filter(
+        pk=pk, status='waiting').update(status='cancelled')
+    if updated:
+        messages.success(request, 'Запрос снят с ожидания')
+    else:
+        messages.error(request, 'Запрос уже не в ожидании')
+    return redirect('waitlist')
+
+
 class BookingListView(LoginRequiredMixin, ListView):
     model = Booking
     template_name = 'booking/booking_list.html'
@@ -209,10 +571,56 @@ class BookingListView(LoginRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        return Booking.objects.all().select_related(
-            'client', 'room', 'created_by'
+        model = ArchivedBooking if self.show_archive() else Booking
+        return model.objects.all().select_related(
+            'client', 'room__room_type', 'created_by'
         )
 
+    def show_archive(self):
+        return self.request.GET.get('archive') == '1'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['archive'] = self.show_archive()
+        context['bookings_version'] = '%s.%s.%s' % (
+            hotel_key(), *get_versions(BOOKINGS, CATALOG))
+        context['fragment_cache_timeout'] = settings.FRAGMENT_CACHE_TIMEOUT
+        return context
+
+
+def _booking_validators(request, pk):
+    """
+    Валидаторы страницы брони: (ETag, Last-Modified).
+    Вычисляются один раз на запрос
+    """
+    if not hasattr(request, '_booking_validators'):
+        validators = (None, None)
+        # Непоказанные сообщения есть только в полном ответе
+        if not len(messages.get_messages(request)):
+            # Профиль гостя меняется и при изменении других его броней
+            row = Booking.objects.filter(pk=pk).values_list(
+                'updated_at', 'client__profile__updated_at').first()
+            if row is not None:
+                updated_at = max(filter(None, row))
+                etag = '"b%s-%s-%s-%s-u%s"' % (
+                    hotel_key(),
+                    pk,
+                    int(updated_at.timestamp() * 1000000),
+                    get_version(CATALOG),
+                    request.user.pk,
+                )
+                validators = (etag, updated_at)
+        request._booking_validators = validators
+    return request._booking_validators
+
+
+def booking_etag(request, pk):
+    return _booking_validators(request, pk)[0]
+
+
+def booking_last_modified(request, pk):
+    return _booking_validators(request, pk)[1]
+
 
 class BookingDetailView(LoginRequiredMixin, DetailView):
     """Детали бронирования"""
@@ -220,6 +628,113 @@ class BookingDetailView(LoginRequiredMixin, DetailView):
     template_name = 'booking/booking_detail.html'
     context_object_name = 'booking'
 
+    @method_decorator(condition(
+        etag_func=booking_etag, last_modified_func=booking_last_modified))
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_queryset(self):
+        return Booking.objects.select_related(
+            'client__profile', 'room__room_type', 'discount_applied',
+            'created_by'
+        )
+
+    def get_object(self, queryset=None):
+        # Закрытые брони со временем уходят в архив с тем же id
+        return get_booking_or_archived(
+            self.kwargs['pk'], self.get_queryset(),
+            ArchivedBooking.objects.select_related(
+                'client__profile', 'room__room_type', 'discount_applied',
+                'created_by'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['catalog_version'] = get_version(CATALOG)
+        context['fragment_cache_timeout'] = settings.FRAGMENT_CACHE_TIMEOUT
+        context['guest_profile'] = getattr(
+            self.object.client, 'profile', None)
+        return context
+
+
+def _grid_window(request):
+    """Окно шахматки из параметров cursor (первый день) и days"""
+    today = timezone.now().date()
+    try:
+        start_date = datetime.strptime(
+            request.GET.get('cursor', ''), '%Y-%m-%d').date()
+    except ValueError:
+        start_date = today
+    try:
+        days = int(request.GET.get('days', GRID_DEFAULT_DAYS))
+    except ValueError:
+        days = GRID_DEFAULT_DAYS
+    return start_date, min(max(days, 1), GRID_MAX_DAYS)
+
+
+@login_required
+def room_grid(request):
+    """Шахматка номеров"""
+    start_date, days = _grid_window(request)
+    grid = build_room_grid(start_date, days)
+    context = {
+        'grid': grid,
+        'rows_html': render_grid_rows(grid, reverse('booking_list')),
+        'today': timezone.now().date(),
+    }
+    return render(request, 'booking/room_grid.html', context)
+
+
+@login_required
+def room_grid_data(request):
+    """Шахматка номеров в JSON для прокрутки без перезагрузки"""
+    start_date, days = _grid_window(request)
+    grid = build_room_grid(start_date, days)
+    grid.pop('dates')
+    return JsonResponse(grid)
+
+
+@login_required
+def worklists(request):
+    """
+    Рабочие листы на день (?date=ГГГГ-ММ-ДД, по умолчанию сегодня).
+    ?export=<лист> отдает один лист в CSV
+    """
+    today = timezone.now().date()
+    try:
+        day = datetime.strptime(
+            request.GET.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        day = today
+    lists = cached_worklists(day)
+
+    export = request.GET.get('export')
+    if export is not None:
+        if export not in WORKLIST_NAMES:
+            raise Http404('Неизвестный лист')
+        # BOM, чтобы Excel открыл файл в UTF-8
+        response = HttpResponse(
+            '\ufeff', content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export}-{day.isoformat()}.csv"')
+        write_worklist_csv(response, lists, export)
+        return response
+
+    context = {
+        'lists': lists,
+        'sections': [
+            (name, WORKLIST_NAMES[name], lists[name])
+            for name in ('arrivals', 'departures', 'stayovers')
+        ],
+        'housekeeping_title': WORKLIST_NAMES['housekeeping'],
+        'day': day,
+        'today': today,
+        'prev_day': day - timedelta(days=1),
+        'next_day': day + timedelta(days=1),
+    }
+    return render(request, 'booking/worklists.html', context)
+
 
 @login_required
 def check_out_booking(request, pk):
@@ -228,7 +743,8 @@ def check_out_booking(request, pk):
     if booking.status == 'checked_in':
         booking.status = 'checked_out'
         booking.actual_check_out = timezone.now()
-        booking.save()
+        with transaction.atomic(using=hotel_database()):
+            booking.save()
         messages.success(request, 'Гость выселен!')
     else:
         messages.error(
@@ -240,8 +756,16 @@ def check_out_booking(request, pk):
 def confirm_booking(request, pk):
     """Подтверждение бронирования"""
     booking = get_object_or_404(Booking, pk=pk)
+    # Неподтвержденная бронь не занимала номер: за это время
+    # его могли забронировать
+    if booking.status not in ACTIVE_STATUSES and not is_room_available(
+            booking.room, booking.check_in_date, booking.check_out_date,
+            exclude=booking.pk):
+        messages.error(request, 'Номер уже забронирован на выбранные даты')
+        return redirect('booking_detail', pk=pk)
     booking.status = 'confirmed'
-    booking.save()
+    with transaction.atomic(using=hotel_database()):
+        booking.save()
     messages.success(request, 'Бронирование подтверждено!')
     return redirect('booking_detail', pk=pk)
 
@@ -253,7 +777,8 @@ def check_in_booking(request, pk):
     if booking.status == 'confirmed':
         booking.status = 'checked_in'
         booking.actual_check_in = timezone.now()
-        booking.save()
+        with transaction.atomic(using=hotel_database()):
+            booking.save()
         messages.success(request, 'Гость заселен!')
     else:
         messages.error(request, 'Невозможно заселить гостя')
@@ -265,11 +790,59 @@ def cancel_booking(request, pk):
     """Отмена бронирования"""
     booking = get_object_or_404(Booking, pk=pk)
     booking.status = 'cancelled'
-    booking.save()
+    with transaction.atomic(using=hotel_database()):
+        booking.save()
     messages.success(request, 'Бронирование отменено!')
     return redirect('booking_detail', pk=pk)
 
 
+@staff_member_required
+def profile_list(request):
+    """Сохраненные профили медленных запросов по маршрутам"""
+    return render(request, 'booking/profiles.html', {
+        'profiles': list_profiles(),
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'header': settings.PROFILING_HEADER,
+    })
+
+
+@staff_member_required
+def profile_detail(request, url_name, name):
+    """Сводка профиля или файл .prof для snakeviz / pstats"""
+    path = profile_path(url_name, name)
+    if path is None:
+        raise Http404('Профиль не найден')
+    if request.GET.get('download'):
+        return FileResponse(
+            path.open('rb'), as_attachment=True,
+            filename=f'{url_name}-{name}.prof')
+    return HttpResponse(
+        profile_report(path), content_type='text/plain; charset=utf-8')
+
+
+@staff_member_required
+@require_POST
+def profile_clear(request):
+    clear_profiles(request.POST.get('url_name') or None)
+    messages.success(request, 'Профили удалены')
+    return redirect('profile_list')
+
+
+@login_required
+@require_POST
+def hotel_switch(request):
+    """Выбрать гостиницу, с которой работает сотрудник"""
+    try:
+        hotel_id = int(request.POST.get('hotel', ''))
+    except ValueError:
+        raise Http404('Гостиница не найдена')
+    if hotel_id not in {hotel.pk for hotel in active_hotels()}:
+        raise Http404('Гостиница не найдена')
+    request.session[SESSION_KEY] = hotel_id
+    # Объекты прежней гостиницы в новой не откроются
+    return redirect('admin_dashboard')
+
+
 def custom_logout(request):
     """
     Простой кастомный выход из системы
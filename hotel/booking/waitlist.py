@@ -0,0 +1,178 @@
+"""
+Лист ожидания.
+
+Когда отмена или ранний выезд освобождает номер, ищутся ожидающие
+запросы того же типа, которые целиком помещаются в свободное окно
+номера. Поиск — диапазон по частичному индексу waitlist_waiting_idx
+(тип, заезд, выезд): сколько бы запросов ни ждало, читаются только
+те, чей заезд попадает в окно. Подходящим запросам в порядке очереди
+создаются неподтвержденные брони — предложения; подтверждение брони
+принимает предложение, отмена — отклоняет.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .allocation import OCCUPYING_STATUSES, WINDOW_DAYS
+from .hotels import hotel_database
+from .models import Booking, Room, RoomType, WaitlistEntry
+from .quotes import price_booking
+
+# Чем заканчивается предложение при смене статуса его брони
+OFFER_OUTCOMES = {
+    'confirmed': 'accepted',
+    'checked_in': 'accepted',
+    'cancelled': 'declined',
+}
+
+
+def free_window(intervals, start_date, end_date, today):
+    """
+    Свободное окно номера вокруг освободившегося периода:
+    от конца предыдущей брони до начала следующей,
+    но не дальше WINDOW_DAYS и не раньше сегодняшнего дня
+    """
+    window = timedelta(days=WINDOW_DAYS)
+    window_start = max(
+        [end for start, end in intervals if end <= start_date],
+        default=start_date - window)
+    window_end = min(
+        [start for start, end in intervals if start >= end_date],
+        default=end_date + window)
+    return max(window_start, today), window_end
+
+
+def match_released_room(room_id, start_date, end_date):
+    """
+    Предложить освободившийся на [start_date, end_date) номер
+    ожидающим. Возвращает созданные предложения (брони)
+    """
+    today = timezone.now().date()
+    start_date = max(start_date, today)
+    if start_date >= end_date:
+        return []
+
+    offers = []
+    with transaction.atomic(using=hotel_database()):
+        # Блокировка номера: параллельная отмена в том же номере ждет
+        room = Room.objects.select_for_update().select_related(
+            'room_type').filter(pk=room_id, is_available=True).first()
+        if room is None:
+            return []
+
+        window = timedelta(days=WINDOW_DAYS)
+        intervals = list(Booking.objects.filter(
+            room=room,
+            status__in=OCCUPYING_STATUSES,
+            check_in_date__lt=end_date + window,
+            check_out_date__gt=start_date - window,
+        ).values_list('check_in_date', 'check_out_date'))
+        window_start, window_end = free_window(
+            intervals, start_date, end_date, today)
+
+        # Запрос целиком внутри окна и задевает освободившийся период:
+        # остальные поместились бы и до отмены
+        candidates = WaitlistEntry.objects.select_for_update(
+            skip_locked=True,
+        ).filter(
+            room_type_id=room.room_type_id,
+            status='waiting',
+            check_in_date__gte=window_start,
+            check_in_date__lt=end_date,
+            check_out_date__gt=start_date,
+            check_out_date__lte=window_end,
+        ).select_related('client').order_by('created_at', 'pk')
+
+        now = timezone.now()
+        for entry in candidates:
+            if any(start < entry.check_out_date
+                   and end > entry.check_in_date
+                   for start, end in intervals):
+                continue
+            booking = Booking(
+                client=entry.client,
+                room=room,
+                check_in_date=entry.check_in_date,
+                check_out_date=entry.check_out_date,
+                needs_child_bed=entry.needs_child_bed,
+                status='pending',
+                created_by=entry.created_by,
+                notes=f'Предложение из листа ожидания #{entry.pk}',
+            )
+            price_booking(booking)
+            booking.save()
+
+            entry.status = 'offered'
+            entry.offer = booking
+            entry.offered_at = now
+            entry.save(update_fields=['status', 'offer', 'offered_at'])
+            intervals.append((entry.check_in_date, entry.check_out_date))
+            offers.append(booking)
+    return offers
+
+
+def expire_offers(now=None):
+    """
+    Отменить брони-предложения без ответа дольше WAITLIST_OFFER_HOURS
+    и предложить номера следующим в очереди.
+    Возвращает (число истекших предложений, число новых)
+    """
+    if now is None:
+        now = timezone.now()
+    cutoff = now - timedelta(hours=settings.WAITLIST_OFFER_HOURS)
+    stale = Booking.objects.filter(
+        waitlist_entry__status='offered',
+        waitlist_entry__offered_at__lt=cutoff,
+        status='pending',
+    )
+    expired = 0
+    released = []
+    for booking in stale:
+        with transaction.atomic(using=hotel_database()):
+            # Статус запроса меняется до отмены брони, чтобы сигнал
+            # не записал предложение как отклоненное клиентом
+            WaitlistEntry.objects.filter(offer=booking).update(
+                status='expired')
+            booking.status = 'cancelled'
+            booking.save()
+        expired += 1
+        released.append(
+            (booking.room_id, booking.check_in_date, booking.check_out_date))
+
+    offered = sum(
+        len(match_released_room(*stay)) for stay in released)
+    return expired, offered
+
+
+def settle_offer(booking):
+    """
+    Подтверждение брони-предложения принимает его, отмена — отклоняет
+    и предлагает номер следующему в очереди
+    """
+    outcome = OFFER_OUTCOMES.get(booking.status)
+    if outcome is None:
+        return
+    settled = WaitlistEntry.objects.filter(
+        offer_id=booking.pk, status='offered').update(status=outcome)
+    if settled and outcome == 'declined':
+        # Предложение занимает номер при подборе (OCCUPYING_STATUSES),
+        # но как неподтвержденная бронь не учтено в счетчиках: сигнал
+        # освобождения номера на его отмену не срабатывает
+        stay = booking.room_id, booking.check_in_date, booking.check_out_date
+        transaction.on_commit(
+            lambda: match_released_room(*stay), using=hotel_database())
+
+
+def expire_waiting(today=None):
+    """
+    Закрыть ожидающие запросы текущей гостиницы (по ее типам номеров),
+    дата заезда которых уже прошла
+    """
+    if today is None:
+        today = timezone.now().date()
+    return WaitlistEntry.objects.filter(
+        status='waiting', check_in_date__lt=today,
+        room_type__in=RoomType.objects.all(),
+    ).update(status='expired')
@@ -0,0 +1,198 @@
+"""
+Рабочие листы на день: заезды, выезды, продления и уборка по этажам.
+
+Все брони гостиницы, задевающие день, читаются одним запросом
+по индексу booking_day_idx, номера по этажам — одним сгруппированным
+запросом; дальше брони раскладываются по спискам в памяти, без запросов
+на каждый номер. Листы кэшируются на день до смены версии броней
+или справочников.
+"""
+import csv
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .availability import ACTIVE_STATUSES
+from .hotels import hotel_key
+from .models import Booking, Room, RoomType
+from .versions import BOOKINGS, CATALOG, get_versions
+
+WORKLIST_STATUSES = ['confirmed', 'checked_in', 'checked_out']
+
+# Задачи уборки в порядке очередности: номер, в который сегодня
+# заезжают после выезда, убирается первым
+HOUSEKEEPING_TASKS = {
+    'turnover': 'Выезд и заезд',
+    'departure': 'Уборка после выезда',
+    'arrival': 'Проверка к заезду',
+    'stayover': 'Текущая уборка',
+}
+TASK_ORDER = {task: order for order, task in enumerate(HOUSEKEEPING_TASKS)}
+
+CATEGORY_LABELS = dict(RoomType.CATEGORY_CHOICES)
+
+WORKLIST_FIELDS = [
+    'id', 'room_id', 'room__number', 'room__floor',
+    'room__room_type__category', 'client__first_name', 'client__last_name',
+    'client__phone', 'check_in_date', 'check_out_date', 'needs_child_bed',
+    'status', 'notes',
+]
+
+
+def _row(values):
+    (booking_id, room_id, number, floor, category, first_name, last_name,
+     phone, check_in_date, check_out_date, needs_child_bed, status,
+     notes) = values
+    return {
+        'id': booking_id,
+        'room_id': room_id,
+        'room': number,
+        'floor': floor,
+        'category': CATEGORY_LABELS.get(category, category),
+        'guest': f'{first_name} {last_name}',
+        'phone': phone,
+        'check_in': check_in_date,
+        'check_out': check_out_date,
+        'nights': (check_out_date - check_in_date).days,
+        'needs_child_bed': needs_child_bed,
+        'status': status,
+        'notes': notes,
+    }
+
+
+def build_worklists(day):
+    """
+    Возвращает словарь:
+    arrivals, departures, stayovers — брони по номерам с отметкой done
+    (гость уже заселен или выселен), floors — по каждому этажу число
+    номеров, выведенных из продажи, и задачи уборки
+    """
+    bookings = Booking.objects.filter(
+        status__in=WORKLIST_STATUSES,
+        check_out_date__gte=day,
+        check_in_date__lte=day,
+    ).order_by('room__floor', 'room__number').values_list(*WORKLIST_FIELDS)
+
+    arrivals, departures, stayovers = [], [], []
+    for values in bookings.iterator():
+        row = _row(values)
+        if row['check_in'] == day:
+            row['done'] = row['status'] != 'confirmed'
+            arrivals.append(row)
+        elif row['check_out'] == day:
+            row['done'] = row['status'] == 'checked_out'
+            departures.append(row)
+        elif row['status'] in ACTIVE_STATUSES:
+            row['done'] = False
+            stayovers.append(row)
+
+    floors = {
+        floor: {
+            'floor': floor, 'rooms': rooms, 'out_of_service': closed,
+            'tasks': [],
+        }
+        for floor, rooms, closed in Room.objects.values('floor').annotate(
+            rooms=Count('id'),
+            closed=Count('id', filter=Q(is_available=False)),
+        ).order_by('floor').values_list('floor', 'rooms', 'closed')
+    }
+
+    tasks = {}
+    for task, rows in (('departure', departures), ('arrival', arrivals),
+                       ('stayover', stayovers)):
+        for row in rows:
+            current = tasks.get(row['room_id'])
+            if current is None:
+                tasks[row['room_id']] = (task, row)
+            elif current[0] == 'departure' and task == 'arrival':
+                # Номер готовят к заезду: важны данные нового гостя
+                tasks[row['room_id']] = ('turnover', row)
+    for task, row in tasks.values():
+        floor = floors.setdefault(row['floor'], {
+            'floor': row['floor'], 'rooms': 0, 'out_of_service': 0,
+            'tasks': [],
+        })
+        floor['tasks'].append({
+            'room': row['room'],
+            'task': task,
+            'task_display': HOUSEKEEPING_TASKS[task],
+            'category': row['category'],
+            'guest': row['guest'],
+            'needs_child_bed': row['needs_child_bed'],
+        })
+    for floor in floors.values():
+        floor['tasks'].sort(
+            key=lambda item: (TASK_ORDER[item['task']], item['room']))
+
+    return {
+        'date': day,
+        'arrivals': arrivals,
+        'departures': departures,
+        'stayovers': stayovers,
+        'floors': [floors[floor] for floor in sorted(floors)],
+    }
+
+
+def cached_worklists(day):
+    """Листы на день: один расчет на гостиницу и версию данных"""
+    key = 'booking:worklists:%s:%s.%s:%s' % (
+        hotel_key(), *get_versions(BOOKINGS, CATALOG), day.isoformat())
+    worklists = cache.get(key)
+    if worklists is None:
+        worklists = build_worklists(day)
+        cache.set(key, worklists, settings.FRAGMENT_CACHE_TIMEOUT)
+    return worklists
+
+
+# Столбцы выгрузки: (заголовок, ключ строки)
+BOOKING_COLUMNS = [
+    ('Этаж', 'floor'), ('Номер', 'room'), ('Категория', 'category'),
+    ('Бронь', 'id'), ('Гость', 'guest'), ('Телефон', 'phone'),
+    ('Заезд', 'check_in'), ('Выезд', 'check_out'), ('Ночей', 'nights'),
+    ('Детская кровать', 'needs_child_bed'), ('Выполнено', 'done'),
+    ('Примечания', 'notes'),
+]
+HOUSEKEEPING_COLUMNS = [
+    ('Этаж', 'floor'), ('Номер', 'room'), ('Категория', 'category'),
+    ('Задача', 'task_display'), ('Гость', 'guest'),
+    ('Детская кровать', 'needs_child_bed'),
+]
+
+WORKLIST_NAMES = {
+    'arrivals': 'Заезды',
+    'departures': 'Выезды',
+    'stayovers': 'Продления',
+    'housekeeping': 'Уборка',
+}
+
+
+# Ячейки, которые табличные редакторы примут за формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return 'да' if value else ''
+    # Имя, телефон и примечания вводятся вручную: апостроф заставляет
+    # редактор показать значение как текст, а не вычислять его
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def write_worklist_csv(output, worklists, name):
+    """Записать один лист в CSV (разделитель — точка с запятой)"""
+    writer = csv.writer(output, delimiter=';')
+    if name == 'housekeeping':
+        columns = HOUSEKEEPING_COLUMNS
+        rows = [
+            dict(task, floor=floor['floor'])
+            for floor in worklists['floors'] for task in floor['tasks']
+        ]
+    else:
+        columns = BOOKING_COLUMNS
+        rows = worklists[name]
+    writer.writerow([title for title, _ in columns])
+    for row in rows:
+        writer.writerow([_csv_value(row[key]) for _, key in columns])
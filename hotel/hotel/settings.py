@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django_bootstrap5',
+    'rest_framework',
 ]
 
 
@@ -55,10 +57,16 @@ AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Сжатие ответов — раньше всех, кто меняет содержимое
+    'booking.compression.ResponseCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # После аутентификации: заголовок профилирования только для сотрудников
+    'booking.profiling.ProfilingMiddleware',
+    # Гостиница запроса: заголовок X-Hotel или выбор в сессии
+    'booking.hotels.HotelMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -69,13 +77,21 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'booking.hotels.current_hotel',
+            ],
+            # Скомпилированные шаблоны хранятся в памяти процесса;
+            # при DEBUG автоперезагрузчик сбрасывает их при изменении
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -94,6 +110,142 @@ DATABASES = {
     }
 }
 
+# Гостиницы в отдельных базах: код гостиницы -> псевдоним из DATABASES.
+# Остальные гостиницы и общие данные (гостиницы, пользователи) —
+# в default. Схема базы гостиницы создается migrate --database
+DATABASE_ROUTERS = ['booking.routers.HotelRouter']
+HOTEL_DATABASES = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hotel',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Версии данных, события живой панели и кэш фрагментов должны быть
+# общими для всех процессов: LocMem у каждого процесса свой, и после
+# изменения в одном процессе другие показывали бы устаревшие данные.
+# Без DEBUG (несколько процессов gunicorn/uvicorn) нужен REDIS_URL
+if not DEBUG and CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    raise ImproperlyConfigured(
+        'Без DEBUG нужен общий для процессов кэш: задайте REDIS_URL')
+
+
+# Sessions and messages
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+
+# db — сессия читается из базы на каждом запросе;
+# cached_db — чтение из кэша, запись в кэш и базу;
+# signed_cookies — сессия целиком в подписанной cookie, база не нужна
+SESSION_PROFILES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_PROFILE = os.getenv('SESSION_PROFILE', 'cached_db')
+if SESSION_PROFILE not in SESSION_PROFILES:
+    raise ImproperlyConfigured(
+        'SESSION_PROFILE должен быть одним из: '
+        + ', '.join(SESSION_PROFILES))
+SESSION_ENGINE = SESSION_PROFILES[SESSION_PROFILE]
+
+# Сообщения после действий живут в cookie и не трогают сессию
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Время жизни фрагментов шаблонов; ключи версионируются,
+# поэтому таймаут лишь ограничивает рост кэша
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Сколько браузер может переиспользовать расчет стоимости
+# с актуальной версией цен без обращения к серверу
+QUOTE_CACHE_SECONDS = 5 * 60
+
+# Срок действия токена расчета, принимаемого при создании брони
+QUOTE_TOKEN_MAX_AGE = 15 * 60
+
+# Сколько последних расчетов стоимости процесс держит в памяти
+QUOTE_MEMO_SIZE = 4096
+
+# Сколько проживаний можно рассчитать или забронировать одним
+# пакетным запросом
+QUOTE_BATCH_MAX_SIZE = 500
+
+# Сколько секунд повторная отправка формы или запроса API с тем же
+# ключом возвращает уже созданную бронь
+SUBMISSION_KEY_TTL = 60 * 60
+
+# На сколько дней вперед цены рассчитываются заранее
+PRICE_HORIZON_DAYS = 365
+
+# Свободные окна короче этого числа ночей считаются непродаваемыми;
+# автоматический подбор номера старается их не оставлять
+ALLOCATION_MIN_GAP_NIGHTS = 3
+
+# Сколько часов клиент из листа ожидания может подтвердить
+# предложенную бронь, прежде чем номер предложат следующему
+WAITLIST_OFFER_HOURS = 24
+
+# Через сколько дней после выезда закрытые брони переносятся в архив
+BOOKING_ARCHIVE_AFTER_DAYS = 180
+
+# Живая панель управления: события изменений броней хранятся в кэше
+# EVENTS_TTL секунд; каждый процесс проверяет новые события раз
+# в EVENTS_POLL_INTERVAL секунд, молчащее соединение получает
+# пинг раз в EVENTS_HEARTBEAT секунд и переоткрывается через
+# EVENTS_STREAM_LIFETIME секунд
+EVENTS_TTL = 10 * 60
+EVENTS_POLL_INTERVAL = 1
+EVENTS_HEARTBEAT = 25
+EVENTS_STREAM_LIFETIME = 5 * 60
+
+# Лента изменений для внешней синхронизации: последние
+# CHANGE_FEED_LAG_SECONDS секунд не отдаются, чтобы долгая транзакция
+# с более ранним updated_at не оказалась позади отметки клиента;
+# записи об удалении хранятся CHANGE_FEED_TOMBSTONE_DAYS дней
+CHANGE_FEED_LAG_SECONDS = 5
+CHANGE_FEED_TOMBSTONE_DAYS = 30
+CHANGE_FEED_MAX_BATCH = 1000
+
+# Профилирование: доля случайных запросов (0 — выключено) и заголовок,
+# которым сотрудник запрашивает профиль своего запроса. Для каждого
+# маршрута хранятся PROFILING_KEEP самых медленных профилей
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_HEADER = 'X-Profile'
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_KEEP = 10
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,6 +291,23 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic добавляет хеш содержимого в имена файлов и кладет
+# рядом сжатые копии .gz (.br — если установлен brotli)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND':
+        'booking.compression.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Отдавать статику самим приложением (без nginx перед ним). Файлы
+# с хешем в имени кэшируются на год, остальные — на STATIC_MAX_AGE
+SERVE_STATIC = DEBUG or os.getenv('SERVE_STATIC') == '1'
+STATIC_MAX_AGE = 60 * 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
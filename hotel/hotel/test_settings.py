@@ -0,0 +1,18 @@
+"""
+Настройки для manage.py test.
+
+Вторая база hotel_b нужна тестам гостиницы, вынесенной из default
+(HOTEL_DATABASES задается в самих тестах); пароли хешируются быстро.
+"""
+from .settings import *  # noqa: F401, F403
+from .settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'hotel_b': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'hotel_b.sqlite3',
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
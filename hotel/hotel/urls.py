@@ -14,11 +14,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
+from booking.compression import serve_static
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,5 +35,9 @@ handler500 = 'booking.views.server_error'
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL,
-                          document_root=settings.STATIC_ROOT)
+
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'),
+                serve_static),
+    ]